@@ -0,0 +1,61 @@
+"""
+Mark routines in an f2py signature file as threadsafe
+
+f2py releases the GIL around calls to routines marked as ``threadsafe``,
+which allows calls from different Python threads to run concurrently.
+
+Only routines which work on existing instances
+(i.e. wrapped methods, ``i_*``, and attribute getters, ``iget_*``)
+are marked.
+Routines which claim, release or reserve instances
+modify the shared instance pool so keep the GIL held.
+
+Usage: ``python f2py-threadsafe.py <signature-file>``.
+The signature file is modified in place.
+"""
+from __future__ import annotations
+
+import re
+import sys
+
+THREADSAFE_ROUTINE_RE = re.compile(
+    r"^(?P<indent>\s*)(?P<header>(?:subroutine|function) (?:i_|iget_)\w+\s*\(.*\n)",
+    flags=re.MULTILINE,
+)
+"""Regular expression which matches the header of the routines to mark"""
+
+
+def mark_threadsafe(signature: str) -> str:
+    """
+    Mark the relevant routines in a signature file as threadsafe
+
+    Parameters
+    ----------
+    signature
+        Contents of the signature file
+
+    Returns
+    -------
+        Contents of the signature file with the relevant routines marked
+    """
+    return THREADSAFE_ROUTINE_RE.sub(
+        lambda m: f"{m.group('indent')}{m.group('header')}{m.group('indent')}    threadsafe\n",
+        signature,
+    )
+
+
+def main() -> None:
+    """
+    Mark the routines in the signature file given on the command line
+    """
+    (signature_file,) = sys.argv[1:]
+
+    with open(signature_file) as fh:
+        signature = fh.read()
+
+    with open(signature_file, "w") as fh:
+        fh.write(mark_threadsafe(signature))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,140 @@
+"""
+Benchmark the cold-start cost of importing and first using fgen_example
+
+Each measurement runs in a fresh interpreter with ``python -X importtime``,
+so nothing is already imported or cached.
+For each statement, this reports the cumulative import time
+of the module being benchmarked, the wall-clock time of the whole statement
+(e.g. including the first call, which loads the compiled extension
+and the unit registry) and the imports which take the most time themselves.
+"""
+from __future__ import annotations
+
+import argparse
+import re
+import statistics
+import subprocess
+import sys
+import time
+
+DEFAULT_STATEMENTS: tuple[str, ...] = (
+    "import fgen_example",
+    "import fgen_example.derived_type",
+    "import fgen_example.operations",
+    "from fgen_example.derived_type import DerivedType; DerivedType.from_build_args_m(1.0).finalize()",
+    "import pint; from fgen_example.derived_type import DerivedType; "
+    "DerivedType.from_build_args(pint.get_application_registry().Quantity(1, 'm'))"
+    ".finalize()",
+)
+
+_IMPORT_TIME_LINE = re.compile(
+    r"import time:\s+(?P<self>\d+) \|\s+(?P<cumulative>\d+) \|(?P<indent>\s*)(?P<name>\S+)"
+)
+
+
+def run_cold(statement: str) -> tuple[float, dict[str, tuple[int, int]]]:
+    """
+    Run a statement in a fresh interpreter, recording import times
+
+    Parameters
+    ----------
+    statement
+        Statement to run
+
+    Returns
+    -------
+        Wall-clock time of the run in seconds and, for each imported module,
+        its self and cumulative import time in microseconds
+    """
+    start = time.perf_counter()
+    res = subprocess.run(
+        (sys.executable, "-X", "importtime", "-c", statement),  # noqa: S603
+        capture_output=True,
+        check=True,
+        text=True,
+    )
+    wall_time = time.perf_counter() - start
+
+    import_times = {}
+    for line in res.stderr.splitlines():
+        match = _IMPORT_TIME_LINE.match(line)
+        if match:
+            import_times[match.group("name")] = (
+                int(match.group("self")),
+                int(match.group("cumulative")),
+            )
+
+    return wall_time, import_times
+
+
+def get_benchmarked_module(statement: str) -> str:
+    """
+    Get the fgen_example module which a statement imports
+
+    Parameters
+    ----------
+    statement
+        Statement being benchmarked
+
+    Returns
+    -------
+        Name of the (first) fgen_example module imported by ``statement``
+    """
+    match = re.search(r"(?:import|from) (fgen_example\S*)", statement)
+    if match is None:
+        return "fgen_example"
+
+    return match.group(1)
+
+
+def main() -> None:
+    """
+    Run the benchmark
+    """
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument(
+        "--statements",
+        nargs="+",
+        default=list(DEFAULT_STATEMENTS),
+        help="Statements to benchmark, each in a fresh interpreter",
+    )
+    parser.add_argument(
+        "--repeats",
+        type=int,
+        default=5,
+        help="Number of fresh interpreters to run for each statement",
+    )
+    parser.add_argument(
+        "--top",
+        type=int,
+        default=5,
+        help="Number of slowest imports (by self time) to report for each statement",
+    )
+    args = parser.parse_args()
+
+    # Start-up of a bare interpreter, to put the numbers below in context
+    baseline = statistics.median(run_cold("pass")[0] for _ in range(args.repeats))
+    print(f"Bare interpreter start-up: {baseline * 1e3:.1f} ms\n")
+
+    for statement in args.statements:
+        module = get_benchmarked_module(statement)
+        runs = [run_cold(statement) for _ in range(args.repeats)]
+
+        wall_time = statistics.median(v[0] for v in runs)
+        import_time = statistics.median(v[1][module][1] for v in runs) / 1e6
+
+        print(statement)
+        print(f"    import {module}: {import_time * 1e3:.1f} ms")
+        print(f"    total (wall-clock): {wall_time * 1e3:.1f} ms")
+
+        # Slowest imports from the median run (by wall-clock time)
+        median_run = sorted(runs, key=lambda v: v[0])[len(runs) // 2][1]
+        slowest = sorted(median_run.items(), key=lambda v: v[1][0], reverse=True)
+        for name, (self_time, _) in slowest[: args.top]:
+            print(f"        {self_time / 1e3:8.1f} ms  {name}")
+
+        print()
+
+
+if __name__ == "__main__":
+    main()
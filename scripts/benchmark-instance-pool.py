@@ -0,0 +1,71 @@
+"""
+Benchmark claiming and releasing instances as the instance pool fills up
+
+Claiming and releasing an instance should take constant time,
+regardless of how many instances are already alive.
+This script fills the pool to increasing levels
+and reports the allocate/finalize rate at each level.
+The reported rates should stay (roughly) flat.
+"""
+from __future__ import annotations
+
+import argparse
+import time
+
+from fgen_example.derived_type import DerivedType
+
+
+def time_churn(n_churn: int) -> float:
+    """
+    Time claiming then immediately releasing instances
+
+    Parameters
+    ----------
+    n_churn
+        Number of instances to claim and release
+
+    Returns
+    -------
+        Number of allocate/finalize pairs per second
+    """
+    start = time.perf_counter()
+    for _ in range(n_churn):
+        DerivedType.from_new_connection().finalize()
+
+    return n_churn / (time.perf_counter() - start)
+
+
+def main() -> None:
+    """
+    Run the benchmark
+    """
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument(
+        "--fill-levels",
+        type=int,
+        nargs="+",
+        default=[0, 1_000, 4_000, 16_000, 64_000],
+        help="Number of live instances at which to measure the allocate/finalize rate",
+    )
+    parser.add_argument(
+        "--n-churn",
+        type=int,
+        default=10_000,
+        help="Number of allocate/finalize pairs to time at each fill level",
+    )
+    args = parser.parse_args()
+
+    live: list[DerivedType] = []
+    print(f"{'live instances':>15} {'allocate/finalize per second':>30}")
+    for fill_level in sorted(args.fill_levels):
+        while len(live) < fill_level:
+            live.append(DerivedType.from_new_connection())
+
+        print(f"{fill_level:>15} {time_churn(args.n_churn):>30.0f}")
+
+    for instance in live:
+        instance.finalize()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,78 @@
+"""
+Benchmark the cost of unit handling per call
+
+This compares :func:`fgen_runtime.units.verify_units`,
+which converts units through the pint registry on every call,
+with :func:`fgen_example.units.verify_units`,
+which caches the conversion factors,
+and with the magnitude-only (``_m``) methods, which skip unit handling entirely.
+"""
+from __future__ import annotations
+
+import argparse
+import timeit
+from typing import Any, Callable
+
+import pint
+from fgen_runtime.units import verify_units as verify_units_uncached
+
+from fgen_example.derived_type import _UNITS, DerivedType
+from fgen_example.units import verify_units as verify_units_cached
+
+Q = pint.get_application_registry().Quantity
+
+
+def time_per_call(func: Callable[[], Any], n_calls: int) -> float:
+    """
+    Time calling a function
+
+    Parameters
+    ----------
+    func
+        Function to call
+
+    n_calls
+        Number of times to call ``func``
+
+    Returns
+    -------
+        Time per call in microseconds (best of five repeats)
+    """
+    return min(timeit.repeat(func, number=n_calls, repeat=5)) / n_calls * 1e6
+
+
+def main() -> None:
+    """
+    Run the benchmark
+    """
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument(
+        "--n-calls",
+        type=int,
+        default=10_000,
+        help="Number of calls to time for each variant",
+    )
+    args = parser.parse_args()
+
+    dt = DerivedType.from_build_args(base=Q(2, "m"))
+    decorated = {
+        "uncached": verify_units_uncached(_UNITS["output"], (None, _UNITS["other"]))(DerivedType.add_m),
+        "cached": verify_units_cached(_UNITS["output"], (None, _UNITS["other"]))(DerivedType.add_m),
+    }
+
+    print(f"{'variant':>25} {'us per call':>12}")
+    for input_units in ("m", "mm"):
+        other = Q(3.0, input_units)
+        for name, add in decorated.items():
+            label = f"{name} ({input_units})"
+            per_call = time_per_call(lambda: add(dt, other), args.n_calls)
+            print(f"{label:>25} {per_call:>12.2f}")
+
+    per_call = time_per_call(lambda: dt.add_m(3.0), args.n_calls)
+    print(f"{'magnitude only':>25} {per_call:>12.2f}")
+
+    dt.finalize()
+
+
+if __name__ == "__main__":
+    main()
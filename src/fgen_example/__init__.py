@@ -1,6 +1,63 @@
 """
 Example project using fgen to wrap a simple module
+
+The submodules (and the compiled extension and unit registry they use)
+are only imported when they are first accessed,
+so ``import fgen_example`` is cheap.
 """
-import importlib.metadata
+from __future__ import annotations
+
+import importlib
+from typing import TYPE_CHECKING, Any
+
+if TYPE_CHECKING:
+    from fgen_example.pool import arena
+
+_SUBMODULES: frozenset[str] = frozenset(
+    (
+        "batching",
+        "checkpoint",
+        "deferred",
+        "derived_type",
+        "instrumentation",
+        "operations",
+        "parallel",
+        "pool",
+        "streaming",
+        "units",
+    )
+)
+
+_LAZY_ATTRIBUTES: dict[str, str] = {
+    "arena": "fgen_example.pool",
+}
+"""Attributes which are loaded on first access, mapped to the module they are in"""
+
+__all__ = ["arena"]
+
+
+def __getattr__(name: str) -> Any:
+    if name in _SUBMODULES:
+        return importlib.import_module(f"{__name__}.{name}")
+
+    if name in _LAZY_ATTRIBUTES:
+        value = getattr(importlib.import_module(_LAZY_ATTRIBUTES[name]), name)
+
+    elif name == "__version__":
+        from importlib.metadata import version
+
+        value = version(__name__)
+
+    else:
+        raise AttributeError(  # noqa: TRY003
+            f"module {__name__!r} has no attribute {name!r}"
+        )
+
+    # Cache so that this is only called once per attribute
+    globals()[name] = value
+
+    return value
+
 
-__version__ = importlib.metadata.version("fgen_example")
+def __dir__() -> list[str]:
+    return sorted({*globals(), *_SUBMODULES, *_LAZY_ATTRIBUTES, "__version__"})
@@ -0,0 +1,88 @@
+"""
+Deferred loading of the compiled extension
+
+The wrapper modules refer to the modules of the compiled extension
+(e.g. ``derived_type_w``) as module-level globals.
+Rather than importing the extension when the wrapper module is imported,
+each global starts out as a :class:`LazyExtensionModule`.
+On first use, this imports the extension
+and replaces itself in the wrapper module's namespace with the real module,
+so later calls look up the extension module directly
+and pay nothing for the deferral.
+
+As a result, if the compiled extension is missing,
+:class:`fgen_runtime.exceptions.CompiledExtensionNotFoundError`
+is raised when the extension is first used
+rather than when the wrapper module is imported.
+"""
+from __future__ import annotations
+
+import importlib
+from typing import Any
+
+import fgen_runtime.exceptions as fgr_excs
+
+EXTENSION_NAME: str = "fgen_example._lib"
+"""Name of the compiled extension"""
+
+
+def load_extension_module(name: str) -> Any:
+    """
+    Load a module from the compiled extension
+
+    Parameters
+    ----------
+    name
+        Name of the module within the compiled extension (e.g. ``"derived_type_w"``)
+
+    Returns
+    -------
+        Loaded module
+
+    Raises
+    ------
+    fgr_excs.CompiledExtensionNotFoundError
+        The compiled extension could not be imported
+    """
+    try:
+        extension = importlib.import_module(EXTENSION_NAME)
+    except (ModuleNotFoundError, ImportError) as exc:
+        raise fgr_excs.CompiledExtensionNotFoundError(EXTENSION_NAME) from exc
+
+    return getattr(extension, name)
+
+
+class LazyExtensionModule:
+    """
+    Stand-in for a module of the compiled extension, loaded on first use
+    """
+
+    def __init__(self, name: str, namespace: dict[str, Any]) -> None:
+        """
+        Initialise
+
+        Parameters
+        ----------
+        name
+            Name of the module within the compiled extension.
+            This must also be the name of the global which holds this stand-in.
+
+        namespace
+            Namespace (i.e. ``globals()``) of the module which holds this stand-in
+        """
+        self._name = name
+        self._namespace = namespace
+
+    def __getattr__(self, attribute: str) -> Any:
+        # Don't load the extension just because something is inspecting us
+        # (e.g. looking for ``__wrapped__`` or ``__array__``)
+        if attribute.startswith("__"):
+            raise AttributeError(attribute)
+
+        module = load_extension_module(self._name)
+        self._namespace[self._name] = module
+
+        return getattr(module, attribute)
+
+    def __repr__(self) -> str:
+        return f"<{type(self).__name__} {EXTENSION_NAME}.{self._name}>"
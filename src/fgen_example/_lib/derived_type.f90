@@ -2,6 +2,7 @@
 
 module derived_type
    use fgen_base_finalizable, only: BaseFinalizable
+   use parallel, only: min_parallel_batch_size, get_num_threads
 
    implicit none
    private
@@ -16,7 +17,7 @@ module derived_type
 
       private
 
-      procedure, public :: build, finalize, add, double
+      procedure, public :: build, finalize, add, add_batch, double
 
    end type DerivedType
 
@@ -44,6 +45,26 @@ contains
 
    end function add
 
+   function add_batch(self, n, others) result(outputs)
+
+      class(DerivedType), intent(inout) :: self
+
+      integer, intent(in) :: n
+
+      real(8), dimension(n), intent(in) :: others
+
+      real(8), dimension(n) :: outputs
+
+      integer :: i
+
+      !$omp parallel do if (n >= min_parallel_batch_size) num_threads(get_num_threads())
+      do i = 1, n
+         outputs(i) = self%base + others(i)
+      end do
+      !$omp end parallel do
+
+   end function add_batch
+
    function double(self) result(output)
 
       class(DerivedType), intent(inout) :: self
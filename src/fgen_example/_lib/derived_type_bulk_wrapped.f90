@@ -0,0 +1,464 @@
+!!!
+! Bulk wrapper for ``derived_type``
+!
+! Unlike ``derived_type_w``, which is generated by fgen
+! and operates on a single instance per call,
+! the routines in this module operate on many instances at once.
+! This allows a whole batch of instances to be processed
+! with a single crossing of the Python-Fortran boundary.
+!
+! This module is maintained by hand.
+!!!
+module derived_type_bulk_w
+
+    ! First-party requirements from the module we're wrapping
+    use derived_type, only: DerivedType
+    use derived_type_manager, only: &
+        manager_get_free_instances => get_free_instance_numbers, &
+        manager_claim_instances => claim_instance_numbers, &
+        manager_instances_finalize => instances_finalize, &
+        manager_get_instance => get_instance, &
+        manager_get_capacity => get_capacity, &
+        manager_get_statistics => get_statistics, &
+        manager_get_live_instance_indexes => get_live_instance_indexes, &
+        manager_reserve => reserve
+    use parallel, only: min_parallel_batch_size, get_num_threads
+    use, intrinsic :: ieee_arithmetic, only: ieee_value, ieee_quiet_nan
+
+    implicit none
+    private
+
+    public :: instances_build, &
+              instances_finalize
+
+    ! Statement declarations for export and import
+    public :: instances_export, &
+              instances_import
+
+    ! Statement declarations for instance pool management
+    public :: get_capacity
+    public :: get_statistics
+    public :: get_live_instance_indexes
+    public :: reserve
+
+    ! Statement declarations for getters and setters
+    public :: iget_base_batch
+    public :: iset_base_batch
+
+    ! Statement declarations for methods
+    public :: i_add_batch
+    public :: i_double_batch
+
+    ! Statement declarations for deferred operations
+    public :: i_dispatch
+
+    ! Opcodes of the operations which can be deferred.
+    ! These must match ``_OPCODES`` in ``derived_type.py``.
+    integer, parameter :: OPCODE_GET_BASE = 1
+    integer, parameter :: OPCODE_ADD = 2
+    integer, parameter :: OPCODE_DOUBLE = 3
+
+contains
+
+    ! Build methods
+    !
+    ! Claim and build many instances at once.
+    ! If the instances cannot be claimed,
+    ! all the returned instance indexes are invalid.
+    subroutine instances_build( &
+        n, &
+        base, &
+        instance_indexes &
+        )
+
+        integer, intent(in) :: n
+        ! Number of instances to build
+
+        real(8), dimension(n), intent(in) :: base
+        ! Passing of base for each instance
+
+        integer, dimension(n), intent(out) :: instance_indexes
+        ! Returning of the index of each built instance
+
+        type(DerivedType), pointer :: instance
+
+        integer :: i
+
+        call manager_get_free_instances(n, instance_indexes)
+        if (n > 0) then
+            if (instance_indexes(1) < 1) return
+        end if
+
+        do i = 1, n
+
+            call manager_get_instance(instance_indexes(i), instance)
+
+            call instance % build( &
+                base=base(i) &
+                )
+
+        end do
+
+    end subroutine instances_build
+
+    ! Finalisation
+    subroutine instances_finalize( &
+        n, &
+        instance_indexes &
+        )
+
+        integer, intent(in) :: n
+        ! Number of instances to finalise
+
+        integer, dimension(n), intent(in) :: instance_indexes
+        ! Indexes of the instances to finalise
+
+        call manager_instances_finalize(n, instance_indexes)
+
+    end subroutine instances_finalize
+
+    ! Export and import
+    !
+    ! Get the state of all the live instances (in no particular order),
+    ! or restore instances with given indexes, in a single call.
+    subroutine instances_export( &
+        n, &
+        instance_indexes, &
+        base, &
+        n_live &
+        )
+
+        integer, intent(in) :: n
+        ! Maximum number of instances to export
+
+        integer, dimension(n), intent(out) :: instance_indexes
+        ! Indexes of the live instances
+
+        real(8), dimension(n), intent(out) :: base
+        ! Returning of base for each live instance
+
+        integer, intent(out) :: n_live
+        ! Number of live instances.
+        ! If this is greater than ``n``, only ``n`` instances were exported.
+
+        type(DerivedType), pointer :: instance
+
+        integer :: i
+
+        call manager_get_live_instance_indexes(n, instance_indexes, n_live)
+
+        base = 0.0
+        do i = 1, min(n, n_live)
+
+            call manager_get_instance(instance_indexes(i), instance)
+
+            base(i) = instance % base
+
+        end do
+
+    end subroutine instances_export
+
+    subroutine instances_import( &
+        n, &
+        instance_indexes, &
+        base, &
+        success &
+        )
+
+        integer, intent(in) :: n
+        ! Number of instances to import
+
+        integer, dimension(n), intent(in) :: instance_indexes
+        ! Indexes to give the instances
+
+        real(8), dimension(n), intent(in) :: base
+        ! Passing of base for each instance
+
+        logical, intent(out) :: success
+        ! Whether the instances could be claimed with the given indexes.
+        ! If not, nothing is imported.
+
+        type(DerivedType), pointer :: instance
+
+        integer :: i
+
+        call manager_claim_instances(n, instance_indexes, success)
+        if (.not. success) return
+
+        do i = 1, n
+
+            call manager_get_instance(instance_indexes(i), instance)
+
+            call instance % build( &
+                base=base(i) &
+                )
+
+        end do
+
+    end subroutine instances_import
+
+    ! Instance pool management
+    function get_capacity() result(capacity)
+
+        integer :: capacity
+
+        capacity = manager_get_capacity()
+
+    end function get_capacity
+
+    subroutine get_statistics( &
+        capacity, &
+        n_live, &
+        high_water_mark, &
+        n_claimed, &
+        n_finalized &
+        )
+
+        integer, intent(out) :: capacity
+
+        integer, intent(out) :: n_live
+
+        integer, intent(out) :: high_water_mark
+
+        integer(8), intent(out) :: n_claimed
+
+        integer(8), intent(out) :: n_finalized
+
+        call manager_get_statistics( &
+            capacity, &
+            n_live, &
+            high_water_mark, &
+            n_claimed, &
+            n_finalized &
+            )
+
+    end subroutine get_statistics
+
+    subroutine get_live_instance_indexes( &
+        n, &
+        instance_indexes, &
+        n_live &
+        )
+
+        integer, intent(in) :: n
+        ! Maximum number of indexes to return
+
+        integer, dimension(n), intent(out) :: instance_indexes
+        ! Indexes of the live instances
+
+        integer, intent(out) :: n_live
+        ! Number of live instances.
+        ! If this is greater than ``n``, only ``n`` indexes were returned.
+
+        call manager_get_live_instance_indexes(n, instance_indexes, n_live)
+
+    end subroutine get_live_instance_indexes
+
+    function reserve(capacity) result(success)
+
+        integer, intent(in) :: capacity
+
+        logical :: success
+
+        success = manager_reserve(capacity)
+
+    end function reserve
+
+    ! Getters and setters
+    subroutine iget_base_batch( &
+        n, &
+        instance_indexes, &
+        base &
+        )
+
+        integer, intent(in) :: n
+        ! Number of instances
+
+        integer, dimension(n), intent(in) :: instance_indexes
+        ! Indexes of the instances to get base from
+
+        real(8), dimension(n), intent(out) :: base
+        ! Returning of base for each instance
+
+        type(DerivedType), pointer :: instance
+
+        integer :: i
+
+        !$omp parallel do private(instance) if (n >= min_parallel_batch_size) num_threads(get_num_threads())
+        do i = 1, n
+
+            call manager_get_instance(instance_indexes(i), instance)
+
+            base(i) = instance % base
+
+        end do
+        !$omp end parallel do
+
+    end subroutine iget_base_batch
+
+    subroutine iset_base_batch( &
+        n, &
+        instance_indexes, &
+        base &
+        )
+
+        integer, intent(in) :: n
+        ! Number of instances
+
+        integer, dimension(n), intent(in) :: instance_indexes
+        ! Indexes of the instances to set base on
+
+        real(8), dimension(n), intent(in) :: base
+        ! Passing of base for each instance
+
+        type(DerivedType), pointer :: instance
+
+        integer :: i
+
+        !$omp parallel do private(instance) if (n >= min_parallel_batch_size) num_threads(get_num_threads())
+        do i = 1, n
+
+            call manager_get_instance(instance_indexes(i), instance)
+
+            instance % base = base(i)
+
+        end do
+        !$omp end parallel do
+
+    end subroutine iset_base_batch
+
+    ! Wrapped methods
+    subroutine i_add_batch( &
+        n, &
+        instance_indexes, &
+        others, &
+        outputs &
+        )
+
+        integer, intent(in) :: n
+        ! Number of instances
+
+        integer, dimension(n), intent(in) :: instance_indexes
+        ! Indexes of the instances to add to
+
+        real(8), dimension(n), intent(in) :: others
+        ! Passing of other for each instance
+
+        real(8), dimension(n), intent(out) :: outputs
+        ! Returning of output for each instance
+
+        type(DerivedType), pointer :: instance
+
+        integer :: i
+
+        !$omp parallel do private(instance) if (n >= min_parallel_batch_size) num_threads(get_num_threads())
+        do i = 1, n
+
+            call manager_get_instance(instance_indexes(i), instance)
+
+            outputs(i) = instance % add(others(i))
+
+        end do
+        !$omp end parallel do
+
+    end subroutine i_add_batch
+
+    subroutine i_double_batch( &
+        n, &
+        instance_indexes, &
+        outputs &
+        )
+
+        integer, intent(in) :: n
+        ! Number of instances
+
+        integer, dimension(n), intent(in) :: instance_indexes
+        ! Indexes of the instances to double
+
+        real(8), dimension(n), intent(out) :: outputs
+        ! Returning of output for each instance
+
+        type(DerivedType), pointer :: instance
+
+        integer :: i
+
+        !$omp parallel do private(instance) if (n >= min_parallel_batch_size) num_threads(get_num_threads())
+        do i = 1, n
+
+            call manager_get_instance(instance_indexes(i), instance)
+
+            outputs(i) = instance % double()
+
+        end do
+        !$omp end parallel do
+
+    end subroutine i_double_batch
+
+    ! Deferred operations
+    !
+    ! Run a queue of operations, in order, in a single call.
+    ! Operation ``i`` uses the operands
+    ! ``operands(operand_offsets(i) + 1:operand_offsets(i + 1))``.
+    subroutine i_dispatch( &
+        n, &
+        opcodes, &
+        instance_indexes, &
+        operand_offsets, &
+        n_operands, &
+        operands, &
+        outputs &
+        )
+
+        integer, intent(in) :: n
+        ! Number of operations
+
+        integer, dimension(n), intent(in) :: opcodes
+        ! Opcode of each operation
+
+        integer, dimension(n), intent(in) :: instance_indexes
+        ! Index of the instance each operation is applied to
+
+        integer, dimension(n + 1), intent(in) :: operand_offsets
+        ! Offset of each operation's operands in ``operands``
+
+        integer, intent(in) :: n_operands
+        ! Total number of operands
+
+        real(8), dimension(n_operands), intent(in) :: operands
+        ! Operands of all the operations
+
+        real(8), dimension(n), intent(out) :: outputs
+        ! Returning of the output of each operation
+
+        type(DerivedType), pointer :: instance
+
+        integer :: i
+
+        ! The operations are run in order (not in parallel)
+        ! as later operations may depend on earlier ones
+        do i = 1, n
+
+            call manager_get_instance(instance_indexes(i), instance)
+
+            select case (opcodes(i))
+
+            case (OPCODE_GET_BASE)
+                outputs(i) = instance % base
+
+            case (OPCODE_ADD)
+                outputs(i) = instance % add(operands(operand_offsets(i) + 1))
+
+            case (OPCODE_DOUBLE)
+                outputs(i) = instance % double()
+
+            case default
+                ! Unknown opcode, e.g. the opcodes in Python are out of sync
+                outputs(i) = ieee_value(outputs(i), ieee_quiet_nan)
+
+            end select
+
+        end do
+
+    end subroutine i_dispatch
+
+end module derived_type_bulk_w
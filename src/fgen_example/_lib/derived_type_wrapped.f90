@@ -30,6 +30,7 @@ module derived_type_w
 
     ! Statement declarations for methods
     public :: i_add
+    public :: i_add_batch
     public :: i_double
 
 contains
@@ -146,6 +147,39 @@ contains
 
     end subroutine i_add
 
+    ! Wrapping outputs
+    ! Strategy: WrappingStrategyDefault(
+    !     magnitude_suffix='_m',
+    ! )
+    subroutine i_add_batch( &
+        instance_index, &
+        n, &
+        others, &
+        outputs &
+        )
+
+        integer, intent(in) :: instance_index
+
+        integer, intent(in) :: n
+        ! Passing of n
+
+        real(8), dimension(n), intent(in) :: others
+        ! Passing of others
+
+        real(8), dimension(n), intent(out) :: outputs
+        ! Returning of outputs
+
+        type(DerivedType), pointer :: instance
+
+        call manager_get_instance(instance_index, instance)
+
+        outputs = instance % add_batch( &
+                  n=n, &
+                  others=others &
+                  )
+
+    end subroutine i_add_batch
+
     ! Wrapping output
     ! Strategy: WrappingStrategyDefault(
     !     magnitude_suffix='_m',
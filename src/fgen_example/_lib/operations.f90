@@ -2,6 +2,7 @@
 !       (tracking here https://gitlab.com/magicc/fgen/-/issues/13)
 module operations
    use fgen_base_finalizable, only: BaseFinalizable
+   use parallel, only: min_parallel_batch_size, get_num_threads
 
    implicit none
    private
@@ -16,7 +17,7 @@ module operations
 
       private
 
-      procedure, public :: build, finalize, calc_vec_prod_sum
+      procedure, public :: build, finalize, calc_vec_prod_sum, calc_vec_prod_sum_batch
 
    end type Operator
 
@@ -35,12 +36,13 @@ contains
    function calc_vec_prod_sum(self, a, b) result(vec_prod_sum)
 
       class(Operator), intent(inout) :: self
-      real(8), dimension(3) :: a, b
+      real(8), dimension(:) :: a, b
 
       real(8) :: vec_prod_sum
 
       integer :: i
 
+      ! The wrappers check that a and b have the same size
       vec_prod_sum = 0
 
       do i = 1, size(a)
@@ -53,6 +55,27 @@ contains
 
    end function calc_vec_prod_sum
 
+   function calc_vec_prod_sum_batch(self, n, a, b) result(vec_prod_sums)
+
+      class(Operator), intent(inout) :: self
+
+      integer, intent(in) :: n
+      real(8), dimension(3, n) :: a, b
+
+      real(8), dimension(n) :: vec_prod_sums
+
+      integer :: j
+
+      !$omp parallel do if (n >= min_parallel_batch_size) num_threads(get_num_threads())
+      do j = 1, n
+
+         vec_prod_sums(j) = self%calc_vec_prod_sum(a(:, j), b(:, j))
+
+      end do
+      !$omp end parallel do
+
+   end function calc_vec_prod_sum_batch
+
    subroutine finalize(self)
 
       class(Operator), intent(inout) :: self
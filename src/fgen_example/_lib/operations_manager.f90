@@ -5,42 +5,247 @@
 ! this allows the ``Operator`` derived type
 ! to be exposed to Python.
 !
+! This started life as the manager generated by fgen
+! but is now maintained by hand.
+! The public interface used by ``operations_w`` must be kept
+! consistent with the fgen-generated manager.
+!
+! Instances are stored in a pool which grows geometrically.
+! The pool is made up of blocks.
+! The first block holds ``initial_capacity`` instances
+! and each subsequent block holds as many instances as all the previous blocks combined,
+! hence the capacity doubles each time the pool grows.
+! Existing blocks are never reallocated so instance indexes
+! (and pointers to instances) stay valid when the pool grows.
+!
+! Free instance indexes are kept on a stack,
+! so claiming and releasing an instance takes constant time
+! regardless of how full the pool is.
+! The indexes of the live instances are kept in the same array, after the stack,
+! and each instance records its position in the array.
+! Hence claiming a given index (e.g. when restoring a checkpoint)
+! also takes constant time
+! and the live instances can be listed without scanning the whole pool.
+!
+! The wrapped methods are called without the GIL held,
+! so ``get_instance`` can be called from many threads at once,
+! including while another thread claims or releases instances.
+! The list of blocks has a fixed size
+! and whether each instance is available is stored with the instance's block,
+! so growing the pool never moves anything ``get_instance`` reads.
+! Claiming, releasing and growing are serialised
+! with the ``operations_manager_pool`` critical section
+! (a no-op unless compiled with OpenMP,
+! in which case the GIL no longer serialises them).
+!
+! Statistics about the pool's occupancy
+! (live instances, high-water mark, number of claims and releases)
+! are kept so that leaks can be diagnosed.
+!
 module operations_manager
 
     use operations, only: Operator
-    use fgen_utils, only: &
-        finalize_derived_type_instance_number, &
-        get_derived_type_free_instance_number
 
     implicit none
     private
 
-    integer, parameter :: N_INSTANCES = 4096
+    integer, parameter :: INVALID_INSTANCE_INDEX = -1
+    ! Value used to denote an invalid instance index
+
+    integer, parameter :: DEFAULT_INITIAL_CAPACITY = 4096
+    ! Default number of instances in the first block of the pool
+
+    integer, parameter :: MAX_N_BLOCKS = bit_size(INVALID_INSTANCE_INDEX)
+    ! Maximum number of blocks in the pool
+    !
+    ! As the capacity doubles with each block,
+    ! the capacity would overflow before this is reached.
+
+    type :: OperatorBlock
+        ! Block of instances within the pool
+
+        type(Operator), allocatable, dimension(:) :: instances
+
+        logical, allocatable, dimension(:) :: instance_available
+        ! Whether each instance in the block is available to be claimed
+
+        integer, allocatable, dimension(:) :: free_stack_position
+        ! Position of each instance in the block in ``free_stack``
+
+    end type OperatorBlock
+
+    type(OperatorBlock), target, dimension(MAX_N_BLOCKS) :: blocks
+    ! Blocks which make up the pool
 
-    type(Operator), target, dimension(N_INSTANCES) :: instance_array
-    logical, dimension(N_INSTANCES) :: instance_available = .true.
+    integer :: n_blocks = 0
+    ! Number of blocks which have been allocated
+
+    integer, allocatable, dimension(:) :: free_stack
+    ! Stack of the indexes of the instances which are available to be claimed
+    !
+    ! The top of the stack is ``free_stack(n_free)``.
+    ! The rest of the array, ``free_stack(n_free + 1:capacity)``,
+    ! holds the indexes of the live instances (in no particular order).
+
+    integer :: n_free = 0
+    ! Number of instances which are available to be claimed
+
+    integer :: initial_capacity = DEFAULT_INITIAL_CAPACITY
+    ! Number of instances in the first block of the pool
+
+    integer :: capacity = 0
+    ! Total number of instances in the pool
+
+    integer :: high_water_mark = 0
+    ! Largest number of instances which have been live at the same time
+
+    integer(8) :: n_claimed_total = 0
+    ! Number of instances which have been claimed since the pool was created
+
+    integer(8) :: n_finalized_total = 0
+    ! Number of instances which have been finalised since the pool was created
 
     public :: get_free_instance_number, &
+              get_free_instance_numbers, &
+              claim_instance_numbers, &
               get_instance, &
-              instance_finalize
+              instance_finalize, &
+              instances_finalize, &
+              get_capacity, &
+              get_statistics, &
+              get_live_instance_indexes, &
+              reserve
 
 contains
 
     function get_free_instance_number() result(instance_index)
         ! Get the index of a free instance
+        !
+        ! The pool is grown if there are no free instances.
+        ! If the pool cannot be grown, ``INVALID_INSTANCE_INDEX`` is returned.
 
         integer :: instance_index
         ! Free instance index
 
-        call get_derived_type_free_instance_number( &
-            instance_index, &
-            N_INSTANCES, &
-            instance_available, &
-            instance_array &
-            )
+        instance_index = INVALID_INSTANCE_INDEX
+
+        !$omp critical (operations_manager_pool)
+        if (n_free > 0) then
+            call claim(instance_index)
+        else if (grow(capacity + 1)) then
+            call claim(instance_index)
+        end if
+        !$omp end critical (operations_manager_pool)
 
     end function get_free_instance_number
 
+    subroutine get_free_instance_numbers(n, instance_indexes)
+        ! Get the indexes of many free instances
+        !
+        ! The pool is grown (once) if there are not enough free instances.
+        ! If the pool cannot be grown, no instances are claimed
+        ! and all the returned indexes are ``INVALID_INSTANCE_INDEX``.
+
+        integer, intent(in) :: n
+        ! Number of instances to claim
+
+        integer, dimension(n), intent(out) :: instance_indexes
+        ! Free instance indexes
+
+        integer :: i
+
+        logical :: enough_free
+
+        instance_indexes = INVALID_INSTANCE_INDEX
+
+        !$omp critical (operations_manager_pool)
+        enough_free = n_free >= n
+        if (.not. enough_free) then
+            if (n - n_free <= huge(capacity) - capacity) then
+                enough_free = grow(capacity + n - n_free)
+            end if
+        end if
+
+        if (enough_free) then
+            do i = 1, n
+                call claim(instance_indexes(i))
+            end do
+        end if
+        !$omp end critical (operations_manager_pool)
+
+    end subroutine get_free_instance_numbers
+
+    subroutine claim_instance_numbers(n, instance_indexes, success)
+        ! Claim instances with the given indexes
+        !
+        ! This is used to restore instances with the same indexes they had before
+        ! (e.g. when restoring from a checkpoint).
+        ! The pool is grown if any of the indexes are beyond its capacity.
+        ! If any of the indexes is less than one, repeated or already claimed,
+        ! or the pool cannot be grown, no instances are claimed.
+
+        integer, intent(in) :: n
+        ! Number of instances to claim
+
+        integer, dimension(n), intent(in) :: instance_indexes
+        ! Indexes of the instances to claim
+
+        logical, intent(out) :: success
+        ! Whether the instances were claimed
+
+        type(Operator), pointer :: instance
+
+        integer :: i, n_claimed_now, block_index, index_in_block
+
+        success = .true.
+        if (n == 0) return
+
+        if (minval(instance_indexes) < 1) then
+            success = .false.
+            return
+        end if
+
+        !$omp critical (operations_manager_pool)
+        success = grow(maxval(instance_indexes))
+
+        if (success) then
+            n_claimed_now = 0
+            do i = 1, n
+                call locate(instance_indexes(i), block_index, index_in_block)
+                ! Also catches repeated indexes, as they have just been claimed
+                if (.not. blocks(block_index) % instance_available(index_in_block)) then
+                    success = .false.
+                    exit
+                end if
+
+                blocks(block_index) % instance_available(index_in_block) = .false.
+                n_claimed_now = i
+            end do
+
+            if (success) then
+                ! Move each claimed index from the free stack to the live indexes
+                ! by swapping it with the top of the stack
+                do i = 1, n
+                    call swap_free_stack(get_free_stack_position(instance_indexes(i)), n_free)
+                    n_free = n_free - 1
+
+                    call get_instance_unchecked(instance_indexes(i), instance)
+                    instance % instance_index = instance_indexes(i)
+                end do
+
+                n_claimed_total = n_claimed_total + n
+                high_water_mark = max(high_water_mark, capacity - n_free)
+            else
+                ! Undo the claims made before the failure
+                do i = 1, n_claimed_now
+                    call set_available(instance_indexes(i), .true.)
+                end do
+            end if
+        end if
+        !$omp end critical (operations_manager_pool)
+
+    end subroutine claim_instance_numbers
+
     subroutine get_instance(instance_index, instance_pointer)
         ! Associate a pointer with the instance corresponding to the given model index
         !
@@ -53,7 +258,7 @@ contains
         ! Pointer to associate
 
         call check_index_claimed(instance_index)
-        instance_pointer => instance_array(instance_index)
+        call get_instance_unchecked(instance_index, instance_pointer)
 
     end subroutine get_instance
 
@@ -63,16 +268,406 @@ contains
         integer, intent(in) :: instance_index
         ! Index of the instance to finalise
 
-        call check_index_claimed(instance_index)
-        call finalize_derived_type_instance_number( &
-            instance_index, &
-            N_INSTANCES, &
-            instance_available, &
-            instance_array &
-            )
+        type(Operator), pointer :: instance
+
+        call get_instance(instance_index, instance)
+
+        call instance % finalize()
+
+        !$omp critical (operations_manager_pool)
+        instance % instance_index = INVALID_INSTANCE_INDEX
+        call release(instance_index)
+        n_finalized_total = n_finalized_total + 1
+        !$omp end critical (operations_manager_pool)
 
     end subroutine instance_finalize
 
+    subroutine instances_finalize(n, instance_indexes)
+        ! Finalise many instances
+        !
+        ! The instances are returned to the pool in a single batch,
+        ! i.e. with a single entry into the ``operations_manager_pool``
+        ! critical section.
+
+        integer, intent(in) :: n
+        ! Number of instances to finalise
+
+        integer, dimension(n), intent(in) :: instance_indexes
+        ! Indexes of the instances to finalise
+
+        type(Operator), pointer :: instance
+
+        integer :: i
+
+        do i = 1, n
+            ! This also stops execution if an index appears more than once,
+            ! as its instance index has already been invalidated
+            call get_instance(instance_indexes(i), instance)
+
+            call instance % finalize()
+
+            instance % instance_index = INVALID_INSTANCE_INDEX
+        end do
+
+        !$omp critical (operations_manager_pool)
+        ! Pushed in reverse order so the instances are reclaimed in the order given
+        do i = n, 1, -1
+            call release(instance_indexes(i))
+        end do
+        n_finalized_total = n_finalized_total + n
+        !$omp end critical (operations_manager_pool)
+
+    end subroutine instances_finalize
+
+    function get_capacity() result(current_capacity)
+        ! Get the number of instances the pool can hold without growing
+
+        integer :: current_capacity
+        ! Current capacity of the pool
+
+        current_capacity = capacity
+
+    end function get_capacity
+
+    subroutine get_statistics( &
+        current_capacity, &
+        n_live, &
+        current_high_water_mark, &
+        n_claimed, &
+        n_finalized &
+        )
+        ! Get statistics about the pool's occupancy
+
+        integer, intent(out) :: current_capacity
+        ! Current capacity of the pool
+
+        integer, intent(out) :: n_live
+        ! Number of instances which are currently claimed
+
+        integer, intent(out) :: current_high_water_mark
+        ! Largest number of instances which have been live at the same time
+
+        integer(8), intent(out) :: n_claimed
+        ! Number of instances which have been claimed since the pool was created
+
+        integer(8), intent(out) :: n_finalized
+        ! Number of instances which have been finalised since the pool was created
+
+        !$omp critical (operations_manager_pool)
+        current_capacity = capacity
+        n_live = capacity - n_free
+        current_high_water_mark = high_water_mark
+        n_claimed = n_claimed_total
+        n_finalized = n_finalized_total
+        !$omp end critical (operations_manager_pool)
+
+    end subroutine get_statistics
+
+    subroutine get_live_instance_indexes(n, instance_indexes, n_live)
+        ! Get the indexes of the instances which are currently claimed
+        !
+        ! The indexes are in no particular order.
+        ! If there are more than ``n`` live instances,
+        ! only ``n`` of them are returned,
+        ! so call again with ``n = n_live`` to get them all.
+
+        integer, intent(in) :: n
+        ! Maximum number of indexes to return
+
+        integer, dimension(n), intent(out) :: instance_indexes
+        ! Indexes of the live instances.
+        ! Elements after the first ``min(n, n_live)`` are ``INVALID_INSTANCE_INDEX``.
+
+        integer, intent(out) :: n_live
+        ! Number of live instances
+
+        integer :: n_returned
+
+        instance_indexes = INVALID_INSTANCE_INDEX
+
+        !$omp critical (operations_manager_pool)
+        n_live = capacity - n_free
+        n_returned = min(n, n_live)
+        instance_indexes(1:n_returned) = free_stack(n_free + 1:n_free + n_returned)
+        !$omp end critical (operations_manager_pool)
+
+    end subroutine get_live_instance_indexes
+
+    function reserve(requested_capacity) result(success)
+        ! Grow the pool so that it can hold at least ``requested_capacity`` instances
+        !
+        ! If the pool has not been allocated yet,
+        ! the first block is sized to hold ``requested_capacity`` instances,
+        ! i.e. this sets the pool's initial capacity.
+
+        integer, intent(in) :: requested_capacity
+        ! Number of instances the pool should be able to hold
+
+        logical :: success
+        ! Whether the pool could be grown to the requested capacity
+
+        !$omp critical (operations_manager_pool)
+        if (capacity == 0 .and. requested_capacity > 0) then
+            initial_capacity = requested_capacity
+        end if
+
+        success = grow(requested_capacity)
+        !$omp end critical (operations_manager_pool)
+
+    end function reserve
+
+    subroutine claim(instance_index)
+        ! Claim the instance at the top of the free stack
+        !
+        ! Must only be called from within the ``operations_manager_pool``
+        ! critical section, when there is at least one free instance.
+
+        integer, intent(out) :: instance_index
+        ! Index of the claimed instance
+
+        type(Operator), pointer :: instance
+
+        instance_index = free_stack(n_free)
+        n_free = n_free - 1
+
+        call set_available(instance_index, .false.)
+        call get_instance_unchecked(instance_index, instance)
+        instance % instance_index = instance_index
+
+        n_claimed_total = n_claimed_total + 1
+        high_water_mark = max(high_water_mark, capacity - n_free)
+
+    end subroutine claim
+
+    subroutine release(instance_index)
+        ! Return an instance to the top of the free stack
+        !
+        ! Must only be called from within the ``operations_manager_pool``
+        ! critical section, for a claimed instance.
+
+        integer, intent(in) :: instance_index
+        ! Index of the instance to release
+
+        call set_available(instance_index, .true.)
+
+        ! The first live index is just above the top of the stack
+        n_free = n_free + 1
+        call swap_free_stack(get_free_stack_position(instance_index), n_free)
+
+    end subroutine release
+
+    function grow(requested_capacity) result(success)
+        ! Add blocks to the pool until it can hold ``requested_capacity`` instances
+        !
+        ! Must only be called from within the ``operations_manager_pool``
+        ! critical section.
+
+        integer, intent(in) :: requested_capacity
+        ! Number of instances the pool should be able to hold
+
+        logical :: success
+        ! Whether the pool could be grown to the requested capacity
+
+        integer, allocatable, dimension(:) :: new_free_stack
+
+        integer :: block_size, new_capacity, n_live, i, stat
+
+        success = .true.
+
+        do while (capacity < requested_capacity)
+
+            if (n_blocks == 0) then
+                block_size = initial_capacity
+            else
+                ! Check that the capacity won't overflow
+                if (capacity > huge(capacity) - capacity &
+                    .or. n_blocks == MAX_N_BLOCKS) then
+                    success = .false.
+                    return
+                end if
+
+                block_size = capacity
+            end if
+            new_capacity = capacity + block_size
+
+            associate (new_block => blocks(n_blocks + 1))
+
+                allocate (new_block % instances(block_size), stat=stat)
+                if (stat == 0) then
+                    allocate (new_block % instance_available(block_size), stat=stat)
+                end if
+                if (stat == 0) then
+                    allocate (new_block % free_stack_position(block_size), stat=stat)
+                end if
+                if (stat == 0) then
+                    allocate (new_free_stack(new_capacity), stat=stat)
+                end if
+                if (stat /= 0) then
+                    if (allocated(new_block % instances)) deallocate (new_block % instances)
+                    if (allocated(new_block % instance_available)) then
+                        deallocate (new_block % instance_available)
+                    end if
+                    if (allocated(new_block % free_stack_position)) then
+                        deallocate (new_block % free_stack_position)
+                    end if
+                    success = .false.
+                    return
+                end if
+
+                new_block % instance_available = .true.
+
+            end associate
+
+            ! The live indexes move up to make room for the new instances
+            n_live = capacity - n_free
+            if (n_free > 0) then
+                new_free_stack(1:n_free) = free_stack(1:n_free)
+            end if
+            do i = 1, n_live
+                new_free_stack(new_capacity - n_live + i) = free_stack(n_free + i)
+                call set_free_stack_position(free_stack(n_free + i), new_capacity - n_live + i)
+            end do
+
+            ! The new instances are pushed in reverse order
+            ! so that the lowest indexes are claimed first
+            do i = new_capacity, capacity + 1, -1
+                n_free = n_free + 1
+                new_free_stack(n_free) = i
+                call set_free_stack_position(i, n_free)
+            end do
+            call move_alloc(new_free_stack, free_stack)
+
+            ! Only publish the new block once it is ready to be used
+            n_blocks = n_blocks + 1
+            capacity = new_capacity
+
+        end do
+
+    end function grow
+
+    subroutine get_instance_unchecked(instance_index, instance_pointer)
+        ! Associate a pointer with the instance corresponding to the given model index
+        !
+        ! No checks are performed on ``instance_index``.
+
+        integer, intent(in) :: instance_index
+        ! Index of the instance to point to
+
+        type(Operator), pointer, intent(inout) :: instance_pointer
+        ! Pointer to associate
+
+        integer :: block_index, index_in_block
+
+        call locate(instance_index, block_index, index_in_block)
+        instance_pointer => blocks(block_index) % instances(index_in_block)
+
+    end subroutine get_instance_unchecked
+
+    subroutine set_available(instance_index, available)
+        ! Set whether an instance is available to be claimed
+        !
+        ! No checks are performed on ``instance_index``.
+
+        integer, intent(in) :: instance_index
+        ! Index of the instance
+
+        logical, intent(in) :: available
+        ! Whether the instance is available
+
+        integer :: block_index, index_in_block
+
+        call locate(instance_index, block_index, index_in_block)
+        blocks(block_index) % instance_available(index_in_block) = available
+
+    end subroutine set_available
+
+    function get_free_stack_position(instance_index) result(position)
+        ! Get the position of an instance's index in ``free_stack``
+        !
+        ! No checks are performed on ``instance_index``.
+
+        integer, intent(in) :: instance_index
+        ! Index of the instance
+
+        integer :: position
+        ! Position of the index in ``free_stack``
+
+        integer :: block_index, index_in_block
+
+        call locate(instance_index, block_index, index_in_block)
+        position = blocks(block_index) % free_stack_position(index_in_block)
+
+    end function get_free_stack_position
+
+    subroutine set_free_stack_position(instance_index, position)
+        ! Set the position of an instance's index in ``free_stack``
+        !
+        ! No checks are performed on ``instance_index``.
+
+        integer, intent(in) :: instance_index
+        ! Index of the instance
+
+        integer, intent(in) :: position
+        ! Position of the index in ``free_stack``
+
+        integer :: block_index, index_in_block
+
+        call locate(instance_index, block_index, index_in_block)
+        blocks(block_index) % free_stack_position(index_in_block) = position
+
+    end subroutine set_free_stack_position
+
+    subroutine swap_free_stack(position_a, position_b)
+        ! Swap two entries of ``free_stack``, keeping the instances' positions up to date
+
+        integer, intent(in) :: position_a
+        ! Position of the first entry
+
+        integer, intent(in) :: position_b
+        ! Position of the second entry
+
+        integer :: instance_index_a
+
+        instance_index_a = free_stack(position_a)
+        free_stack(position_a) = free_stack(position_b)
+        free_stack(position_b) = instance_index_a
+
+        call set_free_stack_position(free_stack(position_a), position_a)
+        call set_free_stack_position(free_stack(position_b), position_b)
+
+    end subroutine swap_free_stack
+
+    subroutine locate(instance_index, block_index, index_in_block)
+        ! Find the block which holds an instance and the instance's index within it
+        !
+        ! No checks are performed on ``instance_index``.
+
+        integer, intent(in) :: instance_index
+        ! Index of the instance
+
+        integer, intent(out) :: block_index
+        ! Index of the block which holds the instance
+
+        integer, intent(out) :: index_in_block
+        ! Index of the instance within its block
+
+        integer :: n_preceding_blocks
+
+        ! Block ``k > 1`` holds instances ``initial_capacity * 2 ** (k - 2) + 1``
+        ! to ``initial_capacity * 2 ** (k - 1)``,
+        ! hence the block can be found from the number of bits
+        ! needed to represent ``(instance_index - 1) / initial_capacity``.
+        n_preceding_blocks = (instance_index - 1)/initial_capacity
+        block_index = 1 + bit_size(n_preceding_blocks) - leadz(n_preceding_blocks)
+
+        if (block_index == 1) then
+            index_in_block = instance_index
+        else
+            index_in_block = instance_index - initial_capacity*ishft(1, block_index - 2)
+        end if
+
+    end subroutine locate
+
     subroutine check_index_claimed(instance_index)
         ! Check that an index has already been claimed
         !
@@ -81,10 +676,9 @@ contains
         integer, intent(in) :: instance_index
         ! Instance index to check
 
-        if (instance_available(instance_index)) then
-            print *, "Index ", instance_index, " has not been claimed"
-            error stop 1
-        end if
+        type(Operator), pointer :: instance
+
+        integer :: block_index, index_in_block
 
         if (instance_index < 1) then
             ! TODO: return error code to python
@@ -92,10 +686,24 @@ contains
             error stop 1
         end if
 
-        if (instance_array(instance_index) % instance_index < 1) then
+        if (instance_index > capacity) then
+            ! TODO: return error code to python
+            print *, "Requested index is ", instance_index, &
+                " which is greater than the capacity of the pool ", capacity
+            error stop 1
+        end if
+
+        call locate(instance_index, block_index, index_in_block)
+        if (blocks(block_index) % instance_available(index_in_block)) then
+            print *, "Index ", instance_index, " has not been claimed"
+            error stop 1
+        end if
+
+        call get_instance_unchecked(instance_index, instance)
+        if (instance % instance_index < 1) then
             ! TODO: return error code to python
             print *, "Index ", instance_index, " is associated with an instance that has instance index < 1", &
-                "instance's instance_index attribute ", instance_array(instance_index) % instance_index
+                "instance's instance_index attribute ", instance % instance_index
             error stop 1
         end if
 
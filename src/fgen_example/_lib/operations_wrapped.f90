@@ -30,6 +30,7 @@ module operations_w
 
     ! Statement declarations for methods
     public :: i_calc_vec_prod_sum
+    public :: i_calc_vec_prod_sum_batch
 
 contains
 
@@ -130,10 +131,10 @@ contains
 
         integer, intent(in) :: instance_index
 
-        real(8), dimension(3), intent(in) :: a
+        real(8), dimension(:), intent(in) :: a
         ! Passing of a
 
-        real(8), dimension(3), intent(in) :: b
+        real(8), dimension(:), intent(in) :: b
         ! Passing of b
 
         real(8), intent(out) :: vec_prod_sum
@@ -150,4 +151,42 @@ contains
 
     end subroutine i_calc_vec_prod_sum
 
+    ! Wrapping vec_prod_sums
+    ! Strategy: WrappingStrategyDefault(
+    !     magnitude_suffix='_m',
+    ! )
+    subroutine i_calc_vec_prod_sum_batch( &
+        instance_index, &
+        n, &
+        a, &
+        b, &
+        vec_prod_sums &
+        )
+
+        integer, intent(in) :: instance_index
+
+        integer, intent(in) :: n
+        ! Passing of n
+
+        real(8), dimension(3, n), intent(in) :: a
+        ! Passing of a
+
+        real(8), dimension(3, n), intent(in) :: b
+        ! Passing of b
+
+        real(8), dimension(n), intent(out) :: vec_prod_sums
+        ! Returning of vec_prod_sums
+
+        type(Operator), pointer :: instance
+
+        call manager_get_instance(instance_index, instance)
+
+        vec_prod_sums = instance % calc_vec_prod_sum_batch( &
+                        n=n, &
+                        a=a, &
+                        b=b &
+                        )
+
+    end subroutine i_calc_vec_prod_sum_batch
+
 end module operations_w
@@ -0,0 +1,61 @@
+! Control of the OpenMP parallelism used by the batch kernels.
+!
+! The batch kernels (e.g. ``DerivedType % add_batch``)
+! are parallelised with OpenMP when the extension is built with OpenMP.
+! Small batches are processed serially,
+! as the cost of starting the threads outweighs the benefit.
+! Without OpenMP, everything here is a no-op
+! and the batch kernels always run serially.
+
+module parallel
+!$ use omp_lib, only: omp_get_max_threads
+
+   implicit none
+   private
+
+   integer, parameter :: DEFAULT_MIN_PARALLEL_BATCH_SIZE = 10000
+
+   integer, public :: min_parallel_batch_size = DEFAULT_MIN_PARALLEL_BATCH_SIZE
+   ! Batches with fewer elements than this are processed serially
+
+   integer :: num_threads = 0
+   ! Number of threads used by the batch kernels (zero for OpenMP's default).
+   ! This is passed to every parallel region with a ``num_threads`` clause,
+   ! as ``omp_set_num_threads`` only applies to the thread which calls it,
+   ! so it would be ignored by batch kernels called from other threads.
+
+   public :: openmp_enabled, get_num_threads, set_num_threads
+
+contains
+
+   function openmp_enabled() result(enabled)
+
+      logical :: enabled
+
+      enabled = .false.
+!$    enabled = .true.
+
+   end function openmp_enabled
+
+   function get_num_threads() result(n)
+
+      integer :: n
+
+      n = 1
+!$    if (num_threads > 0) then
+!$       n = num_threads
+!$    else
+!$       n = omp_get_max_threads()
+!$    end if
+
+   end function get_num_threads
+
+   subroutine set_num_threads(n)
+
+      integer, intent(in) :: n
+
+      num_threads = n
+
+   end subroutine set_num_threads
+
+end module parallel
@@ -0,0 +1,68 @@
+!!!
+! Wrapper for ``parallel``
+!
+! Exposes control of the OpenMP parallelism
+! used by the batch kernels to Python.
+!
+! This module is maintained by hand.
+!!!
+module parallel_w
+
+    use parallel, only: &
+        min_parallel_batch_size, &
+        parallel_openmp_enabled => openmp_enabled, &
+        parallel_get_num_threads => get_num_threads, &
+        parallel_set_num_threads => set_num_threads
+
+    implicit none
+    private
+
+    public :: openmp_enabled, &
+              get_num_threads, &
+              set_num_threads, &
+              get_min_parallel_batch_size, &
+              set_min_parallel_batch_size
+
+contains
+
+    function openmp_enabled() result(enabled)
+
+        logical :: enabled
+
+        enabled = parallel_openmp_enabled()
+
+    end function openmp_enabled
+
+    function get_num_threads() result(num_threads)
+
+        integer :: num_threads
+
+        num_threads = parallel_get_num_threads()
+
+    end function get_num_threads
+
+    subroutine set_num_threads(num_threads)
+
+        integer, intent(in) :: num_threads
+
+        call parallel_set_num_threads(num_threads)
+
+    end subroutine set_num_threads
+
+    function get_min_parallel_batch_size() result(batch_size)
+
+        integer :: batch_size
+
+        batch_size = min_parallel_batch_size
+
+    end function get_min_parallel_batch_size
+
+    subroutine set_min_parallel_batch_size(batch_size)
+
+        integer, intent(in) :: batch_size
+
+        min_parallel_batch_size = batch_size
+
+    end subroutine set_min_parallel_batch_size
+
+end module parallel_w
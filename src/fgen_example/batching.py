@@ -0,0 +1,349 @@
+"""
+Micro-batching of single-value calls for asyncio applications
+
+In an asyncio service, many coroutines may each want to make a single call,
+e.g. :meth:`DerivedType.add <fgen_example.derived_type.DerivedType.add>`,
+at about the same time.
+Making each of these calls separately means paying
+the cost of crossing the Python-Fortran boundary once per call.
+The batchers here instead collect the calls which arrive
+within a short time window (or until a maximum batch size is reached)
+and make a single batched call to Fortran,
+then resolve each caller's future with its result.
+
+Callers simply ``await`` the batcher's method
+instead of calling the instance's method, e.g.
+
+.. code-block:: python
+
+    batcher = DerivedTypeBatcher(derived_type)
+    res = await batcher.add(Q(3, "m"))
+
+The batched call is made in the event loop's default executor,
+so the event loop isn't blocked while it runs.
+The wrapped Fortran routines release the GIL,
+so the event loop keeps running other coroutines in the meantime.
+
+If a batched call raises, e.g. because one of the calls had invalid arguments,
+the calls in the batch are retried one at a time,
+so each caller only gets the exception raised for its own call.
+"""
+from __future__ import annotations
+
+import asyncio
+import functools
+from collections.abc import Sequence
+from typing import Any, Callable, Generic, TypeVar
+
+import numpy as np
+import numpy.typing as npt
+import pint
+from attrs import define, field, validators
+
+from fgen_example.derived_type import _UNITS as _DERIVED_TYPE_UNITS
+from fgen_example.derived_type import DerivedType, DerivedTypeNoSetters
+from fgen_example.operations import _UNITS as _OPERATIONS_UNITS
+from fgen_example.operations import Operator, OperatorNoSetters
+from fgen_example.units import get_magnitude_converter
+
+ArgT = TypeVar("ArgT")
+ResultT = TypeVar("ResultT")
+
+DEFAULT_MAX_BATCH_SIZE: int = 1024
+"""Default maximum number of calls to combine into a single batch"""
+
+DEFAULT_MAX_DELAY: float = 1e-3
+"""Default maximum time (in seconds) a call waits for others to join its batch"""
+
+
+@define
+class MicroBatcher(Generic[ArgT, ResultT]):
+    """
+    Collect individual calls and process them in batches
+
+    A batch is processed once either ``max_batch_size`` calls
+    have been collected or ``max_delay`` seconds have passed
+    since the first call in the batch was submitted,
+    whichever happens first.
+    """
+
+    batch_func: Callable[[list[ArgT]], Sequence[ResultT] | npt.NDArray[Any]]
+    """
+    Function which processes a batch
+
+    It receives the submitted arguments, in the order they were submitted,
+    and must return one result per argument.
+    """
+
+    max_batch_size: int = field(default=DEFAULT_MAX_BATCH_SIZE, validator=validators.ge(1))
+    """Maximum number of calls to combine into a single batch"""
+
+    max_delay: float = field(default=DEFAULT_MAX_DELAY, validator=validators.ge(0))
+    """
+    Maximum time (in seconds) a call waits for others to join its batch
+
+    If zero, the calls submitted in the same iteration of the event loop
+    are batched together.
+    """
+
+    _pending: list[tuple[ArgT, asyncio.Future[ResultT]]] = field(factory=list, init=False)
+    _timer: asyncio.TimerHandle | None = field(default=None, init=False)
+
+    async def submit(self, arg: ArgT) -> ResultT:
+        """
+        Submit a call and wait for its result
+
+        Parameters
+        ----------
+        arg
+            Argument for the call
+
+        Returns
+        -------
+            Result of the call
+
+        Raises
+        ------
+        Exception
+            Any exception raised by :attr:`batch_func` for this call.
+            If :attr:`batch_func` raises for a batch,
+            each call in the batch is retried on its own,
+            so other calls in the batch are not affected.
+        """
+        loop = asyncio.get_running_loop()
+        future: asyncio.Future[ResultT] = loop.create_future()
+        self._pending.append((arg, future))
+
+        if len(self._pending) >= self.max_batch_size:
+            self.flush()
+        elif self._timer is None:
+            self._timer = loop.call_later(self.max_delay, self.flush)
+
+        return await future
+
+    def flush(self) -> None:
+        """
+        Process all the pending calls now
+
+        The batch is processed in the event loop's default executor.
+        The callers' futures are resolved once it has been processed.
+        """
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+
+        pending, self._pending = self._pending, []
+        if not pending:
+            return
+
+        loop = pending[0][1].get_loop()
+        processed = loop.run_in_executor(None, self._process, [arg for arg, _ in pending])
+        processed.add_done_callback(functools.partial(_resolve, [future for _, future in pending]))
+
+    def _process(self, args: list[ArgT]) -> list[tuple[Any, BaseException | None]]:
+        """
+        Process a batch, retrying its calls one at a time if the batch fails
+
+        Returns
+        -------
+            Result and exception (one of which is ``None``) for each call
+        """
+        try:
+            results = self.batch_func(args)
+        except Exception as exc:
+            if len(args) == 1:
+                return [(None, exc)]
+
+            # Isolate the calls from each other,
+            # so one invalid call doesn't fail the others
+            return [self._process([arg])[0] for arg in args]
+
+        if len(results) != len(args):
+            error = ValueError(f"batch_func returned {len(results)} results for {len(args)} calls")
+
+            return [(None, error)] * len(args)
+
+        return [(result, None) for result in results]
+
+
+@define
+class DerivedTypeBatcher:
+    """
+    Micro-batching front end for :class:`~fgen_example.derived_type.DerivedType`
+    """
+
+    instance: DerivedType | DerivedTypeNoSetters
+    """Instance on which to make the calls"""
+
+    max_batch_size: int = field(default=DEFAULT_MAX_BATCH_SIZE, validator=validators.ge(1))
+    """Maximum number of calls to combine into a single batch"""
+
+    max_delay: float = field(default=DEFAULT_MAX_DELAY, validator=validators.ge(0))
+    """Maximum time (in seconds) a call waits for others to join its batch"""
+
+    _add: MicroBatcher[float, float] = field(init=False)
+    _to_other_m: Callable[[Any], Any] = field(init=False)
+
+    def __attrs_post_init__(self) -> None:
+        """
+        Set up the batchers for each method
+        """
+        self._add = MicroBatcher(self._add_batch, self.max_batch_size, self.max_delay)
+        self._to_other_m = get_magnitude_converter(_DERIVED_TYPE_UNITS["other"], name="other")
+
+    def _add_batch(self, others: list[float]) -> npt.NDArray[np.float64]:
+        return self.instance.add_batch_m(np.array(others, dtype=np.float64))
+
+    async def add(self, other: pint.Quantity[Any]) -> pint.Quantity[Any]:
+        """
+        Batched version of :meth:`DerivedType.add`
+
+        Parameters
+        ----------
+        other
+            Quantity to add
+
+        Returns
+        -------
+            Sum of `self.base` and `other`
+        """
+        return _quantity(
+            await self.add_m(self._to_other_m(other)),
+            _DERIVED_TYPE_UNITS["output"],
+        )
+
+    async def add_m(self, other: float) -> float:
+        """
+        Batched version of :meth:`DerivedType.add_m`
+
+        No unit handling is performed.
+        `other` and the returned value are magnitudes in ``m``.
+        """
+        return await self._add.submit(other)
+
+    def flush(self) -> None:
+        """
+        Process all the pending calls now
+        """
+        self._add.flush()
+
+
+@define
+class OperatorBatcher:
+    """
+    Micro-batching front end for :class:`~fgen_example.operations.Operator`
+
+    Calls with 3-element vectors are processed with a single call to
+    :meth:`Operator.calc_vec_prod_sum_batch_m`.
+    If any call in a batch uses vectors of a different length,
+    the batch falls back to one :meth:`Operator.calc_vec_prod_sum_m` per call.
+    """
+
+    instance: Operator | OperatorNoSetters
+    """Instance on which to make the calls"""
+
+    max_batch_size: int = field(default=DEFAULT_MAX_BATCH_SIZE, validator=validators.ge(1))
+    """Maximum number of calls to combine into a single batch"""
+
+    max_delay: float = field(default=DEFAULT_MAX_DELAY, validator=validators.ge(0))
+    """Maximum time (in seconds) a call waits for others to join its batch"""
+
+    _calc_vec_prod_sum: MicroBatcher[tuple[npt.NDArray[np.float64], npt.NDArray[np.float64]], float] = field(
+        init=False
+    )
+    _to_a_m: Callable[[Any], Any] = field(init=False)
+    _to_b_m: Callable[[Any], Any] = field(init=False)
+
+    def __attrs_post_init__(self) -> None:
+        """
+        Set up the batchers for each method
+        """
+        self._calc_vec_prod_sum = MicroBatcher(
+            self._calc_vec_prod_sum_batch, self.max_batch_size, self.max_delay
+        )
+        self._to_a_m = get_magnitude_converter(_OPERATIONS_UNITS["a"], name="a")
+        self._to_b_m = get_magnitude_converter(_OPERATIONS_UNITS["b"], name="b")
+
+    def _calc_vec_prod_sum_batch(
+        self,
+        args: list[tuple[npt.NDArray[np.float64], npt.NDArray[np.float64]]],
+    ) -> Sequence[float] | npt.NDArray[np.float64]:
+        a = [np.asarray(a_i, dtype=np.float64) for a_i, _ in args]
+        b = [np.asarray(b_i, dtype=np.float64) for _, b_i in args]
+
+        if all(v.shape == (3,) for v in (*a, *b)):
+            out: npt.NDArray[np.float64] = self.instance.calc_vec_prod_sum_batch_m(np.stack(a), np.stack(b))
+
+            return out
+
+        return [self.instance.calc_vec_prod_sum_m(a_i, b_i) for a_i, b_i in zip(a, b)]
+
+    async def calc_vec_prod_sum(self, a: pint.Quantity[Any], b: pint.Quantity[Any]) -> pint.Quantity[Any]:
+        """
+        Batched version of :meth:`Operator.calc_vec_prod_sum`
+
+        Parameters
+        ----------
+        a
+            First vector
+
+        b
+            Second vector
+
+        Returns
+        -------
+            Weighted sum of the element-wise product of `a` and `b`
+        """
+        return _quantity(
+            await self.calc_vec_prod_sum_m(self._to_a_m(a), self._to_b_m(b)),
+            _OPERATIONS_UNITS["vec_prod_sum"],
+        )
+
+    async def calc_vec_prod_sum_m(self, a: npt.NDArray[np.float64], b: npt.NDArray[np.float64]) -> float:
+        """
+        Batched version of :meth:`Operator.calc_vec_prod_sum_m`
+
+        No unit handling is performed.
+        `a`, `b` and the returned value are dimensionless magnitudes.
+        """
+        return await self._calc_vec_prod_sum.submit((a, b))
+
+    def flush(self) -> None:
+        """
+        Process all the pending calls now
+        """
+        self._calc_vec_prod_sum.flush()
+
+
+def _resolve(
+    futures: list[asyncio.Future[Any]],
+    processed: asyncio.Future[list[tuple[Any, BaseException | None]]],
+) -> None:
+    """
+    Resolve each caller's future with the outcome of its call
+    """
+    for i, future in enumerate(futures):
+        # The caller may have stopped waiting (e.g. been cancelled)
+        if future.done():
+            continue
+
+        if processed.cancelled():
+            future.cancel()
+        elif (batch_exc := processed.exception()) is not None:
+            future.set_exception(batch_exc)
+        else:
+            result, exc = processed.result()[i]
+            if exc is not None:
+                future.set_exception(exc)
+            else:
+                future.set_result(result)
+
+
+def _quantity(magnitude: Any, units: str) -> pint.Quantity[Any]:
+    """
+    Attach units to a magnitude
+    """
+    ureg = pint.get_application_registry()  # type: ignore
+    out: pint.Quantity[Any] = ureg.Quantity(magnitude, "" if units == "dimensionless" else units)
+
+    return out
@@ -0,0 +1,272 @@
+"""
+Checkpointing of the instance pools
+
+:func:`save_checkpoint` writes the state of every live instance
+(of every wrapped derived type) to a binary file.
+:func:`load_checkpoint` restores the instances from such a file,
+with the same instance indexes,
+so any instance indexes stored elsewhere (e.g. in a simulation's own state)
+remain valid.
+
+.. code-block:: python
+
+    from fgen_example import checkpoint
+
+    checkpoint.save_checkpoint("state.fgenckpt")
+
+    # Later, e.g. in a new process
+    restored = checkpoint.load_checkpoint("state.fgenckpt")
+    restored["DerivedType"].base
+
+File format
+    All values are little-endian.
+    The file starts with a header,
+    made up of an 8-byte magic string (``FGENCKPT``),
+    the format version (``uint32``) and the number of sections (``uint32``).
+    This is followed by a table of sections.
+    Each entry in the table holds a type tag (``uint32``),
+    four bytes of padding
+    and the number of instances in the section (``uint64``).
+    The sections follow, in the same order as the table.
+    Each holds the instance indexes (``int32``),
+    padded to a multiple of eight bytes,
+    then the attribute value of each instance (``float64``).
+
+    Each section's arrays are contiguous and aligned,
+    so they are read with :class:`numpy.memmap`
+    and passed to Fortran without being copied.
+    Restoring a type takes a single call to Fortran
+    and needs no work in Python per instance.
+"""
+from __future__ import annotations
+
+import os
+import tempfile
+from pathlib import Path
+from types import ModuleType
+from typing import Any, Union
+
+import numpy as np
+import numpy.typing as npt
+
+from fgen_example import derived_type, operations
+
+MAGIC: bytes = b"FGENCKPT"
+"""Magic string at the start of every checkpoint file"""
+
+FORMAT_VERSION: int = 1
+"""Version of the checkpoint file format written by this module"""
+
+TYPE_TAGS: dict[str, int] = {
+    "DerivedType": 1,
+    "Operator": 2,
+}
+"""Tag used to identify each derived type in checkpoint files"""
+
+_WRAPPER_MODULES: dict[str, ModuleType] = {
+    "DerivedType": derived_type,
+    "Operator": operations,
+}
+
+_HEADER_DTYPE = np.dtype(
+    [
+        ("magic", "S8"),
+        ("version", "<u4"),
+        ("n_sections", "<u4"),
+    ]
+)
+
+_SECTION_DTYPE = np.dtype(
+    [
+        ("type_tag", "<u4"),
+        ("padding", "<u4"),
+        ("n", "<u8"),
+    ]
+)
+
+_INDEX_DTYPE = np.dtype("<i4")
+_VALUE_DTYPE = np.dtype("<f8")
+_ALIGNMENT = _VALUE_DTYPE.itemsize
+
+PathLike = Union[str, os.PathLike[str]]
+
+
+def save_checkpoint(path: PathLike) -> None:
+    """
+    Save the state of every live instance to a checkpoint file
+
+    The state of each derived type's instances is retrieved
+    with a single call to Fortran (see e.g.
+    :func:`fgen_example.derived_type.export_instances`).
+    The file is written to a temporary file (in the same directory) first,
+    then moved into place,
+    so an existing checkpoint is never left partly overwritten.
+
+    Parameters
+    ----------
+    path
+        Path of the checkpoint file
+    """
+    path = Path(path)
+    sections = {type_name: module.export_instances_m() for type_name, module in _WRAPPER_MODULES.items()}
+
+    header = np.zeros(1, dtype=_HEADER_DTYPE)
+    header["magic"] = MAGIC
+    header["version"] = FORMAT_VERSION
+    header["n_sections"] = len(sections)
+
+    table = np.zeros(len(sections), dtype=_SECTION_DTYPE)
+    for i, (type_name, (instance_indexes, _)) in enumerate(sections.items()):
+        table[i]["type_tag"] = TYPE_TAGS[type_name]
+        table[i]["n"] = instance_indexes.size
+
+    # A unique name, so concurrent saves (or an unrelated file) aren't clobbered
+    with tempfile.NamedTemporaryFile(
+        dir=path.parent, prefix=f"{path.name}.", suffix=".tmp", delete=False
+    ) as fh:
+        try:
+            fh.write(header.tobytes())
+            fh.write(table.tobytes())
+            for instance_indexes, values in sections.values():
+                instance_indexes.astype(_INDEX_DTYPE, copy=False).tofile(fh.file)
+                fh.write(_get_padding(instance_indexes.size * _INDEX_DTYPE.itemsize))
+                values.astype(_VALUE_DTYPE, copy=False).tofile(fh.file)
+        except BaseException:
+            fh.close()
+            os.remove(fh.name)
+            raise
+
+    os.replace(fh.name, path)
+
+
+def read_checkpoint(
+    path: PathLike,
+) -> dict[str, tuple[npt.NDArray[np.int32], npt.NDArray[np.float64]]]:
+    """
+    Read a checkpoint file, without restoring any instances
+
+    The arrays are memory-mapped,
+    so they are only read from disk as they are used.
+
+    Parameters
+    ----------
+    path
+        Path of the checkpoint file
+
+    Returns
+    -------
+        For each derived type in the checkpoint,
+        the instance indexes and attribute values (as magnitudes)
+        of its instances
+
+    Raises
+    ------
+    ValueError
+        The file is not a checkpoint file written by a supported format version
+    """
+    header = np.fromfile(path, dtype=_HEADER_DTYPE, count=1)
+    if header.size != 1 or header["magic"][0] != MAGIC:
+        raise ValueError(f"{path} is not a checkpoint file")  # noqa: TRY003
+
+    version = int(header["version"][0])
+    if version != FORMAT_VERSION:
+        raise ValueError(  # noqa: TRY003
+            f"{path} has checkpoint format version {version}, only version {FORMAT_VERSION} is supported"
+        )
+
+    n_sections = int(header["n_sections"][0])
+    table = np.fromfile(path, dtype=_SECTION_DTYPE, count=n_sections, offset=_HEADER_DTYPE.itemsize)
+    if table.size != n_sections:
+        raise ValueError(f"{path} is truncated")  # noqa: TRY003
+
+    type_names = {v: k for k, v in TYPE_TAGS.items()}
+    file_size = os.path.getsize(path)
+    offset = _HEADER_DTYPE.itemsize + table.nbytes
+
+    out = {}
+    for type_tag, n_instances in zip(table["type_tag"], table["n"]):
+        if type_tag not in type_names:
+            raise ValueError(  # noqa: TRY003
+                f"{path} contains an unknown type tag: {type_tag}"
+            )
+
+        n = int(n_instances)
+        indexes_nbytes = n * _INDEX_DTYPE.itemsize
+        values_offset = offset + indexes_nbytes + len(_get_padding(indexes_nbytes))
+        end = values_offset + n * _VALUE_DTYPE.itemsize
+        if end > file_size:
+            raise ValueError(f"{path} is truncated")  # noqa: TRY003
+
+        out[type_names[type_tag]] = (
+            _memmap(path, _INDEX_DTYPE, offset, n),
+            _memmap(path, _VALUE_DTYPE, values_offset, n),
+        )
+        offset = end
+
+    return out
+
+
+def load_checkpoint(path: PathLike) -> dict[str, Any]:
+    """
+    Restore the instances saved in a checkpoint file
+
+    The instances are restored with the same instance indexes they had when saved,
+    with one call to Fortran per derived type
+    (see e.g. :func:`fgen_example.derived_type.import_instances`).
+    None of these indexes can be in use
+    (e.g. load the checkpoint before creating any other instances).
+
+    Parameters
+    ----------
+    path
+        Path of the checkpoint file
+
+    Returns
+    -------
+        The restored instances of each derived type
+        (e.g. a :class:`fgen_example.derived_type.DerivedTypeArray`
+        for ``"DerivedType"``)
+
+    Raises
+    ------
+    ValueError
+        The file is not a valid checkpoint file
+        or some of the instance indexes are already in use.
+        In the latter case, no instances are restored.
+    """
+    restored: dict[str, Any] = {}
+    try:
+        for type_name, (instance_indexes, values) in read_checkpoint(path).items():
+            # The values are passed to Fortran straight from the memory map.
+            # The restored collection keeps its own copy of the indexes,
+            # rather than a view which would keep the file mapped.
+            restored[type_name] = _WRAPPER_MODULES[type_name].import_instances_m(
+                np.array(instance_indexes), values
+            )
+    except BaseException:
+        # Release the types which were restored before the failure,
+        # so the checkpoint is either restored completely or not at all
+        for restored_instances in restored.values():
+            restored_instances.finalize()
+
+        raise
+
+    return restored
+
+
+def _get_padding(nbytes: int) -> bytes:
+    """
+    Get the padding needed after ``nbytes`` bytes to keep the next array aligned
+    """
+    return bytes(-nbytes % _ALIGNMENT)
+
+
+def _memmap(path: PathLike, dtype: np.dtype[Any], offset: int, n: int) -> npt.NDArray[Any]:
+    """
+    Memory-map an array in a checkpoint file
+    """
+    if n == 0:
+        # Zero-length memory maps aren't supported
+        return np.empty(0, dtype=dtype)
+
+    return np.memmap(path, dtype=dtype, mode="r", offset=offset, shape=(n,))
@@ -0,0 +1,292 @@
+"""
+Deferred operations, run with a single call to Fortran
+
+A chatty sequence of calls on an instance, e.g.
+
+.. code-block:: python
+
+    total = dt.add(Q(3, "m"))
+    doubled = dt.double()
+    base = dt.base
+
+crosses the Python-Fortran boundary (and handles units) once per call.
+Instead, the calls can be queued and run together
+when a ``with`` block exits, e.g.
+
+.. code-block:: python
+
+    with dt.batch() as batch:
+        total = batch.add(Q(3, "m"))
+        doubled = batch.double()
+        base = batch.get_base()
+
+    total.value
+
+Each queued call returns a :class:`DeferredResult`,
+whose value is available once the queue has been run.
+On exit, the queued operations are encoded as an array of opcodes
+and a buffer holding all their operands.
+These are passed to a single Fortran dispatch routine,
+which runs the operations in order
+and returns the outputs of all the operations in one array
+(see :attr:`OperationQueue.results`).
+
+If the block exits with an exception, the queued operations are discarded.
+
+The queues for each derived type are defined alongside its wrappers
+(e.g. :class:`fgen_example.derived_type.DerivedTypeOperationQueue`).
+"""
+from __future__ import annotations
+
+import abc
+from collections.abc import Sequence
+from types import TracebackType
+from typing import Any, ClassVar, TypeVar
+
+import numpy as np
+import numpy.typing as npt
+import pint
+from attrs import define, field
+from fgen_runtime.exceptions import InitialisationError
+
+QueueT = TypeVar("QueueT", bound="OperationQueue")
+
+
+@define(eq=False)
+class DeferredResult:
+    """
+    Result of an operation in an :class:`OperationQueue`
+
+    The value is only available once the queue has been run.
+    """
+
+    queue: OperationQueue
+    """Queue holding the operation"""
+
+    position: int
+    """Position of the operation in the queue"""
+
+    @property
+    def done(self) -> bool:
+        """
+        Has the operation been run?
+        """
+        return self.queue.done
+
+    @property
+    def value(self) -> pint.Quantity[Any]:
+        """
+        Output of the operation
+
+        Raises
+        ------
+        RuntimeError
+            The queue has not been run
+        """
+        value: pint.Quantity[Any] = self.queue.results[self.position]
+
+        return value
+
+    @property
+    def value_m(self) -> float:
+        """
+        Magnitude-only version of :attr:`value`
+
+        The value is a magnitude in the queue's :attr:`~OperationQueue.units`.
+        """
+        return float(self.queue.results_m[self.position])
+
+
+@define(eq=False)
+class OperationQueue(abc.ABC):
+    """
+    Queue of operations on an instance, run with a single call to Fortran
+
+    The queues for each derived type subclass this,
+    adding a method to queue each operation
+    and implementing the abstract :meth:`_dispatch`.
+    """
+
+    units: ClassVar[str] = "dimensionless"
+    """Units of the outputs of the operations"""
+
+    instance: Any
+    """Wrapper of the instance the operations are applied to"""
+
+    _opcodes: list[int] = field(factory=list, init=False)
+    _operands: list[float] = field(factory=list, init=False)
+    _operand_offsets: list[int] = field(factory=lambda: [0], init=False)
+    _results_m: npt.NDArray[np.float64] | None = field(default=None, init=False)
+    _discarded: bool = field(default=False, init=False)
+
+    def __len__(self) -> int:
+        """
+        Get the number of queued operations
+        """
+        return len(self._opcodes)
+
+    @property
+    def done(self) -> bool:
+        """
+        Has the queue been run?
+        """
+        return self._results_m is not None
+
+    @property
+    def results(self) -> pint.Quantity[Any]:
+        """
+        Output of each operation, in the order the operations were queued
+
+        Raises
+        ------
+        RuntimeError
+            The queue has not been run
+        """
+        ureg: Any = pint.get_application_registry()  # type: ignore
+        results: pint.Quantity[Any] = ureg.Quantity(self.results_m, self.units)
+
+        return results
+
+    @property
+    def results_m(self) -> npt.NDArray[np.float64]:
+        """
+        Magnitude-only version of :attr:`results`
+
+        The values are magnitudes in :attr:`units`.
+        """
+        if self._results_m is None:
+            raise RuntimeError(self._get_not_run_message())
+
+        return self._results_m
+
+    def run(self) -> npt.NDArray[np.float64]:
+        """
+        Run the queued operations
+
+        All the operations are run, in order, with a single call to Fortran.
+        This is called automatically when the queue is used as a context manager.
+
+        Returns
+        -------
+            Output of each operation (as magnitudes), see :attr:`results_m`
+
+        Raises
+        ------
+        RuntimeError
+            The queue has already been run or has been discarded
+
+        InitialisationError
+            The instance has been finalised since the operations were queued
+        """
+        self._check_open()
+        if not self.instance.initialized:
+            raise InitialisationError(self.instance, self.run)
+
+        n = len(self)
+        if n == 0:
+            self._results_m = np.empty(0, dtype=np.float64)
+        else:
+            self._results_m = self._dispatch(
+                opcodes=np.array(self._opcodes, dtype=np.int32),
+                instance_indexes=np.full(n, self.instance.instance_index, dtype=np.int32),
+                operand_offsets=np.array(self._operand_offsets, dtype=np.int32),
+                operands=np.array(self._operands, dtype=np.float64),
+            )
+
+        return self._results_m
+
+    def discard(self) -> None:
+        """
+        Discard the queued operations, without running them
+
+        This is called automatically if the ``with`` block
+        in which the queue is used exits with an exception.
+        """
+        self._check_open()
+        self._discarded = True
+
+    def __enter__(self: QueueT) -> QueueT:
+        return self
+
+    def __exit__(
+        self,
+        exc_type: type[BaseException] | None,
+        exc_value: BaseException | None,
+        traceback: TracebackType | None,
+    ) -> None:
+        if exc_type is None:
+            self.run()
+        else:
+            self.discard()
+
+    def _queue(self, opcode: int, operands: Sequence[float] = ()) -> DeferredResult:
+        """
+        Add an operation to the queue
+
+        Parameters
+        ----------
+        opcode
+            Opcode of the operation in the Fortran dispatch routine
+
+        operands
+            Operands of the operation
+
+        Returns
+        -------
+            Result of the operation, available once the queue has been run
+        """
+        self._check_open()
+        self._opcodes.append(opcode)
+        self._operands.extend(operands)
+        self._operand_offsets.append(len(self._operands))
+
+        return DeferredResult(self, len(self._opcodes) - 1)
+
+    @abc.abstractmethod
+    def _dispatch(
+        self,
+        opcodes: npt.NDArray[np.int32],
+        instance_indexes: npt.NDArray[np.int32],
+        operand_offsets: npt.NDArray[np.int32],
+        operands: npt.NDArray[np.float64],
+    ) -> npt.NDArray[np.float64]:
+        """
+        Run operations with the derived type's Fortran dispatch routine
+
+        Parameters
+        ----------
+        opcodes
+            Opcode of each operation
+
+        instance_indexes
+            Index of the instance each operation is applied to
+
+        operand_offsets
+            Offset of each operation's operands in `operands`,
+            followed by the total number of operands
+
+        operands
+            Operands of all the operations
+
+        Returns
+        -------
+            Output of each operation
+        """
+
+    def _check_open(self) -> None:
+        """
+        Check that operations can still be queued, i.e. the queue hasn't been run
+        """
+        if self._discarded or self.done:
+            raise RuntimeError(  # noqa: TRY003
+                f"The queue has already been {'discarded' if self._discarded else 'run'}"
+            )
+
+    def _get_not_run_message(self) -> str:
+        """
+        Get the error message for accessing results before the queue has been run
+        """
+        if self._discarded:
+            return "The queue was discarded, so its operations were not run"
+
+        return "The queue has not been run yet"
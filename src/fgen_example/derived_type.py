@@ -6,9 +6,12 @@ around the Fortran module ``derived_type``.
 """
 from __future__ import annotations
 
-from typing import Any
+from collections.abc import Sequence
+from typing import Any, Callable, ClassVar, TypeVar, cast
 
 import fgen_runtime.exceptions as fgr_excs
+import numpy as np
+import numpy.typing as npt
 from attrs import define
 from fgen_runtime.base import (
     INVALID_INSTANCE_INDEX,
@@ -17,18 +20,35 @@ from fgen_runtime.base import (
     check_initialised,
     execute_finalize_on_fail,
 )
-from fgen_runtime.units import verify_units
+from fgen_runtime.exceptions import InitialisationError
 
-try:
-    from fgen_example._lib import derived_type_w  # type: ignore
-except (ModuleNotFoundError, ImportError) as exc:
-    raise fgr_excs.CompiledExtensionNotFoundError("fgen_example._lib") from exc
+from fgen_example import instrumentation, pool
+from fgen_example._extension import LazyExtensionModule
+from fgen_example.deferred import DeferredResult, OperationQueue
+from fgen_example.units import verify_units
+
+# The compiled extension is only loaded when it is first used
+derived_type_bulk_w: Any = LazyExtensionModule("derived_type_bulk_w", globals())
+derived_type_w: Any = LazyExtensionModule("derived_type_w", globals())
+
+InstanceT = TypeVar("InstanceT", bound=FinalizableWrapperBase)
 
 _UNITS: dict[str, str] = {
     "base": "m",
     "other": "m",
     "output": "m",
+    "others": "m",
+    "outputs": "m",
+}
+
+_OPCODES: dict[str, int] = {
+    "get_base": 1,
+    "add": 2,
+    "double": 3,
 }
+"""Opcodes of the deferred operations, as used by ``derived_type_bulk_w``"""
+
+_LEAK_TRACKER = pool.get_leak_tracker("DerivedType")
 
 
 @define
@@ -82,7 +102,19 @@ class DerivedType(FinalizableWrapperBase):
         --------
         :meth:`DerivedTypeContext.from_build_args`
         """
+        return cls.from_build_args_m(base)
+
+    @classmethod
+    def from_build_args_m(
+        cls,
+        base: float,
+    ) -> DerivedType:
+        """
+        Magnitude-only version of :meth:`from_build_args`
 
+        No unit handling is performed.
+        `base` is a magnitude in ``m``.
+        """
         out = cls.from_new_connection()
         execute_finalize_on_fail(
             out,
@@ -92,6 +124,56 @@ class DerivedType(FinalizableWrapperBase):
 
         return out
 
+    @classmethod
+    @verify_units(
+        None,
+        (
+            None,
+            _UNITS["base"],
+        ),
+    )
+    def from_build_args_batch(
+        cls,
+        base: npt.NDArray[np.float64],
+    ) -> list[DerivedType]:
+        """
+        Initialise many instances from build arguments
+
+        The instances are claimed and built with a single call to Fortran.
+        The user is responsible for releasing the connections
+        using :func:`finalize_many` (or :attr:`~finalize`)
+        when they are no longer needed.
+
+        Parameters
+        ----------
+        base
+            Base value for each instance (1D)
+
+        Returns
+        -------
+            Built (i.e. linked to Fortran and initialised)
+            :obj:`DerivedType`, one per element of `base`
+
+        Raises
+        ------
+        WrapperErrorUnknownCause
+            If the new instances could not be allocated
+        """
+        return cls.from_build_args_batch_m(base)
+
+    @classmethod
+    def from_build_args_batch_m(
+        cls,
+        base: npt.NDArray[np.float64],
+    ) -> list[DerivedType]:
+        """
+        Magnitude-only version of :meth:`from_build_args_batch`
+
+        No unit handling is performed.
+        `base` is an array of magnitudes in ``m``.
+        """
+        return _from_build_args_batch_m(cls, base)
+
     @classmethod
     def from_new_connection(cls) -> DerivedType:
         """
@@ -111,15 +193,19 @@ class DerivedType(FinalizableWrapperBase):
         WrapperErrorUnknownCause
             If a new instance could not be allocated
 
-            This could occur if too many instances are allocated at any one time
+            This could occur if the pool of instances could not be grown
+            (e.g. because the system is out of memory)
         """
         instance_index = derived_type_w.get_free_instance_number()
         if instance_index == INVALID_INSTANCE_INDEX:
             raise fgr_excs.WrapperErrorUnknownCause(  # noqa: TRY003
-                f"Could not create instance of {cls.__name__}. "
+                f"Could not create instance of {cls.__name__}. {get_pool_statistics()}"
             )
 
-        return cls(instance_index)
+        out = cls(instance_index)
+        pool.register_claimed("DerivedType", (out,), finalize_many)
+
+        return out
 
     # Finalisation
     @check_initialised
@@ -127,9 +213,58 @@ class DerivedType(FinalizableWrapperBase):
         """
         Close the connection with the Fortran module
         """
+        pool.unregister_claimed("DerivedType", (self.instance_index,))
         derived_type_w.instance_finalize(self.instance_index)
+
         self._uninitialise_instance_index()
 
+    # Serialisation
+    def __getstate__(self) -> dict[str, Any]:
+        """
+        Get the state of the underlying Fortran instance
+
+        Returns
+        -------
+            Build arguments (as magnitudes) which re-create the Fortran instance.
+            Empty if the instance is not initialised.
+        """
+        if not self.initialized:
+            return {}
+
+        return {"base": self.base_m}
+
+    def __reduce__(self) -> tuple[Callable[..., Any], tuple[Any, ...]]:
+        """
+        Support pickling
+
+        ``instance_index`` only has meaning within the current process,
+        so the state of the Fortran instance is pickled instead.
+        Unpickling builds a new Fortran instance from this state,
+        which the user is responsible for finalising.
+        """
+        return (_from_state, (type(self), self.__getstate__()))
+
+    def __copy__(self) -> DerivedType:
+        """
+        Copy the instance
+
+        As for pickling, the copy wraps a new Fortran instance
+        built from the state of this one,
+        so changes to one are not reflected in the other.
+        As with any other new instance,
+        the user is responsible for finalising the copy.
+        """
+        return cast(DerivedType, _from_state(type(self), self.__getstate__()))
+
+    def __deepcopy__(self, memo: dict[int, Any]) -> DerivedType:
+        """
+        Copy the instance
+
+        The instance holds no Python objects which need copying,
+        so this is the same as :meth:`__copy__`.
+        """
+        return self.__copy__()
+
     # Attribute getters and setters
     @property
     @check_initialised
@@ -150,6 +285,17 @@ class DerivedType(FinalizableWrapperBase):
             in the underlying instance of the derived type.
             To make changes to the underlying instance, use the setter instead.
         """
+        return self.base_m
+
+    @property
+    @check_initialised
+    def base_m(self) -> float:
+        """
+        Magnitude-only version of :attr:`base`
+
+        No unit handling is performed.
+        The returned value is a magnitude in ``m``.
+        """
         # Wrapping base
         # Strategy: WrappingStrategyDefault(
         #     magnitude_suffix='_m',
@@ -185,6 +331,19 @@ class DerivedType(FinalizableWrapperBase):
         -------
             Sum of `self.base` and `other`
         """
+        return self.add_m(other)
+
+    @check_initialised
+    def add_m(
+        self,
+        other: float,
+    ) -> float:
+        """
+        Magnitude-only version of :meth:`add`
+
+        No unit handling is performed.
+        `other` and the returned value are magnitudes in ``m``.
+        """
         # Wrapping output
         # Strategy: WrappingStrategyDefault(
         #     magnitude_suffix='_m',
@@ -196,6 +355,59 @@ class DerivedType(FinalizableWrapperBase):
 
         return output
 
+    @check_initialised
+    @verify_units(
+        _UNITS["outputs"],
+        (
+            None,
+            _UNITS["others"],
+        ),
+    )
+    def add_batch(
+        self,
+        others: npt.NDArray[np.float64],
+    ) -> npt.NDArray[np.float64]:
+        """
+        Add each of many values to `self.base`
+
+        The loop over `others` happens in Fortran,
+        so the whole batch only crosses the Python-Fortran boundary once.
+
+        Parameters
+        ----------
+        others
+            Quantities to add (1D)
+
+        Returns
+        -------
+            Sum of `self.base` and each element of `others`
+        """
+        return self.add_batch_m(others)
+
+    @check_initialised
+    def add_batch_m(
+        self,
+        others: npt.NDArray[np.float64],
+    ) -> npt.NDArray[np.float64]:
+        """
+        Magnitude-only version of :meth:`add_batch`
+
+        No unit handling is performed.
+        `others` and the returned values are magnitudes in ``m``.
+        """
+        # Wrapping outputs
+        # Strategy: WrappingStrategyDefault(
+        #     magnitude_suffix='_m',
+        # )
+        others = _as_batch(others)
+        outputs: npt.NDArray[np.float64] = derived_type_w.i_add_batch(
+            instance_index=self.instance_index,
+            n=others.size,
+            others=others,
+        )
+
+        return outputs
+
     @check_initialised
     @verify_units(
         _UNITS["output"],
@@ -211,6 +423,18 @@ class DerivedType(FinalizableWrapperBase):
         -------
             Double `self.base`
         """
+        return self.double_m()
+
+    @check_initialised
+    def double_m(
+        self,
+    ) -> float:
+        """
+        Magnitude-only version of :meth:`double`
+
+        No unit handling is performed.
+        The returned value is a magnitude in ``m``.
+        """
         # Wrapping output
         # Strategy: WrappingStrategyDefault(
         #     magnitude_suffix='_m',
@@ -221,6 +445,22 @@ class DerivedType(FinalizableWrapperBase):
 
         return output
 
+    # Deferred operations
+    @check_initialised
+    def batch(self) -> DerivedTypeOperationQueue:
+        """
+        Queue operations on this instance, to run with a single call to Fortran
+
+        Use the queue as a context manager.
+        The queued operations are run when the ``with`` block exits
+        (see :mod:`fgen_example.deferred`).
+
+        Returns
+        -------
+            Empty queue of operations on this instance
+        """
+        return DerivedTypeOperationQueue(self)
+
 
 @define
 class DerivedTypeNoSetters(FinalizableWrapperBase):
@@ -279,7 +519,19 @@ class DerivedTypeNoSetters(FinalizableWrapperBase):
         --------
         :meth:`DerivedTypeNoSettersContext.from_build_args`
         """
+        return cls.from_build_args_m(base)
+
+    @classmethod
+    def from_build_args_m(
+        cls,
+        base: float,
+    ) -> DerivedTypeNoSetters:
+        """
+        Magnitude-only version of :meth:`from_build_args`
 
+        No unit handling is performed.
+        `base` is a magnitude in ``m``.
+        """
         out = cls.from_new_connection()
         execute_finalize_on_fail(
             out,
@@ -289,6 +541,56 @@ class DerivedTypeNoSetters(FinalizableWrapperBase):
 
         return out
 
+    @classmethod
+    @verify_units(
+        None,
+        (
+            None,
+            _UNITS["base"],
+        ),
+    )
+    def from_build_args_batch(
+        cls,
+        base: npt.NDArray[np.float64],
+    ) -> list[DerivedTypeNoSetters]:
+        """
+        Initialise many instances from build arguments
+
+        The instances are claimed and built with a single call to Fortran.
+        The user is responsible for releasing the connections
+        using :func:`finalize_many` (or :attr:`~finalize`)
+        when they are no longer needed.
+
+        Parameters
+        ----------
+        base
+            Base value for each instance (1D)
+
+        Returns
+        -------
+            Built (i.e. linked to Fortran and initialised)
+            :obj:`DerivedTypeNoSetters`, one per element of `base`
+
+        Raises
+        ------
+        WrapperErrorUnknownCause
+            If the new instances could not be allocated
+        """
+        return cls.from_build_args_batch_m(base)
+
+    @classmethod
+    def from_build_args_batch_m(
+        cls,
+        base: npt.NDArray[np.float64],
+    ) -> list[DerivedTypeNoSetters]:
+        """
+        Magnitude-only version of :meth:`from_build_args_batch`
+
+        No unit handling is performed.
+        `base` is an array of magnitudes in ``m``.
+        """
+        return _from_build_args_batch_m(cls, base)
+
     @classmethod
     def from_new_connection(cls) -> DerivedTypeNoSetters:
         """
@@ -308,15 +610,19 @@ class DerivedTypeNoSetters(FinalizableWrapperBase):
         WrapperErrorUnknownCause
             If a new instance could not be allocated
 
-            This could occur if too many instances are allocated at any one time
+            This could occur if the pool of instances could not be grown
+            (e.g. because the system is out of memory)
         """
         instance_index = derived_type_w.get_free_instance_number()
         if instance_index == INVALID_INSTANCE_INDEX:
             raise fgr_excs.WrapperErrorUnknownCause(  # noqa: TRY003
-                f"Could not create instance of {cls.__name__}. "
+                f"Could not create instance of {cls.__name__}. {get_pool_statistics()}"
             )
 
-        return cls(instance_index)
+        out = cls(instance_index)
+        pool.register_claimed("DerivedType", (out,), finalize_many)
+
+        return out
 
     # Finalisation
     @check_initialised
@@ -324,9 +630,58 @@ class DerivedTypeNoSetters(FinalizableWrapperBase):
         """
         Close the connection with the Fortran module
         """
+        pool.unregister_claimed("DerivedType", (self.instance_index,))
         derived_type_w.instance_finalize(self.instance_index)
+
         self._uninitialise_instance_index()
 
+    # Serialisation
+    def __getstate__(self) -> dict[str, Any]:
+        """
+        Get the state of the underlying Fortran instance
+
+        Returns
+        -------
+            Build arguments (as magnitudes) which re-create the Fortran instance.
+            Empty if the instance is not initialised.
+        """
+        if not self.initialized:
+            return {}
+
+        return {"base": self.base_m}
+
+    def __reduce__(self) -> tuple[Callable[..., Any], tuple[Any, ...]]:
+        """
+        Support pickling
+
+        ``instance_index`` only has meaning within the current process,
+        so the state of the Fortran instance is pickled instead.
+        Unpickling builds a new Fortran instance from this state,
+        which the user is responsible for finalising.
+        """
+        return (_from_state, (type(self), self.__getstate__()))
+
+    def __copy__(self) -> DerivedTypeNoSetters:
+        """
+        Copy the instance
+
+        As for pickling, the copy wraps a new Fortran instance
+        built from the state of this one,
+        so changes to one are not reflected in the other.
+        As with any other new instance,
+        the user is responsible for finalising the copy.
+        """
+        return cast(DerivedTypeNoSetters, _from_state(type(self), self.__getstate__()))
+
+    def __deepcopy__(self, memo: dict[int, Any]) -> DerivedTypeNoSetters:
+        """
+        Copy the instance
+
+        The instance holds no Python objects which need copying,
+        so this is the same as :meth:`__copy__`.
+        """
+        return self.__copy__()
+
     # Attribute getters
     @property
     @check_initialised
@@ -347,6 +702,17 @@ class DerivedTypeNoSetters(FinalizableWrapperBase):
             in the underlying instance of the derived type.
             To make changes to the underlying instance, use the setter instead.
         """
+        return self.base_m
+
+    @property
+    @check_initialised
+    def base_m(self) -> float:
+        """
+        Magnitude-only version of :attr:`base`
+
+        No unit handling is performed.
+        The returned value is a magnitude in ``m``.
+        """
         # Wrapping base
         # Strategy: WrappingStrategyDefault(
         #     magnitude_suffix='_m',
@@ -382,6 +748,19 @@ class DerivedTypeNoSetters(FinalizableWrapperBase):
         -------
             Sum of `self.base` and `other`
         """
+        return self.add_m(other)
+
+    @check_initialised
+    def add_m(
+        self,
+        other: float,
+    ) -> float:
+        """
+        Magnitude-only version of :meth:`add`
+
+        No unit handling is performed.
+        `other` and the returned value are magnitudes in ``m``.
+        """
         # Wrapping output
         # Strategy: WrappingStrategyDefault(
         #     magnitude_suffix='_m',
@@ -393,6 +772,59 @@ class DerivedTypeNoSetters(FinalizableWrapperBase):
 
         return output
 
+    @check_initialised
+    @verify_units(
+        _UNITS["outputs"],
+        (
+            None,
+            _UNITS["others"],
+        ),
+    )
+    def add_batch(
+        self,
+        others: npt.NDArray[np.float64],
+    ) -> npt.NDArray[np.float64]:
+        """
+        Add each of many values to `self.base`
+
+        The loop over `others` happens in Fortran,
+        so the whole batch only crosses the Python-Fortran boundary once.
+
+        Parameters
+        ----------
+        others
+            Quantities to add (1D)
+
+        Returns
+        -------
+            Sum of `self.base` and each element of `others`
+        """
+        return self.add_batch_m(others)
+
+    @check_initialised
+    def add_batch_m(
+        self,
+        others: npt.NDArray[np.float64],
+    ) -> npt.NDArray[np.float64]:
+        """
+        Magnitude-only version of :meth:`add_batch`
+
+        No unit handling is performed.
+        `others` and the returned values are magnitudes in ``m``.
+        """
+        # Wrapping outputs
+        # Strategy: WrappingStrategyDefault(
+        #     magnitude_suffix='_m',
+        # )
+        others = _as_batch(others)
+        outputs: npt.NDArray[np.float64] = derived_type_w.i_add_batch(
+            instance_index=self.instance_index,
+            n=others.size,
+            others=others,
+        )
+
+        return outputs
+
     @check_initialised
     @verify_units(
         _UNITS["output"],
@@ -408,6 +840,18 @@ class DerivedTypeNoSetters(FinalizableWrapperBase):
         -------
             Double `self.base`
         """
+        return self.double_m()
+
+    @check_initialised
+    def double_m(
+        self,
+    ) -> float:
+        """
+        Magnitude-only version of :meth:`double`
+
+        No unit handling is performed.
+        The returned value is a magnitude in ``m``.
+        """
         # Wrapping output
         # Strategy: WrappingStrategyDefault(
         #     magnitude_suffix='_m',
@@ -418,31 +862,806 @@ class DerivedTypeNoSetters(FinalizableWrapperBase):
 
         return output
 
+    # Deferred operations
+    @check_initialised
+    def batch(self) -> DerivedTypeOperationQueue:
+        """
+        Queue operations on this instance, to run with a single call to Fortran
 
-@define
-class DerivedTypeContext(FinalizableWrapperBaseContext):
-    """
-    Context manager for :class:`DerivedType`
-    """
+        Use the queue as a context manager.
+        The queued operations are run when the ``with`` block exits
+        (see :mod:`fgen_example.deferred`).
 
-    @classmethod
-    def from_build_args(
-        cls,
-        *args: Any,
-        **kwargs: Any,
-    ) -> DerivedTypeContext:
-        """
-        Docstrings to be handled as part of #223
+        Returns
+        -------
+            Empty queue of operations on this instance
         """
-        return cls(
-            DerivedType.from_build_args(*args, **kwargs),
-        )
+        return DerivedTypeOperationQueue(self)
 
 
-@define
-class DerivedTypeNoSettersContext(FinalizableWrapperBaseContext):
+@define(eq=False)
+class DerivedTypeArray:
     """
-    Context manager for :class:`DerivedTypeNoSetters`
+    Collection of Fortran :class:`DerivedType` instances, handled as a block
+
+    Rather than one wrapper per instance,
+    the collection holds the indexes of all its instances in one array.
+    Attributes are read and written, and methods are applied,
+    for the whole collection with a single call to Fortran,
+    so this is a compact representation for large ensembles.
+
+    The user is responsible for releasing the instances
+    using :meth:`finalize` when they are no longer needed.
+    Alternatively, create the collection inside :func:`fgen_example.pool.arena`.
+    The instances are not released when the collection is garbage collected,
+    even if automatic finalisation is enabled.
+    """
+
+    instance_indexes: npt.NDArray[np.int32] | None = None
+    """
+    Indexes of the Fortran instances in the collection
+
+    ``None`` if the collection is not initialised.
+    """
+
+    @property
+    def initialized(self) -> bool:
+        """
+        Is the collection initialised, i.e. connected to Fortran instances?
+        """
+        return self.instance_indexes is not None
+
+    def __len__(self) -> int:
+        """
+        Get the number of instances in the collection
+        """
+        return 0 if self.instance_indexes is None else self.instance_indexes.size
+
+    # Class methods
+    @classmethod
+    @verify_units(
+        None,
+        (
+            None,
+            _UNITS["base"],
+        ),
+    )
+    def from_build_args(
+        cls,
+        base: npt.NDArray[np.float64],
+    ) -> DerivedTypeArray:
+        """
+        Initialise from build arguments
+
+        The instances are claimed and built with a single call to Fortran.
+
+        Parameters
+        ----------
+        base
+            Base value for each instance (1D)
+
+        Returns
+        -------
+            Built collection, with one instance per element of `base`
+
+        Raises
+        ------
+        WrapperErrorUnknownCause
+            If the new instances could not be allocated
+        """
+        return cls.from_build_args_m(base)
+
+    @classmethod
+    def from_build_args_m(
+        cls,
+        base: npt.NDArray[np.float64],
+    ) -> DerivedTypeArray:
+        """
+        Magnitude-only version of :meth:`from_build_args`
+
+        No unit handling is performed.
+        `base` is an array of magnitudes in ``m``.
+        """
+        base = _as_batch(base)
+        instance_indexes = derived_type_bulk_w.instances_build(
+            n=base.size,
+            base=base,
+        )
+        if np.any(instance_indexes == INVALID_INSTANCE_INDEX):
+            raise fgr_excs.WrapperErrorUnknownCause(  # noqa: TRY003
+                f"Could not create {base.size} instances of {cls.__name__}. {get_pool_statistics()}"
+            )
+
+        out = cls(instance_indexes)
+        pool.register_claimed_array("DerivedType", out, _finalize_arrays)
+
+        return out
+
+    # Finalisation
+    @check_initialised
+    def finalize(self) -> None:
+        """
+        Close the connection of all the instances with the Fortran module
+
+        All the connections are closed with a single call to Fortran.
+        """
+        _finalize_arrays((self,))
+
+    # Attribute getters and setters
+    @property
+    @check_initialised
+    @verify_units(
+        _UNITS["base"],
+        (None,),
+    )
+    def base(self) -> npt.NDArray[np.float64]:
+        """
+        Base value of each instance
+
+        Returns
+        -------
+            Attribute values, retrieved from Fortran with a single call.
+
+            The values are a copy of the instances' data.
+            Changes to these values will not be reflected
+            in the underlying instances.
+            To make changes to the underlying instances, use :meth:`set_base`.
+        """
+        return self.base_m
+
+    @property
+    @check_initialised
+    def base_m(self) -> npt.NDArray[np.float64]:
+        """
+        Magnitude-only version of :attr:`base`
+
+        No unit handling is performed.
+        The returned values are magnitudes in ``m``.
+        """
+        base: npt.NDArray[np.float64] = derived_type_bulk_w.iget_base_batch(
+            n=len(self),
+            instance_indexes=self._instance_indexes,
+        )
+
+        return base
+
+    @check_initialised
+    @verify_units(
+        None,
+        (
+            None,
+            _UNITS["base"],
+        ),
+    )
+    def set_base(
+        self,
+        base: npt.NDArray[np.float64],
+    ) -> None:
+        """
+        Set the base value of each instance
+
+        Parameters
+        ----------
+        base
+            Base value for each instance.
+            A single value is applied to every instance.
+        """
+        self.set_base_m(base)
+
+    @check_initialised
+    def set_base_m(
+        self,
+        base: npt.NDArray[np.float64],
+    ) -> None:
+        """
+        Magnitude-only version of :meth:`set_base`
+
+        No unit handling is performed.
+        `base` is a magnitude (or magnitudes) in ``m``.
+        """
+        derived_type_bulk_w.iset_base_batch(
+            n=len(self),
+            instance_indexes=self._instance_indexes,
+            base=_as_per_instance(base, len(self)),
+        )
+
+    # Wrapped methods
+    @check_initialised
+    @verify_units(
+        _UNITS["outputs"],
+        (
+            None,
+            _UNITS["others"],
+        ),
+    )
+    def add(
+        self,
+        others: npt.NDArray[np.float64],
+    ) -> npt.NDArray[np.float64]:
+        """
+        Add a value to the base value of each instance
+
+        Parameters
+        ----------
+        others
+            Value to add to each instance.
+            A single value is added to every instance.
+
+        Returns
+        -------
+            Sum of each instance's base value and its value from `others`
+        """
+        return self.add_m(others)
+
+    @check_initialised
+    def add_m(
+        self,
+        others: npt.NDArray[np.float64],
+    ) -> npt.NDArray[np.float64]:
+        """
+        Magnitude-only version of :meth:`add`
+
+        No unit handling is performed.
+        `others` and the returned values are magnitudes in ``m``.
+        """
+        outputs: npt.NDArray[np.float64] = derived_type_bulk_w.i_add_batch(
+            n=len(self),
+            instance_indexes=self._instance_indexes,
+            others=_as_per_instance(others, len(self)),
+        )
+
+        return outputs
+
+    @check_initialised
+    @verify_units(
+        _UNITS["outputs"],
+        (None,),
+    )
+    def double(self) -> npt.NDArray[np.float64]:
+        """
+        Double the base value of each instance
+
+        Returns
+        -------
+            Double each instance's base value
+        """
+        return self.double_m()
+
+    @check_initialised
+    def double_m(self) -> npt.NDArray[np.float64]:
+        """
+        Magnitude-only version of :meth:`double`
+
+        No unit handling is performed.
+        The returned values are magnitudes in ``m``.
+        """
+        outputs: npt.NDArray[np.float64] = derived_type_bulk_w.i_double_batch(
+            n=len(self),
+            instance_indexes=self._instance_indexes,
+        )
+
+        return outputs
+
+    @property
+    def _instance_indexes(self) -> npt.NDArray[np.int32]:
+        """
+        Indexes of the instances, for use once initialisation has been checked
+        """
+        return cast(npt.NDArray[np.int32], self.instance_indexes)
+
+
+@define(eq=False)
+class DerivedTypeOperationQueue(OperationQueue):
+    """
+    Queue of operations on a :class:`DerivedType`, run with a single call to Fortran
+
+    Create the queue with :meth:`DerivedType.batch`
+    and use it as a context manager.
+    Each method queues an operation and returns its (deferred) result.
+    The outputs of all the operations are in ``m``.
+    """
+
+    units: ClassVar[str] = _UNITS["output"]
+
+    def get_base(self) -> DeferredResult:
+        """
+        Queue getting the base value
+
+        Returns
+        -------
+            Base value, once the queue has been run
+        """
+        return self._queue(_OPCODES["get_base"])
+
+    @verify_units(
+        None,
+        (
+            None,
+            _UNITS["other"],
+        ),
+    )
+    def add(
+        self,
+        other: float,
+    ) -> DeferredResult:
+        """
+        Queue adding another value to the base value
+
+        Parameters
+        ----------
+        other
+            Quantity to add
+
+        Returns
+        -------
+            Sum of the base value and `other`, once the queue has been run
+        """
+        return self.add_m(other)
+
+    def add_m(
+        self,
+        other: float,
+    ) -> DeferredResult:
+        """
+        Magnitude-only version of :meth:`add`
+
+        No unit handling is performed.
+        `other` is a magnitude in ``m``.
+        """
+        return self._queue(_OPCODES["add"], (other,))
+
+    def double(self) -> DeferredResult:
+        """
+        Queue doubling the base value
+
+        Returns
+        -------
+            Double the base value, once the queue has been run
+        """
+        return self._queue(_OPCODES["double"])
+
+    def _dispatch(
+        self,
+        opcodes: npt.NDArray[np.int32],
+        instance_indexes: npt.NDArray[np.int32],
+        operand_offsets: npt.NDArray[np.int32],
+        operands: npt.NDArray[np.float64],
+    ) -> npt.NDArray[np.float64]:
+        outputs: npt.NDArray[np.float64] = derived_type_bulk_w.i_dispatch(
+            n=opcodes.size,
+            opcodes=opcodes,
+            instance_indexes=instance_indexes,
+            operand_offsets=operand_offsets,
+            n_operands=operands.size,
+            operands=operands,
+        )
+
+        return outputs
+
+
+@verify_units(
+    _UNITS["output"],
+    (None,),
+)
+def double_batch(
+    instances: Sequence[DerivedType | DerivedTypeNoSetters],
+) -> npt.NDArray[np.float64]:
+    """
+    Double `self.base` for each of many instances
+
+    The loop over the instances happens in Fortran,
+    so the whole batch only crosses the Python-Fortran boundary once.
+
+    Parameters
+    ----------
+    instances
+        Instances to double
+
+    Returns
+    -------
+        Double `self.base` for each instance
+
+    Raises
+    ------
+    InitialisationError
+        Any of the instances is not initialised
+    """
+    return double_batch_m(instances)
+
+
+def double_batch_m(
+    instances: Sequence[DerivedType | DerivedTypeNoSetters],
+) -> npt.NDArray[np.float64]:
+    """
+    Magnitude-only version of :func:`double_batch`
+
+    No unit handling is performed.
+    The returned values are magnitudes in ``m``.
+    """
+    instance_indexes = _get_instance_indexes(instances, double_batch_m)
+    outputs: npt.NDArray[np.float64] = derived_type_bulk_w.i_double_batch(
+        n=instance_indexes.size,
+        instance_indexes=instance_indexes,
+    )
+
+    return outputs
+
+
+@verify_units(
+    (None, _UNITS["base"]),
+    (),
+)
+def export_instances() -> tuple[npt.NDArray[np.int32], npt.NDArray[np.float64]]:
+    """
+    Get the state of all the live :class:`DerivedType` instances
+
+    The state of every instance in the pool is retrieved with a single call to Fortran,
+    without going through any wrappers.
+
+    Returns
+    -------
+        Index of each live instance (in increasing order)
+        and its `base`
+    """
+    return export_instances_m()
+
+
+def export_instances_m() -> tuple[npt.NDArray[np.int32], npt.NDArray[np.float64]]:
+    """
+    Magnitude-only version of :func:`export_instances`
+
+    No unit handling is performed.
+    The returned `base` values are magnitudes in ``m``.
+    """
+    instance_indexes, base = pool.export_live_instances(
+        derived_type_bulk_w.instances_export,
+        get_pool_statistics().n_live,
+    )
+
+    return instance_indexes, base
+
+
+def finalize_many(
+    instances: Sequence[DerivedType | DerivedTypeNoSetters],
+) -> None:
+    """
+    Close the connection of many instances with the Fortran module
+
+    All the connections are closed with a single call to Fortran.
+
+    Parameters
+    ----------
+    instances
+        Instances to finalise
+
+    Raises
+    ------
+    InitialisationError
+        Any of the instances is not initialised
+
+    ValueError
+        The same instance appears more than once in `instances`
+    """
+    instance_indexes = _get_instance_indexes(instances, finalize_many)
+    if np.unique(instance_indexes).size != instance_indexes.size:
+        raise ValueError("Each instance can only be finalised once")  # noqa: TRY003
+
+    pool.unregister_claimed("DerivedType", instance_indexes)
+    derived_type_bulk_w.instances_finalize(
+        n=instance_indexes.size,
+        instance_indexes=instance_indexes,
+    )
+
+    for instance in instances:
+        instance._uninitialise_instance_index()
+
+
+def get_instance_capacity() -> int:
+    """
+    Get the number of :class:`DerivedType` instances that can exist without growing the pool
+
+    The pool is shared by all the wrappers of the Fortran :class:`DerivedType`.
+
+    Returns
+    -------
+        Current capacity of the pool of Fortran instances
+    """
+    capacity: int = derived_type_bulk_w.get_capacity()
+
+    return capacity
+
+
+def get_pool_statistics() -> pool.PoolStatistics:
+    """
+    Get statistics about the occupancy of the :class:`DerivedType` instance pool
+
+    The pool is shared by all the wrappers of the Fortran :class:`DerivedType`.
+
+    Returns
+    -------
+        Capacity, number of live instances, high-water mark
+        and total number of instances claimed and finalised
+    """
+    (
+        capacity,
+        n_live,
+        high_water_mark,
+        n_claimed,
+        n_finalized,
+    ) = derived_type_bulk_w.get_statistics()
+
+    return pool.PoolStatistics(
+        capacity=int(capacity),
+        n_live=int(n_live),
+        high_water_mark=int(high_water_mark),
+        n_claimed=int(n_claimed),
+        n_finalized=int(n_finalized),
+    )
+
+
+def get_leak_report() -> list[pool.LeakedInstance]:
+    """
+    Get the :class:`DerivedType` instances which are currently live
+
+    If leak tracking is enabled (see :mod:`fgen_example.pool`),
+    the report includes where each instance was created.
+
+    Returns
+    -------
+        Each live instance, in order of instance index
+    """
+    (instance_indexes,) = pool.export_live_instances(
+        derived_type_bulk_w.get_live_instance_indexes,
+        get_pool_statistics().n_live,
+    )
+
+    return _LEAK_TRACKER.get_leak_report(instance_indexes)
+
+
+@verify_units(
+    None,
+    (None, _UNITS["base"]),
+)
+def import_instances(
+    instance_indexes: npt.NDArray[np.int32],
+    base: npt.NDArray[np.float64],
+) -> DerivedTypeArray:
+    """
+    Restore :class:`DerivedType` instances with the given indexes
+
+    This is the counterpart of :func:`export_instances`.
+    The instances are claimed and built with a single call to Fortran.
+    To get a wrapper for an individual instance,
+    use ``DerivedType(instance_index)``.
+
+    Parameters
+    ----------
+    instance_indexes
+        Index to give each instance.
+        None of the indexes can already be in use.
+
+    base
+        `base` of each instance
+
+    Returns
+    -------
+        Collection of the restored instances
+
+    Raises
+    ------
+    ValueError
+        The indexes are not unique and positive,
+        are already in use or the pool could not be grown to hold them
+    """
+    return import_instances_m(instance_indexes, base)
+
+
+def import_instances_m(
+    instance_indexes: npt.NDArray[np.int32],
+    base: npt.NDArray[np.float64],
+) -> DerivedTypeArray:
+    """
+    Magnitude-only version of :func:`import_instances`
+
+    No unit handling is performed.
+    `base` is an array of magnitudes in ``m``.
+    """
+    instance_indexes = np.ascontiguousarray(instance_indexes, dtype=np.int32)
+    base = _as_batch(base)
+    if instance_indexes.shape != base.shape:
+        raise ValueError(  # noqa: TRY003
+            "instance_indexes and base must have the same shape. "
+            f"Received {instance_indexes.shape=} and {base.shape=}"
+        )
+
+    if np.unique(instance_indexes).size != instance_indexes.size:
+        raise ValueError(  # noqa: TRY003
+            "Each instance index can only be imported once"
+        )
+
+    success = derived_type_bulk_w.instances_import(
+        n=instance_indexes.size,
+        instance_indexes=instance_indexes,
+        base=base,
+    )
+    if not success:
+        raise ValueError(  # noqa: TRY003
+            "Could not claim the requested instance indexes. "
+            "They must be positive and not already in use. "
+            f"{get_pool_statistics()}"
+        )
+
+    out = DerivedTypeArray(instance_indexes)
+    pool.register_claimed_array("DerivedType", out, _finalize_arrays)
+
+    return out
+
+
+def reserve_instances(capacity: int) -> None:
+    """
+    Reserve capacity for :class:`DerivedType` instances up front
+
+    The pool of Fortran instances grows geometrically when it runs out of space.
+    Reserving capacity avoids repeatedly growing the pool
+    when many instances are created.
+    If no instances have been created yet,
+    this also sets the size of the first block of the pool.
+
+    Existing instances are unaffected.
+
+    Parameters
+    ----------
+    capacity
+        Number of instances that the pool should be able to hold
+
+    Raises
+    ------
+    WrapperErrorUnknownCause
+        The pool could not be grown to the requested capacity
+    """
+    if not derived_type_bulk_w.reserve(capacity):
+        raise fgr_excs.WrapperErrorUnknownCause(  # noqa: TRY003
+            f"Could not reserve capacity for {capacity} instances of DerivedType"
+        )
+
+
+def _as_batch(values: npt.ArrayLike) -> npt.NDArray[np.float64]:
+    """
+    Convert values to a 1D, contiguous array that can be passed to Fortran
+    """
+    out = np.ascontiguousarray(values, dtype=np.float64)
+    if out.ndim != 1:
+        raise ValueError(  # noqa: TRY003
+            f"Batched values must be 1D. Received shape: {out.shape}"
+        )
+
+    return out
+
+
+def _as_per_instance(values: npt.ArrayLike, n: int) -> npt.NDArray[np.float64]:
+    """
+    Convert a single value, or one value per instance, to one value per instance
+    """
+    out = np.asarray(values, dtype=np.float64)
+    if out.ndim == 0:
+        return np.full(n, out, dtype=np.float64)
+
+    out = _as_batch(out)
+    if out.size != n:
+        raise ValueError(  # noqa: TRY003
+            f"Expected a single value or {n} values. Received shape: {out.shape}"
+        )
+
+    return out
+
+
+def _finalize_arrays(arrays: Sequence[DerivedTypeArray]) -> None:
+    """
+    Close the connection of the instances in many collections
+
+    All the connections are closed with a single call to Fortran.
+    Used by :meth:`DerivedTypeArray.finalize` and by arenas.
+    """
+    instance_indexes = np.concatenate([v._instance_indexes for v in arrays])
+    pool.unregister_claimed("DerivedType", instance_indexes)
+    derived_type_bulk_w.instances_finalize(
+        n=instance_indexes.size,
+        instance_indexes=instance_indexes,
+    )
+
+    for array in arrays:
+        array.instance_indexes = None
+
+
+def _release_instance(instance_index: int) -> None:
+    """
+    Finalise an instance whose wrapper has been garbage collected
+
+    Used for automatic finalisation (see :mod:`fgen_example.pool`).
+    """
+    pool.unregister_claimed("DerivedType", (instance_index,))
+    derived_type_w.instance_finalize(instance_index)
+
+
+def _from_build_args_batch_m(
+    cls: type[InstanceT],
+    base: npt.NDArray[np.float64],
+) -> list[InstanceT]:
+    """
+    Claim and build many instances with a single call to Fortran
+
+    Used by both :meth:`DerivedType.from_build_args_batch_m`
+    and :meth:`DerivedTypeNoSetters.from_build_args_batch_m`.
+    """
+    base = _as_batch(base)
+    instance_indexes = derived_type_bulk_w.instances_build(
+        n=base.size,
+        base=base,
+    )
+    if np.any(instance_indexes == INVALID_INSTANCE_INDEX):
+        raise fgr_excs.WrapperErrorUnknownCause(  # noqa: TRY003
+            f"Could not create {base.size} instances of {cls.__name__}. {get_pool_statistics()}"
+        )
+
+    out = [cls(int(instance_index)) for instance_index in instance_indexes]
+    pool.register_claimed("DerivedType", out, finalize_many)
+
+    return out
+
+
+def _from_state(
+    cls: type[DerivedType] | type[DerivedTypeNoSetters],
+    state: dict[str, Any],
+) -> DerivedType | DerivedTypeNoSetters:
+    """
+    Create an instance from the state returned by ``__getstate__``
+
+    Used when unpickling.
+    """
+    if not state:
+        return cls()
+
+    return cls.from_build_args_m(**state)
+
+
+def _get_instance_indexes(
+    instances: Sequence[DerivedType | DerivedTypeNoSetters],
+    method: Callable[..., Any],
+) -> npt.NDArray[np.int32]:
+    """
+    Get the instance indexes of many instances, checking each is initialised
+    """
+    for instance in instances:
+        if not instance.initialized:
+            raise InitialisationError(instance, method)
+
+    return np.array([v.instance_index for v in instances], dtype=np.int32)
+
+
+@define
+class DerivedTypeContext(FinalizableWrapperBaseContext):
+    """
+    Context manager for :class:`DerivedType`
+    """
+
+    @classmethod
+    def from_build_args(
+        cls,
+        *args: Any,
+        **kwargs: Any,
+    ) -> DerivedTypeContext:
+        """
+        Docstrings to be handled as part of #223
+        """
+        return cls(
+            DerivedType.from_build_args(*args, **kwargs),
+        )
+
+
+@define
+class DerivedTypeNoSettersContext(FinalizableWrapperBaseContext):
+    """
+    Context manager for :class:`DerivedTypeNoSetters`
     """
 
     @classmethod
@@ -457,3 +1676,36 @@ class DerivedTypeNoSettersContext(FinalizableWrapperBaseContext):
         return cls(
             DerivedTypeNoSetters.from_build_args(*args, **kwargs),
         )
+
+
+# Tell the pool how to release instances whose wrappers are garbage collected
+pool.get_auto_finalizer("DerivedType", _release_instance)
+
+# Only these methods call into the compiled extension,
+# so only the time spent in them is reported as Fortran time
+instrumentation.register(
+    DerivedType,
+    DerivedTypeNoSetters,
+    calls_fortran=(
+        "from_build_args_m",
+        "from_build_args_batch_m",
+        "from_new_connection",
+        "finalize",
+        "base_m",
+        "add_m",
+        "add_batch_m",
+        "double_m",
+    ),
+)
+instrumentation.register(
+    DerivedTypeArray,
+    calls_fortran=(
+        "from_build_args_m",
+        "finalize",
+        "base_m",
+        "set_base_m",
+        "add_m",
+        "double_m",
+    ),
+)
+instrumentation.register(DerivedTypeOperationQueue)
@@ -0,0 +1,377 @@
+"""
+Opt-in instrumentation of the wrapper methods
+
+When enabled, every call to a public method (or property)
+of the wrapper classes is timed and recorded:
+the number of calls, the total time,
+a histogram of the latencies (from which percentiles are estimated)
+and how that time splits between unit handling and the Fortran call.
+
+Instrumentation is enabled either by setting the environment variable
+``FGEN_EXAMPLE_INSTRUMENTATION=1`` before importing the wrappers
+or by calling :func:`enable`.
+Results are retrieved with :func:`snapshot` and cleared with :func:`reset`.
+
+.. code-block:: python
+
+    from fgen_example import instrumentation
+
+    instrumentation.enable()
+    # ... make some calls
+    stats = instrumentation.snapshot()
+    print(stats["DerivedType.add"].calls)
+
+When enabled, the methods on the wrapper classes are replaced
+with timing versions.
+When disabled (the default), the original methods are in place,
+so there is no overhead at all.
+
+Unit handling versus Fortran
+    When registering a class,
+    the wrapper modules list the methods which call into the compiled extension
+    (e.g. ``add_m``).
+    All the time spent in these methods is reported as Fortran time.
+    For other methods (e.g. ``add``, which converts units then calls ``add_m``),
+    the time spent in nested calls to these methods is reported as Fortran time
+    and the rest (unit handling, checks and other Python) as unit time.
+    Methods which never reach the extension
+    (e.g. queueing a deferred operation) report no Fortran time.
+"""
+from __future__ import annotations
+
+import functools
+import os
+import threading
+import time
+from collections.abc import Callable, Iterable, Mapping
+from typing import Any
+
+from attrs import define
+
+ENV_VAR: str = "FGEN_EXAMPLE_INSTRUMENTATION"
+"""Environment variable which enables instrumentation at import time"""
+
+_HISTOGRAM_SUB_BUCKET_BITS: int = 2
+"""
+Resolution of the latency histogram
+
+Each power of two is split into ``2 ** _HISTOGRAM_SUB_BUCKET_BITS`` buckets,
+i.e. latencies are resolved to within about 20 %.
+"""
+
+_NOT_INSTRUMENTED: frozenset[str] = frozenset({"exposed_attributes"})
+"""Public attributes which never call Fortran so aren't instrumented"""
+
+
+@define(frozen=True)
+class MethodStats:
+    """
+    Statistics of the calls to a single method
+
+    All times are in seconds.
+    """
+
+    calls: int
+    """Number of calls"""
+
+    total_time: float
+    """Total time spent in the method"""
+
+    fortran_time: float
+    """Time spent in methods which call into the compiled extension"""
+
+    unit_time: float
+    """Time spent outside of the Fortran time (unit handling, checks and other Python)"""
+
+    latency_histogram: Mapping[float, int]
+    """
+    Histogram of the latencies of individual calls
+
+    Keys are the upper edges of the buckets,
+    values are the number of calls in each bucket.
+    """
+
+    @property
+    def mean_time(self) -> float:
+        """
+        Mean time per call
+        """
+        if not self.calls:
+            return 0.0
+
+        return self.total_time / self.calls
+
+    def percentile(self, q: float) -> float:
+        """
+        Estimate a percentile of the latency
+
+        Parameters
+        ----------
+        q
+            Percentile to estimate, between 0 and 100
+
+        Returns
+        -------
+            Upper edge of the histogram bucket which contains the percentile.
+            Zero if there have been no calls.
+
+        Raises
+        ------
+        ValueError
+            ``q`` is not between 0 and 100
+        """
+        if not 0 <= q <= 100:  # noqa: PLR2004
+            raise ValueError(  # noqa: TRY003
+                f"q must be between 0 and 100. Received: {q}"
+            )
+
+        target = q / 100 * self.calls
+        cumulative = 0
+        for upper_edge, count in sorted(self.latency_histogram.items()):
+            cumulative += count
+            if cumulative >= target:
+                return upper_edge
+
+        return 0.0
+
+
+class _MethodRecord:
+    """
+    Mutable record of the calls to a single method
+    """
+
+    __slots__ = ("calls", "total_ns", "fortran_ns", "histogram", "calls_fortran")
+
+    calls: int
+    total_ns: int
+    fortran_ns: int
+    histogram: dict[int, int]
+
+    def __init__(self, calls_fortran: bool) -> None:
+        self.calls_fortran = calls_fortran
+        self.reset()
+
+    def reset(self) -> None:
+        self.calls = 0
+        self.total_ns = 0
+        self.fortran_ns = 0
+        self.histogram = {}
+
+    def record(self, elapsed_ns: int, fortran_ns: int) -> None:
+        bucket = _get_bucket(elapsed_ns)
+        with _LOCK:
+            self.calls += 1
+            self.total_ns += elapsed_ns
+            self.fortran_ns += fortran_ns
+            self.histogram[bucket] = self.histogram.get(bucket, 0) + 1
+
+    def to_stats(self) -> MethodStats:
+        with _LOCK:
+            return MethodStats(
+                calls=self.calls,
+                total_time=self.total_ns * 1e-9,
+                fortran_time=self.fortran_ns * 1e-9,
+                unit_time=(self.total_ns - self.fortran_ns) * 1e-9,
+                latency_histogram={
+                    _get_bucket_upper_edge(bucket) * 1e-9: count for bucket, count in self.histogram.items()
+                },
+            )
+
+
+_LOCK = threading.Lock()
+_CALL_STACK = threading.local()
+_REGISTERED_CLASSES: list[type] = []
+_CALLS_FORTRAN: dict[type, frozenset[str]] = {}
+_RECORDS: dict[str, _MethodRecord] = {}
+_ORIGINALS: dict[tuple[type, str], Any] = {}
+_enabled: bool = False
+
+
+def register(*classes: type, calls_fortran: Iterable[str] = ()) -> None:
+    """
+    Register wrapper classes for instrumentation
+
+    This is called by the wrapper modules when they are imported.
+    If instrumentation is enabled,
+    the classes' methods are instrumented immediately.
+
+    Parameters
+    ----------
+    *classes
+        Classes to register
+
+    calls_fortran
+        Names of the methods (and properties) of the classes
+        which call into the compiled extension.
+        The time spent in these is reported as Fortran time.
+    """
+    for cls in classes:
+        if cls in _REGISTERED_CLASSES:
+            continue
+
+        _REGISTERED_CLASSES.append(cls)
+        _CALLS_FORTRAN[cls] = frozenset(calls_fortran)
+        if _enabled:
+            _instrument_class(cls)
+
+
+def enable() -> None:
+    """
+    Enable instrumentation
+
+    Results already recorded are kept. Use :func:`reset` to clear them.
+    """
+    global _enabled  # noqa: PLW0603
+    if _enabled:
+        return
+
+    _enabled = True
+    for cls in _REGISTERED_CLASSES:
+        _instrument_class(cls)
+
+
+def disable() -> None:
+    """
+    Disable instrumentation
+
+    The original methods are restored, so no more overhead is incurred.
+    Results already recorded are kept.
+    """
+    global _enabled  # noqa: PLW0603
+    _enabled = False
+    for (cls, name), original in _ORIGINALS.items():
+        setattr(cls, name, original)
+
+    _ORIGINALS.clear()
+
+
+def is_enabled() -> bool:
+    """
+    Get whether instrumentation is enabled
+
+    Returns
+    -------
+        ``True`` if calls are being recorded
+    """
+    return _enabled
+
+
+def snapshot() -> dict[str, MethodStats]:
+    """
+    Get the statistics recorded so far
+
+    Returns
+    -------
+        Statistics for each method which has been called at least once.
+        Keys are of the form ``"<class name>.<method name>"``.
+    """
+    stats = {key: record.to_stats() for key, record in _RECORDS.items()}
+
+    return {key: value for key, value in stats.items() if value.calls}
+
+
+def reset() -> None:
+    """
+    Clear the statistics recorded so far
+    """
+    for record in _RECORDS.values():
+        with _LOCK:
+            record.reset()
+
+
+def _instrument_class(cls: type) -> None:
+    """
+    Replace the public methods and properties of a class with timing versions
+    """
+    for name, attr in list(vars(cls).items()):
+        if name.startswith("_") or name in _NOT_INSTRUMENTED:
+            continue
+
+        key = f"{cls.__name__}.{name}"
+        if key not in _RECORDS:
+            _RECORDS[key] = _MethodRecord(calls_fortran=name in _CALLS_FORTRAN.get(cls, ()))
+
+        record = _RECORDS[key]
+        if isinstance(attr, property):
+            instrumented: Any = property(
+                _timed(attr.fget, record) if attr.fget is not None else None,
+                _timed(attr.fset, record) if attr.fset is not None else None,
+                attr.fdel,
+                attr.__doc__,
+            )
+        elif isinstance(attr, classmethod):
+            instrumented = classmethod(_timed(attr.__func__, record))
+        elif callable(attr):
+            instrumented = _timed(attr, record)
+        else:
+            continue
+
+        _ORIGINALS[(cls, name)] = attr
+        setattr(cls, name, instrumented)
+
+
+def _timed(func: Callable[..., Any], record: _MethodRecord) -> Callable[..., Any]:
+    """
+    Wrap a function so that its calls are recorded
+
+    The Fortran time of nested instrumented calls is also recorded,
+    which is what splits the time between unit handling and Fortran.
+    """
+
+    @functools.wraps(func)
+    def timed(*args: Any, **kwargs: Any) -> Any:
+        try:
+            stack = _CALL_STACK.stack
+        except AttributeError:
+            stack = _CALL_STACK.stack = []
+
+        stack.append(0)
+        start = time.perf_counter_ns()
+        try:
+            return func(*args, **kwargs)
+        finally:
+            elapsed = time.perf_counter_ns() - start
+            nested_fortran = stack.pop()
+            fortran = elapsed if record.calls_fortran else nested_fortran
+            if stack:
+                stack[-1] += fortran
+
+            record.record(elapsed, fortran)
+
+    return timed
+
+
+def _get_bucket(elapsed_ns: int) -> int:
+    """
+    Get the histogram bucket for a latency
+
+    The bucket is the position of the latency's highest set bit
+    followed by the next :data:`_HISTOGRAM_SUB_BUCKET_BITS` bits.
+    """
+    n_bits = elapsed_ns.bit_length()
+    if n_bits <= _HISTOGRAM_SUB_BUCKET_BITS:
+        return elapsed_ns
+
+    shift = n_bits - _HISTOGRAM_SUB_BUCKET_BITS - 1
+
+    return ((shift + 1) << _HISTOGRAM_SUB_BUCKET_BITS) + (
+        (elapsed_ns >> shift) & ((1 << _HISTOGRAM_SUB_BUCKET_BITS) - 1)
+    )
+
+
+def _get_bucket_upper_edge(bucket: int) -> int:
+    """
+    Get the largest latency (in nanoseconds) which falls in a histogram bucket
+    """
+    if bucket < 1 << _HISTOGRAM_SUB_BUCKET_BITS:
+        return bucket
+
+    shift = (bucket >> _HISTOGRAM_SUB_BUCKET_BITS) - 1
+    sub_bucket = bucket & ((1 << _HISTOGRAM_SUB_BUCKET_BITS) - 1)
+    lower_edge = ((1 << _HISTOGRAM_SUB_BUCKET_BITS) | sub_bucket) << shift
+
+    return lower_edge + (1 << shift) - 1
+
+
+if os.environ.get(ENV_VAR, "").lower() not in ("", "0", "false"):
+    enable()
@@ -6,9 +6,12 @@ around the Fortran module ``operations``.
 """
 from __future__ import annotations
 
-from typing import Any
+from collections.abc import Sequence
+from typing import Any, Callable, ClassVar, TypeVar, cast
 
 import fgen_runtime.exceptions as fgr_excs
+import numpy as np
+import numpy.typing as npt
 from attrs import define
 from fgen_runtime.base import (
     INVALID_INSTANCE_INDEX,
@@ -17,19 +20,34 @@ from fgen_runtime.base import (
     check_initialised,
     execute_finalize_on_fail,
 )
-from fgen_runtime.units import verify_units
+from fgen_runtime.exceptions import InitialisationError
 
-try:
-    from fgen_example._lib import operations_w  # type: ignore
-except (ModuleNotFoundError, ImportError) as exc:
-    raise fgr_excs.CompiledExtensionNotFoundError("fgen_example._lib") from exc
+from fgen_example import instrumentation, pool
+from fgen_example._extension import LazyExtensionModule
+from fgen_example.deferred import DeferredResult, OperationQueue
+from fgen_example.units import verify_units
+
+# The compiled extension is only loaded when it is first used
+operations_bulk_w: Any = LazyExtensionModule("operations_bulk_w", globals())
+operations_w: Any = LazyExtensionModule("operations_w", globals())
+
+InstanceT = TypeVar("InstanceT", bound=FinalizableWrapperBase)
 
 _UNITS: dict[str, str] = {
     "weight": "dimensionless",
     "a": "dimensionless",
     "b": "dimensionless",
     "vec_prod_sum": "dimensionless",
+    "vec_prod_sums": "dimensionless",
+}
+
+_OPCODES: dict[str, int] = {
+    "get_weight": 1,
+    "calc_vec_prod_sum": 2,
 }
+"""Opcodes of the deferred operations, as used by ``operations_bulk_w``"""
+
+_LEAK_TRACKER = pool.get_leak_tracker("Operator")
 
 
 @define
@@ -83,7 +101,19 @@ class Operator(FinalizableWrapperBase):
         --------
         :meth:`OperatorContext.from_build_args`
         """
+        return cls.from_build_args_m(weight)
+
+    @classmethod
+    def from_build_args_m(
+        cls,
+        weight: float,
+    ) -> Operator:
+        """
+        Magnitude-only version of :meth:`from_build_args`
 
+        No unit handling is performed.
+        `weight` is a dimensionless magnitude.
+        """
         out = cls.from_new_connection()
         execute_finalize_on_fail(
             out,
@@ -93,6 +123,56 @@ class Operator(FinalizableWrapperBase):
 
         return out
 
+    @classmethod
+    @verify_units(
+        None,
+        (
+            None,
+            _UNITS["weight"],
+        ),
+    )
+    def from_build_args_batch(
+        cls,
+        weight: npt.NDArray[np.float64],
+    ) -> list[Operator]:
+        """
+        Initialise many instances from build arguments
+
+        The instances are claimed and built with a single call to Fortran.
+        The user is responsible for releasing the connections
+        using :func:`finalize_many` (or :attr:`~finalize`)
+        when they are no longer needed.
+
+        Parameters
+        ----------
+        weight
+            Weight to apply to operations for each instance (1D)
+
+        Returns
+        -------
+            Built (i.e. linked to Fortran and initialised)
+            :obj:`Operator`, one per element of `weight`
+
+        Raises
+        ------
+        WrapperErrorUnknownCause
+            If the new instances could not be allocated
+        """
+        return cls.from_build_args_batch_m(weight)
+
+    @classmethod
+    def from_build_args_batch_m(
+        cls,
+        weight: npt.NDArray[np.float64],
+    ) -> list[Operator]:
+        """
+        Magnitude-only version of :meth:`from_build_args_batch`
+
+        No unit handling is performed.
+        `weight` is an array of dimensionless magnitudes.
+        """
+        return _from_build_args_batch_m(cls, weight)
+
     @classmethod
     def from_new_connection(cls) -> Operator:
         """
@@ -112,15 +192,19 @@ class Operator(FinalizableWrapperBase):
         WrapperErrorUnknownCause
             If a new instance could not be allocated
 
-            This could occur if too many instances are allocated at any one time
+            This could occur if the pool of instances could not be grown
+            (e.g. because the system is out of memory)
         """
         instance_index = operations_w.get_free_instance_number()
         if instance_index == INVALID_INSTANCE_INDEX:
             raise fgr_excs.WrapperErrorUnknownCause(  # noqa: TRY003
-                f"Could not create instance of {cls.__name__}. "
+                f"Could not create instance of {cls.__name__}. {get_pool_statistics()}"
             )
 
-        return cls(instance_index)
+        out = cls(instance_index)
+        pool.register_claimed("Operator", (out,), finalize_many)
+
+        return out
 
     # Finalisation
     @check_initialised
@@ -128,9 +212,58 @@ class Operator(FinalizableWrapperBase):
         """
         Close the connection with the Fortran module
         """
+        pool.unregister_claimed("Operator", (self.instance_index,))
         operations_w.instance_finalize(self.instance_index)
+
         self._uninitialise_instance_index()
 
+    # Serialisation
+    def __getstate__(self) -> dict[str, Any]:
+        """
+        Get the state of the underlying Fortran instance
+
+        Returns
+        -------
+            Build arguments (as magnitudes) which re-create the Fortran instance.
+            Empty if the instance is not initialised.
+        """
+        if not self.initialized:
+            return {}
+
+        return {"weight": self.weight_m}
+
+    def __reduce__(self) -> tuple[Callable[..., Any], tuple[Any, ...]]:
+        """
+        Support pickling
+
+        ``instance_index`` only has meaning within the current process,
+        so the state of the Fortran instance is pickled instead.
+        Unpickling builds a new Fortran instance from this state,
+        which the user is responsible for finalising.
+        """
+        return (_from_state, (type(self), self.__getstate__()))
+
+    def __copy__(self) -> Operator:
+        """
+        Copy the instance
+
+        As for pickling, the copy wraps a new Fortran instance
+        built from the state of this one,
+        so changes to one are not reflected in the other.
+        As with any other new instance,
+        the user is responsible for finalising the copy.
+        """
+        return cast(Operator, _from_state(type(self), self.__getstate__()))
+
+    def __deepcopy__(self, memo: dict[int, Any]) -> Operator:
+        """
+        Copy the instance
+
+        The instance holds no Python objects which need copying,
+        so this is the same as :meth:`__copy__`.
+        """
+        return self.__copy__()
+
     # Attribute getters and setters
     @property
     @check_initialised
@@ -151,6 +284,17 @@ class Operator(FinalizableWrapperBase):
             in the underlying instance of the derived type.
             To make changes to the underlying instance, use the setter instead.
         """
+        return self.weight_m
+
+    @property
+    @check_initialised
+    def weight_m(self) -> float:
+        """
+        Magnitude-only version of :attr:`weight`
+
+        No unit handling is performed.
+        The returned value is a dimensionless magnitude.
+        """
         # Wrapping weight
         # Strategy: WrappingStrategyDefault(
         #     magnitude_suffix='_m',
@@ -173,28 +317,57 @@ class Operator(FinalizableWrapperBase):
     )
     def calc_vec_prod_sum(
         self,
-        a: tuple[float, float, float],
-        b: tuple[float, float, float],
+        a: npt.NDArray[np.float64],
+        b: npt.NDArray[np.float64],
     ) -> float:
         """
         Calculate vector product then sum then multiply by `self % weight`
 
+        The vectors can be of any length,
+        but `a` and `b` must have the same length.
+
         Parameters
         ----------
         a
-            first vector
+            first vector (1D)
 
         b
-            second vector
+            second vector (1D)
 
         Returns
         -------
             Result of doing vector product then sum then multiplying by `self % weight`
+
+        Raises
+        ------
+        ValueError
+            `a` and `b` are not 1D or do not have the same length
+        """
+        return self.calc_vec_prod_sum_m(a, b)
+
+    @check_initialised
+    def calc_vec_prod_sum_m(
+        self,
+        a: npt.NDArray[np.float64],
+        b: npt.NDArray[np.float64],
+    ) -> float:
+        """
+        Magnitude-only version of :meth:`calc_vec_prod_sum`
+
+        No unit handling is performed.
+        `a`, `b` and the returned value are dimensionless magnitudes.
         """
         # Wrapping vec_prod_sum
         # Strategy: WrappingStrategyDefault(
         #     magnitude_suffix='_m',
         # )
+        a = _as_vector(a)
+        b = _as_vector(b)
+        if a.shape != b.shape:
+            raise ValueError(  # noqa: TRY003
+                f"a and b must have the same length. Received {a.size=} and {b.size=}"
+            )
+
         vec_prod_sum: float = operations_w.i_calc_vec_prod_sum(
             instance_index=self.instance_index,
             a=a,
@@ -203,6 +376,91 @@ class Operator(FinalizableWrapperBase):
 
         return vec_prod_sum
 
+    @check_initialised
+    @verify_units(
+        _UNITS["vec_prod_sums"],
+        (
+            None,
+            _UNITS["a"],
+            _UNITS["b"],
+        ),
+    )
+    def calc_vec_prod_sum_batch(
+        self,
+        a: npt.NDArray[np.float64],
+        b: npt.NDArray[np.float64],
+    ) -> npt.NDArray[np.float64]:
+        """
+        Calculate vector product then sum then multiply by `self % weight` for each pair of vectors
+
+        The loop over the pairs of vectors happens in Fortran,
+        so the whole batch only crosses the Python-Fortran boundary once.
+
+        Parameters
+        ----------
+        a
+            first vectors, shape ``(N, 3)``
+
+        b
+            second vectors, shape ``(N, 3)``
+
+        Returns
+        -------
+            Result of doing vector product then sum then multiplying by `self % weight`
+            for each pair of vectors, shape ``(N,)``
+        """
+        return self.calc_vec_prod_sum_batch_m(a, b)
+
+    @check_initialised
+    def calc_vec_prod_sum_batch_m(
+        self,
+        a: npt.NDArray[np.float64],
+        b: npt.NDArray[np.float64],
+    ) -> npt.NDArray[np.float64]:
+        """
+        Magnitude-only version of :meth:`calc_vec_prod_sum_batch`
+
+        No unit handling is performed.
+        `a`, `b` and the returned values are dimensionless magnitudes.
+        """
+        # Wrapping vec_prod_sums
+        # Strategy: WrappingStrategyDefault(
+        #     magnitude_suffix='_m',
+        # )
+        a = _as_vector_batch(a)
+        b = _as_vector_batch(b)
+        if a.shape != b.shape:
+            raise ValueError(  # noqa: TRY003
+                f"a and b must have the same shape. Received {a.shape=} and {b.shape=}"
+            )
+
+        # The transpose of a C-contiguous (N, 3) array is a Fortran-contiguous
+        # (3, N) array, so this can be passed to Fortran without copying
+        vec_prod_sums: npt.NDArray[np.float64] = operations_w.i_calc_vec_prod_sum_batch(
+            instance_index=self.instance_index,
+            n=a.shape[0],
+            a=a.T,
+            b=b.T,
+        )
+
+        return vec_prod_sums
+
+    # Deferred operations
+    @check_initialised
+    def batch(self) -> OperatorOperationQueue:
+        """
+        Queue operations on this instance, to run with a single call to Fortran
+
+        Use the queue as a context manager.
+        The queued operations are run when the ``with`` block exits
+        (see :mod:`fgen_example.deferred`).
+
+        Returns
+        -------
+            Empty queue of operations on this instance
+        """
+        return OperatorOperationQueue(self)
+
 
 @define
 class OperatorNoSetters(FinalizableWrapperBase):
@@ -261,7 +519,19 @@ class OperatorNoSetters(FinalizableWrapperBase):
         --------
         :meth:`OperatorNoSettersContext.from_build_args`
         """
+        return cls.from_build_args_m(weight)
+
+    @classmethod
+    def from_build_args_m(
+        cls,
+        weight: float,
+    ) -> OperatorNoSetters:
+        """
+        Magnitude-only version of :meth:`from_build_args`
 
+        No unit handling is performed.
+        `weight` is a dimensionless magnitude.
+        """
         out = cls.from_new_connection()
         execute_finalize_on_fail(
             out,
@@ -271,6 +541,56 @@ class OperatorNoSetters(FinalizableWrapperBase):
 
         return out
 
+    @classmethod
+    @verify_units(
+        None,
+        (
+            None,
+            _UNITS["weight"],
+        ),
+    )
+    def from_build_args_batch(
+        cls,
+        weight: npt.NDArray[np.float64],
+    ) -> list[OperatorNoSetters]:
+        """
+        Initialise many instances from build arguments
+
+        The instances are claimed and built with a single call to Fortran.
+        The user is responsible for releasing the connections
+        using :func:`finalize_many` (or :attr:`~finalize`)
+        when they are no longer needed.
+
+        Parameters
+        ----------
+        weight
+            Weight to apply to operations for each instance (1D)
+
+        Returns
+        -------
+            Built (i.e. linked to Fortran and initialised)
+            :obj:`OperatorNoSetters`, one per element of `weight`
+
+        Raises
+        ------
+        WrapperErrorUnknownCause
+            If the new instances could not be allocated
+        """
+        return cls.from_build_args_batch_m(weight)
+
+    @classmethod
+    def from_build_args_batch_m(
+        cls,
+        weight: npt.NDArray[np.float64],
+    ) -> list[OperatorNoSetters]:
+        """
+        Magnitude-only version of :meth:`from_build_args_batch`
+
+        No unit handling is performed.
+        `weight` is an array of dimensionless magnitudes.
+        """
+        return _from_build_args_batch_m(cls, weight)
+
     @classmethod
     def from_new_connection(cls) -> OperatorNoSetters:
         """
@@ -290,15 +610,19 @@ class OperatorNoSetters(FinalizableWrapperBase):
         WrapperErrorUnknownCause
             If a new instance could not be allocated
 
-            This could occur if too many instances are allocated at any one time
+            This could occur if the pool of instances could not be grown
+            (e.g. because the system is out of memory)
         """
         instance_index = operations_w.get_free_instance_number()
         if instance_index == INVALID_INSTANCE_INDEX:
             raise fgr_excs.WrapperErrorUnknownCause(  # noqa: TRY003
-                f"Could not create instance of {cls.__name__}. "
+                f"Could not create instance of {cls.__name__}. {get_pool_statistics()}"
             )
 
-        return cls(instance_index)
+        out = cls(instance_index)
+        pool.register_claimed("Operator", (out,), finalize_many)
+
+        return out
 
     # Finalisation
     @check_initialised
@@ -306,9 +630,58 @@ class OperatorNoSetters(FinalizableWrapperBase):
         """
         Close the connection with the Fortran module
         """
+        pool.unregister_claimed("Operator", (self.instance_index,))
         operations_w.instance_finalize(self.instance_index)
+
         self._uninitialise_instance_index()
 
+    # Serialisation
+    def __getstate__(self) -> dict[str, Any]:
+        """
+        Get the state of the underlying Fortran instance
+
+        Returns
+        -------
+            Build arguments (as magnitudes) which re-create the Fortran instance.
+            Empty if the instance is not initialised.
+        """
+        if not self.initialized:
+            return {}
+
+        return {"weight": self.weight_m}
+
+    def __reduce__(self) -> tuple[Callable[..., Any], tuple[Any, ...]]:
+        """
+        Support pickling
+
+        ``instance_index`` only has meaning within the current process,
+        so the state of the Fortran instance is pickled instead.
+        Unpickling builds a new Fortran instance from this state,
+        which the user is responsible for finalising.
+        """
+        return (_from_state, (type(self), self.__getstate__()))
+
+    def __copy__(self) -> OperatorNoSetters:
+        """
+        Copy the instance
+
+        As for pickling, the copy wraps a new Fortran instance
+        built from the state of this one,
+        so changes to one are not reflected in the other.
+        As with any other new instance,
+        the user is responsible for finalising the copy.
+        """
+        return cast(OperatorNoSetters, _from_state(type(self), self.__getstate__()))
+
+    def __deepcopy__(self, memo: dict[int, Any]) -> OperatorNoSetters:
+        """
+        Copy the instance
+
+        The instance holds no Python objects which need copying,
+        so this is the same as :meth:`__copy__`.
+        """
+        return self.__copy__()
+
     # Attribute getters
     @property
     @check_initialised
@@ -329,6 +702,17 @@ class OperatorNoSetters(FinalizableWrapperBase):
             in the underlying instance of the derived type.
             To make changes to the underlying instance, use the setter instead.
         """
+        return self.weight_m
+
+    @property
+    @check_initialised
+    def weight_m(self) -> float:
+        """
+        Magnitude-only version of :attr:`weight`
+
+        No unit handling is performed.
+        The returned value is a dimensionless magnitude.
+        """
         # Wrapping weight
         # Strategy: WrappingStrategyDefault(
         #     magnitude_suffix='_m',
@@ -351,28 +735,57 @@ class OperatorNoSetters(FinalizableWrapperBase):
     )
     def calc_vec_prod_sum(
         self,
-        a: tuple[float, float, float],
-        b: tuple[float, float, float],
+        a: npt.NDArray[np.float64],
+        b: npt.NDArray[np.float64],
     ) -> float:
         """
         Calculate vector product then sum then multiply by `self % weight`
 
+        The vectors can be of any length,
+        but `a` and `b` must have the same length.
+
         Parameters
         ----------
         a
-            first vector
+            first vector (1D)
 
         b
-            second vector
+            second vector (1D)
 
         Returns
         -------
             Result of doing vector product then sum then multiplying by `self % weight`
+
+        Raises
+        ------
+        ValueError
+            `a` and `b` are not 1D or do not have the same length
+        """
+        return self.calc_vec_prod_sum_m(a, b)
+
+    @check_initialised
+    def calc_vec_prod_sum_m(
+        self,
+        a: npt.NDArray[np.float64],
+        b: npt.NDArray[np.float64],
+    ) -> float:
+        """
+        Magnitude-only version of :meth:`calc_vec_prod_sum`
+
+        No unit handling is performed.
+        `a`, `b` and the returned value are dimensionless magnitudes.
         """
         # Wrapping vec_prod_sum
         # Strategy: WrappingStrategyDefault(
         #     magnitude_suffix='_m',
         # )
+        a = _as_vector(a)
+        b = _as_vector(b)
+        if a.shape != b.shape:
+            raise ValueError(  # noqa: TRY003
+                f"a and b must have the same length. Received {a.size=} and {b.size=}"
+            )
+
         vec_prod_sum: float = operations_w.i_calc_vec_prod_sum(
             instance_index=self.instance_index,
             a=a,
@@ -381,24 +794,866 @@ class OperatorNoSetters(FinalizableWrapperBase):
 
         return vec_prod_sum
 
+    @check_initialised
+    @verify_units(
+        _UNITS["vec_prod_sums"],
+        (
+            None,
+            _UNITS["a"],
+            _UNITS["b"],
+        ),
+    )
+    def calc_vec_prod_sum_batch(
+        self,
+        a: npt.NDArray[np.float64],
+        b: npt.NDArray[np.float64],
+    ) -> npt.NDArray[np.float64]:
+        """
+        Calculate vector product then sum then multiply by `self % weight` for each pair of vectors
 
-@define
-class OperatorContext(FinalizableWrapperBaseContext):
-    """
-    Context manager for :class:`Operator`
-    """
+        The loop over the pairs of vectors happens in Fortran,
+        so the whole batch only crosses the Python-Fortran boundary once.
 
-    @classmethod
-    def from_build_args(
-        cls,
-        *args: Any,
-        **kwargs: Any,
-    ) -> OperatorContext:
+        Parameters
+        ----------
+        a
+            first vectors, shape ``(N, 3)``
+
+        b
+            second vectors, shape ``(N, 3)``
+
+        Returns
+        -------
+            Result of doing vector product then sum then multiplying by `self % weight`
+            for each pair of vectors, shape ``(N,)``
         """
-        Docstrings to be handled as part of #223
+        return self.calc_vec_prod_sum_batch_m(a, b)
+
+    @check_initialised
+    def calc_vec_prod_sum_batch_m(
+        self,
+        a: npt.NDArray[np.float64],
+        b: npt.NDArray[np.float64],
+    ) -> npt.NDArray[np.float64]:
         """
-        return cls(
-            Operator.from_build_args(*args, **kwargs),
+        Magnitude-only version of :meth:`calc_vec_prod_sum_batch`
+
+        No unit handling is performed.
+        `a`, `b` and the returned values are dimensionless magnitudes.
+        """
+        # Wrapping vec_prod_sums
+        # Strategy: WrappingStrategyDefault(
+        #     magnitude_suffix='_m',
+        # )
+        a = _as_vector_batch(a)
+        b = _as_vector_batch(b)
+        if a.shape != b.shape:
+            raise ValueError(  # noqa: TRY003
+                f"a and b must have the same shape. Received {a.shape=} and {b.shape=}"
+            )
+
+        # The transpose of a C-contiguous (N, 3) array is a Fortran-contiguous
+        # (3, N) array, so this can be passed to Fortran without copying
+        vec_prod_sums: npt.NDArray[np.float64] = operations_w.i_calc_vec_prod_sum_batch(
+            instance_index=self.instance_index,
+            n=a.shape[0],
+            a=a.T,
+            b=b.T,
+        )
+
+        return vec_prod_sums
+
+    # Deferred operations
+    @check_initialised
+    def batch(self) -> OperatorOperationQueue:
+        """
+        Queue operations on this instance, to run with a single call to Fortran
+
+        Use the queue as a context manager.
+        The queued operations are run when the ``with`` block exits
+        (see :mod:`fgen_example.deferred`).
+
+        Returns
+        -------
+            Empty queue of operations on this instance
+        """
+        return OperatorOperationQueue(self)
+
+
+@define(eq=False)
+class OperatorArray:
+    """
+    Collection of Fortran :class:`Operator` instances, handled as a block
+
+    Rather than one wrapper per instance,
+    the collection holds the indexes of all its instances in one array.
+    Attributes are read and written, and methods are applied,
+    for the whole collection with a single call to Fortran,
+    so this is a compact representation for large ensembles.
+
+    The user is responsible for releasing the instances
+    using :meth:`finalize` when they are no longer needed.
+    Alternatively, create the collection inside :func:`fgen_example.pool.arena`.
+    The instances are not released when the collection is garbage collected,
+    even if automatic finalisation is enabled.
+    """
+
+    instance_indexes: npt.NDArray[np.int32] | None = None
+    """
+    Indexes of the Fortran instances in the collection
+
+    ``None`` if the collection is not initialised.
+    """
+
+    @property
+    def initialized(self) -> bool:
+        """
+        Is the collection initialised, i.e. connected to Fortran instances?
+        """
+        return self.instance_indexes is not None
+
+    def __len__(self) -> int:
+        """
+        Get the number of instances in the collection
+        """
+        return 0 if self.instance_indexes is None else self.instance_indexes.size
+
+    # Class methods
+    @classmethod
+    @verify_units(
+        None,
+        (
+            None,
+            _UNITS["weight"],
+        ),
+    )
+    def from_build_args(
+        cls,
+        weight: npt.NDArray[np.float64],
+    ) -> OperatorArray:
+        """
+        Initialise from build arguments
+
+        The instances are claimed and built with a single call to Fortran.
+
+        Parameters
+        ----------
+        weight
+            Weight for each instance (1D)
+
+        Returns
+        -------
+            Built collection, with one instance per element of `weight`
+
+        Raises
+        ------
+        WrapperErrorUnknownCause
+            If the new instances could not be allocated
+        """
+        return cls.from_build_args_m(weight)
+
+    @classmethod
+    def from_build_args_m(
+        cls,
+        weight: npt.NDArray[np.float64],
+    ) -> OperatorArray:
+        """
+        Magnitude-only version of :meth:`from_build_args`
+
+        No unit handling is performed.
+        `weight` is an array of dimensionless magnitudes.
+        """
+        weight = _as_batch(weight)
+        instance_indexes = operations_bulk_w.instances_build(
+            n=weight.size,
+            weight=weight,
+        )
+        if np.any(instance_indexes == INVALID_INSTANCE_INDEX):
+            raise fgr_excs.WrapperErrorUnknownCause(  # noqa: TRY003
+                f"Could not create {weight.size} instances of {cls.__name__}. {get_pool_statistics()}"
+            )
+
+        out = cls(instance_indexes)
+        pool.register_claimed_array("Operator", out, _finalize_arrays)
+
+        return out
+
+    # Finalisation
+    @check_initialised
+    def finalize(self) -> None:
+        """
+        Close the connection of all the instances with the Fortran module
+
+        All the connections are closed with a single call to Fortran.
+        """
+        _finalize_arrays((self,))
+
+    # Attribute getters and setters
+    @property
+    @check_initialised
+    @verify_units(
+        _UNITS["weight"],
+        (None,),
+    )
+    def weight(self) -> npt.NDArray[np.float64]:
+        """
+        Weight of each instance
+
+        Returns
+        -------
+            Attribute values, retrieved from Fortran with a single call.
+
+            The values are a copy of the instances' data.
+            Changes to these values will not be reflected
+            in the underlying instances.
+            To make changes to the underlying instances, use :meth:`set_weight`.
+        """
+        return self.weight_m
+
+    @property
+    @check_initialised
+    def weight_m(self) -> npt.NDArray[np.float64]:
+        """
+        Magnitude-only version of :attr:`weight`
+
+        No unit handling is performed.
+        The returned values are dimensionless magnitudes.
+        """
+        weight: npt.NDArray[np.float64] = operations_bulk_w.iget_weight_batch(
+            n=len(self),
+            instance_indexes=self._instance_indexes,
+        )
+
+        return weight
+
+    @check_initialised
+    @verify_units(
+        None,
+        (
+            None,
+            _UNITS["weight"],
+        ),
+    )
+    def set_weight(
+        self,
+        weight: npt.NDArray[np.float64],
+    ) -> None:
+        """
+        Set the weight of each instance
+
+        Parameters
+        ----------
+        weight
+            Weight for each instance.
+            A single value is applied to every instance.
+        """
+        self.set_weight_m(weight)
+
+    @check_initialised
+    def set_weight_m(
+        self,
+        weight: npt.NDArray[np.float64],
+    ) -> None:
+        """
+        Magnitude-only version of :meth:`set_weight`
+
+        No unit handling is performed.
+        `weight` is a dimensionless magnitude (or magnitudes).
+        """
+        operations_bulk_w.iset_weight_batch(
+            n=len(self),
+            instance_indexes=self._instance_indexes,
+            weight=_as_per_instance(weight, len(self)),
+        )
+
+    # Wrapped methods
+    @check_initialised
+    @verify_units(
+        _UNITS["vec_prod_sums"],
+        (
+            None,
+            _UNITS["a"],
+            _UNITS["b"],
+        ),
+    )
+    def calc_vec_prod_sum(
+        self,
+        a: npt.NDArray[np.float64],
+        b: npt.NDArray[np.float64],
+    ) -> npt.NDArray[np.float64]:
+        """
+        Calculate vector product then sum then multiply by the weight of each instance
+
+        Parameters
+        ----------
+        a
+            first vector, shape ``(M,)`` to use the same vector for every instance
+            or ``(N, M)`` for one vector per instance
+
+        b
+            second vector, with the same shape as `a`
+
+        Returns
+        -------
+            Result of doing vector product then sum then multiplying by the weight
+            for each instance, shape ``(N,)``
+        """
+        return self.calc_vec_prod_sum_m(a, b)
+
+    @check_initialised
+    def calc_vec_prod_sum_m(
+        self,
+        a: npt.NDArray[np.float64],
+        b: npt.NDArray[np.float64],
+    ) -> npt.NDArray[np.float64]:
+        """
+        Magnitude-only version of :meth:`calc_vec_prod_sum`
+
+        No unit handling is performed.
+        `a`, `b` and the returned values are dimensionless magnitudes.
+        """
+        a = _as_vector_per_instance(a, len(self))
+        b = _as_vector_per_instance(b, len(self))
+        if a.shape[1] != b.shape[1]:
+            raise ValueError(  # noqa: TRY003
+                f"a and b must have the same shape. Received {a.shape=} and {b.shape=}"
+            )
+
+        # The transpose of a C-contiguous (N, M) array is a Fortran-contiguous
+        # (M, N) array, so this can be passed to Fortran without copying
+        vec_prod_sums: npt.NDArray[np.float64] = operations_bulk_w.i_calc_vec_prod_sum_batch(
+            n=len(self),
+            m=a.shape[1],
+            instance_indexes=self._instance_indexes,
+            n_a=a.shape[0],
+            a=a.T,
+            n_b=b.shape[0],
+            b=b.T,
+        )
+
+        return vec_prod_sums
+
+    @property
+    def _instance_indexes(self) -> npt.NDArray[np.int32]:
+        """
+        Indexes of the instances, for use once initialisation has been checked
+        """
+        return cast(npt.NDArray[np.int32], self.instance_indexes)
+
+
+@define(eq=False)
+class OperatorOperationQueue(OperationQueue):
+    """
+    Queue of operations on an :class:`Operator`, run with a single call to Fortran
+
+    Create the queue with :meth:`Operator.batch`
+    and use it as a context manager.
+    Each method queues an operation and returns its (deferred) result.
+    The outputs of all the operations are dimensionless.
+    """
+
+    units: ClassVar[str] = _UNITS["vec_prod_sum"]
+
+    def get_weight(self) -> DeferredResult:
+        """
+        Queue getting the weight
+
+        Returns
+        -------
+            Weight, once the queue has been run
+        """
+        return self._queue(_OPCODES["get_weight"])
+
+    @verify_units(
+        None,
+        (
+            None,
+            _UNITS["a"],
+            _UNITS["b"],
+        ),
+    )
+    def calc_vec_prod_sum(
+        self,
+        a: npt.NDArray[np.float64],
+        b: npt.NDArray[np.float64],
+    ) -> DeferredResult:
+        """
+        Queue calculating vector product then sum then multiplying by weight
+
+        Parameters
+        ----------
+        a
+            first vector
+
+        b
+            second vector
+
+        Returns
+        -------
+            Result of doing vector product then sum then multiplying by the weight,
+            once the queue has been run
+
+        Raises
+        ------
+        ValueError
+            `a` and `b` are not 1D or do not have the same length
+        """
+        return self.calc_vec_prod_sum_m(a, b)
+
+    def calc_vec_prod_sum_m(
+        self,
+        a: npt.NDArray[np.float64],
+        b: npt.NDArray[np.float64],
+    ) -> DeferredResult:
+        """
+        Magnitude-only version of :meth:`calc_vec_prod_sum`
+
+        No unit handling is performed.
+        `a` and `b` are dimensionless magnitudes.
+        """
+        a = _as_vector(a)
+        b = _as_vector(b)
+        if a.shape != b.shape:
+            raise ValueError(  # noqa: TRY003
+                f"a and b must have the same length. Received {a.size=} and {b.size=}"
+            )
+
+        # The dispatch routine splits the operands in half to get a and b
+        return self._queue(_OPCODES["calc_vec_prod_sum"], (*a.tolist(), *b.tolist()))
+
+    def _dispatch(
+        self,
+        opcodes: npt.NDArray[np.int32],
+        instance_indexes: npt.NDArray[np.int32],
+        operand_offsets: npt.NDArray[np.int32],
+        operands: npt.NDArray[np.float64],
+    ) -> npt.NDArray[np.float64]:
+        outputs: npt.NDArray[np.float64] = operations_bulk_w.i_dispatch(
+            n=opcodes.size,
+            opcodes=opcodes,
+            instance_indexes=instance_indexes,
+            operand_offsets=operand_offsets,
+            n_operands=operands.size,
+            operands=operands,
+        )
+
+        return outputs
+
+
+@verify_units(
+    (None, _UNITS["weight"]),
+    (),
+)
+def export_instances() -> tuple[npt.NDArray[np.int32], npt.NDArray[np.float64]]:
+    """
+    Get the state of all the live :class:`Operator` instances
+
+    The state of every instance in the pool is retrieved with a single call to Fortran,
+    without going through any wrappers.
+
+    Returns
+    -------
+        Index of each live instance (in increasing order)
+        and its `weight`
+    """
+    return export_instances_m()
+
+
+def export_instances_m() -> tuple[npt.NDArray[np.int32], npt.NDArray[np.float64]]:
+    """
+    Magnitude-only version of :func:`export_instances`
+
+    No unit handling is performed.
+    The returned `weight` values are dimensionless magnitudes.
+    """
+    instance_indexes, weight = pool.export_live_instances(
+        operations_bulk_w.instances_export,
+        get_pool_statistics().n_live,
+    )
+
+    return instance_indexes, weight
+
+
+def finalize_many(
+    instances: Sequence[Operator | OperatorNoSetters],
+) -> None:
+    """
+    Close the connection of many instances with the Fortran module
+
+    All the connections are closed with a single call to Fortran.
+
+    Parameters
+    ----------
+    instances
+        Instances to finalise
+
+    Raises
+    ------
+    InitialisationError
+        Any of the instances is not initialised
+
+    ValueError
+        The same instance appears more than once in `instances`
+    """
+    instance_indexes = _get_instance_indexes(instances, finalize_many)
+    if np.unique(instance_indexes).size != instance_indexes.size:
+        raise ValueError("Each instance can only be finalised once")  # noqa: TRY003
+
+    pool.unregister_claimed("Operator", instance_indexes)
+    operations_bulk_w.instances_finalize(
+        n=instance_indexes.size,
+        instance_indexes=instance_indexes,
+    )
+
+    for instance in instances:
+        instance._uninitialise_instance_index()
+
+
+def get_instance_capacity() -> int:
+    """
+    Get the number of :class:`Operator` instances that can exist without growing the pool
+
+    The pool is shared by all the wrappers of the Fortran :class:`Operator`.
+
+    Returns
+    -------
+        Current capacity of the pool of Fortran instances
+    """
+    capacity: int = operations_bulk_w.get_capacity()
+
+    return capacity
+
+
+def get_pool_statistics() -> pool.PoolStatistics:
+    """
+    Get statistics about the occupancy of the :class:`Operator` instance pool
+
+    The pool is shared by all the wrappers of the Fortran :class:`Operator`.
+
+    Returns
+    -------
+        Capacity, number of live instances, high-water mark
+        and total number of instances claimed and finalised
+    """
+    (
+        capacity,
+        n_live,
+        high_water_mark,
+        n_claimed,
+        n_finalized,
+    ) = operations_bulk_w.get_statistics()
+
+    return pool.PoolStatistics(
+        capacity=int(capacity),
+        n_live=int(n_live),
+        high_water_mark=int(high_water_mark),
+        n_claimed=int(n_claimed),
+        n_finalized=int(n_finalized),
+    )
+
+
+def get_leak_report() -> list[pool.LeakedInstance]:
+    """
+    Get the :class:`Operator` instances which are currently live
+
+    If leak tracking is enabled (see :mod:`fgen_example.pool`),
+    the report includes where each instance was created.
+
+    Returns
+    -------
+        Each live instance, in order of instance index
+    """
+    (instance_indexes,) = pool.export_live_instances(
+        operations_bulk_w.get_live_instance_indexes,
+        get_pool_statistics().n_live,
+    )
+
+    return _LEAK_TRACKER.get_leak_report(instance_indexes)
+
+
+@verify_units(
+    None,
+    (None, _UNITS["weight"]),
+)
+def import_instances(
+    instance_indexes: npt.NDArray[np.int32],
+    weight: npt.NDArray[np.float64],
+) -> OperatorArray:
+    """
+    Restore :class:`Operator` instances with the given indexes
+
+    This is the counterpart of :func:`export_instances`.
+    The instances are claimed and built with a single call to Fortran.
+    To get a wrapper for an individual instance,
+    use ``Operator(instance_index)``.
+
+    Parameters
+    ----------
+    instance_indexes
+        Index to give each instance.
+        None of the indexes can already be in use.
+
+    weight
+        `weight` of each instance
+
+    Returns
+    -------
+        Collection of the restored instances
+
+    Raises
+    ------
+    ValueError
+        The indexes are not unique and positive,
+        are already in use or the pool could not be grown to hold them
+    """
+    return import_instances_m(instance_indexes, weight)
+
+
+def import_instances_m(
+    instance_indexes: npt.NDArray[np.int32],
+    weight: npt.NDArray[np.float64],
+) -> OperatorArray:
+    """
+    Magnitude-only version of :func:`import_instances`
+
+    No unit handling is performed.
+    `weight` is an array of dimensionless magnitudes.
+    """
+    instance_indexes = np.ascontiguousarray(instance_indexes, dtype=np.int32)
+    weight = _as_batch(weight)
+    if instance_indexes.shape != weight.shape:
+        raise ValueError(  # noqa: TRY003
+            "instance_indexes and weight must have the same shape. "
+            f"Received {instance_indexes.shape=} and {weight.shape=}"
+        )
+
+    if np.unique(instance_indexes).size != instance_indexes.size:
+        raise ValueError(  # noqa: TRY003
+            "Each instance index can only be imported once"
+        )
+
+    success = operations_bulk_w.instances_import(
+        n=instance_indexes.size,
+        instance_indexes=instance_indexes,
+        weight=weight,
+    )
+    if not success:
+        raise ValueError(  # noqa: TRY003
+            "Could not claim the requested instance indexes. "
+            "They must be positive and not already in use. "
+            f"{get_pool_statistics()}"
+        )
+
+    out = OperatorArray(instance_indexes)
+    pool.register_claimed_array("Operator", out, _finalize_arrays)
+
+    return out
+
+
+def reserve_instances(capacity: int) -> None:
+    """
+    Reserve capacity for :class:`Operator` instances up front
+
+    The pool of Fortran instances grows geometrically when it runs out of space.
+    Reserving capacity avoids repeatedly growing the pool
+    when many instances are created.
+    If no instances have been created yet,
+    this also sets the size of the first block of the pool.
+
+    Existing instances are unaffected.
+
+    Parameters
+    ----------
+    capacity
+        Number of instances that the pool should be able to hold
+
+    Raises
+    ------
+    WrapperErrorUnknownCause
+        The pool could not be grown to the requested capacity
+    """
+    if not operations_bulk_w.reserve(capacity):
+        raise fgr_excs.WrapperErrorUnknownCause(  # noqa: TRY003
+            f"Could not reserve capacity for {capacity} instances of Operator"
+        )
+
+
+def _as_batch(values: npt.ArrayLike) -> npt.NDArray[np.float64]:
+    """
+    Convert values to a 1D, contiguous array that can be passed to Fortran
+    """
+    out = np.ascontiguousarray(values, dtype=np.float64)
+    if out.ndim != 1:
+        raise ValueError(  # noqa: TRY003
+            f"Batched values must be 1D. Received shape: {out.shape}"
+        )
+
+    return out
+
+
+def _as_vector(values: npt.ArrayLike) -> npt.NDArray[np.float64]:
+    """
+    Convert a vector to a 1D, contiguous array that can be passed to Fortran
+    """
+    out = np.ascontiguousarray(values, dtype=np.float64)
+    if out.ndim != 1:
+        raise ValueError(  # noqa: TRY003
+            f"Vectors must be 1D. Received shape: {out.shape}"
+        )
+
+    return out
+
+
+def _as_vector_batch(values: npt.ArrayLike) -> npt.NDArray[np.float64]:
+    """
+    Convert a stack of 3-vectors to a C-contiguous ``(N, 3)`` array
+    """
+    out = np.ascontiguousarray(values, dtype=np.float64)
+    if out.ndim != 2 or out.shape[1] != 3:  # noqa: PLR2004
+        raise ValueError(  # noqa: TRY003
+            f"Batched vectors must have shape (N, 3). Received shape: {out.shape}"
+        )
+
+    return out
+
+
+def _as_per_instance(values: npt.ArrayLike, n: int) -> npt.NDArray[np.float64]:
+    """
+    Convert a single value, or one value per instance, to one value per instance
+    """
+    out = np.asarray(values, dtype=np.float64)
+    if out.ndim == 0:
+        return np.full(n, out, dtype=np.float64)
+
+    out = _as_batch(out)
+    if out.size != n:
+        raise ValueError(  # noqa: TRY003
+            f"Expected a single value or {n} values. Received shape: {out.shape}"
+        )
+
+    return out
+
+
+def _as_vector_per_instance(values: npt.ArrayLike, n: int) -> npt.NDArray[np.float64]:
+    """
+    Convert a single vector, or one vector per instance, to a C-contiguous array
+
+    A single vector is returned as a ``(1, M)`` array
+    (rather than being copied for every instance)
+    and one vector per instance as an ``(n, M)`` array.
+    """
+    out = np.asarray(values, dtype=np.float64)
+    if out.ndim == 1:
+        out = out[np.newaxis, :]
+
+    elif out.ndim != 2 or out.shape[0] != n:  # noqa: PLR2004
+        raise ValueError(  # noqa: TRY003
+            f"Vectors must have shape (M,) or ({n}, M). Received shape: {out.shape}"
+        )
+
+    return np.ascontiguousarray(out)
+
+
+def _finalize_arrays(arrays: Sequence[OperatorArray]) -> None:
+    """
+    Close the connection of the instances in many collections
+
+    All the connections are closed with a single call to Fortran.
+    Used by :meth:`OperatorArray.finalize` and by arenas.
+    """
+    instance_indexes = np.concatenate([v._instance_indexes for v in arrays])
+    pool.unregister_claimed("Operator", instance_indexes)
+    operations_bulk_w.instances_finalize(
+        n=instance_indexes.size,
+        instance_indexes=instance_indexes,
+    )
+
+    for array in arrays:
+        array.instance_indexes = None
+
+
+def _release_instance(instance_index: int) -> None:
+    """
+    Finalise an instance whose wrapper has been garbage collected
+
+    Used for automatic finalisation (see :mod:`fgen_example.pool`).
+    """
+    pool.unregister_claimed("Operator", (instance_index,))
+    operations_w.instance_finalize(instance_index)
+
+
+def _from_build_args_batch_m(
+    cls: type[InstanceT],
+    weight: npt.NDArray[np.float64],
+) -> list[InstanceT]:
+    """
+    Claim and build many instances with a single call to Fortran
+
+    Used by both :meth:`Operator.from_build_args_batch_m`
+    and :meth:`OperatorNoSetters.from_build_args_batch_m`.
+    """
+    weight = _as_batch(weight)
+    instance_indexes = operations_bulk_w.instances_build(
+        n=weight.size,
+        weight=weight,
+    )
+    if np.any(instance_indexes == INVALID_INSTANCE_INDEX):
+        raise fgr_excs.WrapperErrorUnknownCause(  # noqa: TRY003
+            f"Could not create {weight.size} instances of {cls.__name__}. {get_pool_statistics()}"
+        )
+
+    out = [cls(int(instance_index)) for instance_index in instance_indexes]
+    pool.register_claimed("Operator", out, finalize_many)
+
+    return out
+
+
+def _from_state(
+    cls: type[Operator] | type[OperatorNoSetters],
+    state: dict[str, Any],
+) -> Operator | OperatorNoSetters:
+    """
+    Create an instance from the state returned by ``__getstate__``
+
+    Used when unpickling.
+    """
+    if not state:
+        return cls()
+
+    return cls.from_build_args_m(**state)
+
+
+def _get_instance_indexes(
+    instances: Sequence[Operator | OperatorNoSetters],
+    method: Callable[..., Any],
+) -> npt.NDArray[np.int32]:
+    """
+    Get the instance indexes of many instances, checking each is initialised
+    """
+    for instance in instances:
+        if not instance.initialized:
+            raise InitialisationError(instance, method)
+
+    return np.array([v.instance_index for v in instances], dtype=np.int32)
+
+
+@define
+class OperatorContext(FinalizableWrapperBaseContext):
+    """
+    Context manager for :class:`Operator`
+    """
+
+    @classmethod
+    def from_build_args(
+        cls,
+        *args: Any,
+        **kwargs: Any,
+    ) -> OperatorContext:
+        """
+        Docstrings to be handled as part of #223
+        """
+        return cls(
+            Operator.from_build_args(*args, **kwargs),
         )
 
 
@@ -420,3 +1675,34 @@ class OperatorNoSettersContext(FinalizableWrapperBaseContext):
         return cls(
             OperatorNoSetters.from_build_args(*args, **kwargs),
         )
+
+
+# Tell the pool how to release instances whose wrappers are garbage collected
+pool.get_auto_finalizer("Operator", _release_instance)
+
+# Only these methods call into the compiled extension,
+# so only the time spent in them is reported as Fortran time
+instrumentation.register(
+    Operator,
+    OperatorNoSetters,
+    calls_fortran=(
+        "from_build_args_m",
+        "from_build_args_batch_m",
+        "from_new_connection",
+        "finalize",
+        "weight_m",
+        "calc_vec_prod_sum_m",
+        "calc_vec_prod_sum_batch_m",
+    ),
+)
+instrumentation.register(
+    OperatorArray,
+    calls_fortran=(
+        "from_build_args_m",
+        "finalize",
+        "weight_m",
+        "set_weight_m",
+        "calc_vec_prod_sum_m",
+    ),
+)
+instrumentation.register(OperatorOperationQueue)
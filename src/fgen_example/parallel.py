@@ -0,0 +1,352 @@
+"""
+Parallelism
+
+There are two levels of parallelism.
+
+Python threads
+    The wrapped methods
+    (e.g. :meth:`~fgen_example.operations.Operator.calc_vec_prod_sum_batch`)
+    and attribute getters release the GIL while running in Fortran.
+    As a result, calls on different instances from different threads
+    can run concurrently.
+    :func:`map_instances` and :func:`map_batch` make it easy to spread work over a
+    :class:`concurrent.futures.ThreadPoolExecutor`.
+
+    Only wrapped methods and getters release the GIL.
+    Creating and finalising instances does not,
+    but is safe to do while wrapped methods are running in other threads.
+
+Processes
+    Instances can be pickled
+    (their Fortran state is captured and rebuilt in the receiving process),
+    so work can also be spread over processes.
+    :func:`map_processes` does this with a
+    :class:`concurrent.futures.ProcessPoolExecutor`.
+
+OpenMP
+    If the extension is built with OpenMP
+    (``CMAKE_ARGS="-DFGEN_EXAMPLE_OPENMP=ON"``),
+    the batch kernels
+    (e.g. :meth:`~fgen_example.derived_type.DerivedType.add_batch`)
+    split large batches over OpenMP threads within a single call.
+    The number of threads is controlled with :func:`set_num_threads`.
+    Batches smaller than :func:`get_min_parallel_batch_size`
+    are processed serially.
+"""
+from __future__ import annotations
+
+import concurrent.futures
+import functools
+from collections.abc import Iterable, Sequence
+from typing import Any, Callable, TypeVar
+
+import numpy as np
+import numpy.typing as npt
+from fgen_runtime.base import FinalizableWrapperBase
+
+from fgen_example._extension import LazyExtensionModule
+
+# The compiled extension is only loaded when it is first used
+parallel_w: Any = LazyExtensionModule("parallel_w", globals())
+
+T = TypeVar("T")
+InstanceT = TypeVar("InstanceT")
+
+
+def map_instances(
+    func: Callable[..., T],
+    instances: Sequence[InstanceT],
+    *iterables: Iterable[Any],
+    max_workers: int | None = None,
+    executor: concurrent.futures.Executor | None = None,
+) -> list[T]:
+    """
+    Call a function on each of many instances in a thread pool
+
+    Parameters
+    ----------
+    func
+        Function to call, e.g. ``Operator.calc_vec_prod_sum_batch``.
+        It is called as ``func(instance, *args)``,
+        where ``args`` are taken from ``iterables`` (as for :func:`map`).
+
+    instances
+        Instances on which to call ``func``
+
+    *iterables
+        Further arguments to pass to ``func``, one element per instance
+
+    max_workers
+        Maximum number of threads to use.
+        Defaults to the number of instances.
+        Ignored if ``executor`` is supplied.
+
+    executor
+        Executor to use.
+        If not supplied, a :class:`concurrent.futures.ThreadPoolExecutor`
+        is created (and shut down) for this call.
+
+    Returns
+    -------
+        Result of calling ``func`` on each instance, in the order of ``instances``
+    """
+    if executor is not None:
+        return list(executor.map(func, instances, *iterables))
+
+    if not instances:
+        return []
+
+    with concurrent.futures.ThreadPoolExecutor(
+        max_workers=max_workers if max_workers is not None else len(instances)
+    ) as pool:
+        return list(pool.map(func, instances, *iterables))
+
+
+def map_batch(
+    func: Callable[..., npt.NDArray[Any]],
+    instances: Sequence[InstanceT],
+    *batches: npt.NDArray[Any],
+    max_workers: int | None = None,
+    executor: concurrent.futures.Executor | None = None,
+) -> npt.NDArray[Any]:
+    """
+    Split a batch across many instances and process the pieces in a thread pool
+
+    Each batch is split into (roughly) equal pieces along its first axis,
+    one piece per instance.
+    The instances should be equivalent (e.g. built with the same arguments)
+    so that it doesn't matter which instance processes which piece.
+
+    Parameters
+    ----------
+    func
+        Batched function to call, e.g. ``Operator.calc_vec_prod_sum_batch_m``.
+        It is called as ``func(instance, *pieces)``
+        and must return an array whose first axis matches the pieces'.
+
+    instances
+        Instances over which to spread the batch
+
+    *batches
+        Batched arguments to pass to ``func``.
+        They must all have the same length along their first axis.
+
+    max_workers
+        Maximum number of threads to use.
+        Defaults to the number of instances.
+        Ignored if ``executor`` is supplied.
+
+    executor
+        Executor to use.
+        If not supplied, a :class:`concurrent.futures.ThreadPoolExecutor`
+        is created (and shut down) for this call.
+
+    Returns
+    -------
+        Results from each piece, concatenated along the first axis
+
+    Raises
+    ------
+    ValueError
+        No instances are given or the batches have different lengths
+    """
+    if not instances:
+        raise ValueError("At least one instance is required")  # noqa: TRY003
+
+    lengths = {len(batch) for batch in batches}
+    if len(lengths) > 1:
+        raise ValueError(  # noqa: TRY003
+            f"All batches must have the same length. Received lengths: {lengths}"
+        )
+
+    # Don't use more instances than there are elements in the batch
+    n_pieces = max(min([len(instances), *lengths]), 1)
+    pieces = [np.array_split(batch, n_pieces) for batch in batches]
+
+    results = map_instances(
+        func,
+        instances[:n_pieces],
+        *pieces,
+        max_workers=max_workers,
+        executor=executor,
+    )
+
+    return np.concatenate(results)
+
+
+def map_processes(
+    func: Callable[..., T],
+    instances: Sequence[FinalizableWrapperBase],
+    *iterables: Iterable[Any],
+    max_workers: int | None = None,
+    executor: concurrent.futures.ProcessPoolExecutor | None = None,
+    chunksize: int = 1,
+) -> list[T]:
+    """
+    Call a function on each of many instances in a process pool
+
+    Each instance is pickled, i.e. its state is sent to a worker process
+    where an equivalent instance is built.
+    The worker's instance is finalised once ``func`` has been called,
+    so no Fortran instances are leaked in the worker processes.
+
+    Parameters
+    ----------
+    func
+        Function to call, e.g. ``Operator.calc_vec_prod_sum_batch``.
+        It is called as ``func(instance, *args)``,
+        where ``args`` are taken from ``iterables`` (as for :func:`map`).
+        ``func``, its arguments and its return value must be picklable.
+        The return value should not contain instances,
+        as they are finalised in the worker before being returned.
+
+    instances
+        Instances on which to call ``func``
+
+    *iterables
+        Further arguments to pass to ``func``, one element per instance
+
+    max_workers
+        Maximum number of processes to use.
+        Defaults to :class:`concurrent.futures.ProcessPoolExecutor`'s default.
+        Ignored if ``executor`` is supplied.
+
+    executor
+        Process pool to use.
+        If not supplied, a :class:`concurrent.futures.ProcessPoolExecutor`
+        is created (and shut down) for this call.
+
+    chunksize
+        Number of calls to send to a worker process at a time.
+        Larger values reduce the communication overhead for cheap calls.
+
+    Returns
+    -------
+        Result of calling ``func`` on each instance, in the order of ``instances``
+
+    Raises
+    ------
+    TypeError
+        ``executor`` is not a :class:`concurrent.futures.ProcessPoolExecutor`.
+        With other executors (e.g. a thread pool),
+        the instances aren't pickled,
+        so the caller's own instances would be finalised.
+        Use :func:`map_instances` for thread pools instead.
+    """
+    call = functools.partial(_call_and_finalize, func)
+
+    if executor is not None:
+        if not isinstance(executor, concurrent.futures.ProcessPoolExecutor):
+            raise TypeError(  # noqa: TRY003
+                f"executor must be a ProcessPoolExecutor. Received {type(executor).__name__}"
+            )
+
+        return list(executor.map(call, instances, *iterables, chunksize=chunksize))
+
+    if not instances:
+        return []
+
+    with concurrent.futures.ProcessPoolExecutor(max_workers=max_workers) as pool:
+        return list(pool.map(call, instances, *iterables, chunksize=chunksize))
+
+
+def _call_and_finalize(func: Callable[..., T], instance: FinalizableWrapperBase, *args: Any) -> T:
+    """
+    Call a function on an instance, then finalise the instance
+    """
+    try:
+        return func(instance, *args)
+    finally:
+        if instance.initialized:
+            instance.finalize()
+
+
+def openmp_enabled() -> bool:
+    """
+    Get whether the extension was built with OpenMP
+
+    Returns
+    -------
+        ``True`` if the batch kernels can run over many OpenMP threads
+    """
+    return bool(parallel_w.openmp_enabled())
+
+
+def get_num_threads() -> int:
+    """
+    Get the number of OpenMP threads used by the batch kernels
+
+    Returns
+    -------
+        Number of threads. Always one if the extension was built without OpenMP.
+    """
+    num_threads: int = parallel_w.get_num_threads()
+
+    return num_threads
+
+
+def set_num_threads(num_threads: int) -> None:
+    """
+    Set the number of OpenMP threads used by the batch kernels
+
+    The setting applies to batch kernels called from any thread
+    (e.g. from :func:`map_instances`' worker threads),
+    not only the thread which calls this.
+    This has no effect if the extension was built without OpenMP
+    (see :func:`openmp_enabled`).
+
+    Parameters
+    ----------
+    num_threads
+        Number of threads to use
+
+    Raises
+    ------
+    ValueError
+        ``num_threads`` is less than one
+    """
+    if num_threads < 1:
+        raise ValueError(  # noqa: TRY003
+            f"num_threads must be at least one. Received: {num_threads}"
+        )
+
+    parallel_w.set_num_threads(num_threads)
+
+
+def get_min_parallel_batch_size() -> int:
+    """
+    Get the smallest batch which the batch kernels split over OpenMP threads
+
+    Returns
+    -------
+        Minimum batch size. Smaller batches are processed serially.
+    """
+    batch_size: int = parallel_w.get_min_parallel_batch_size()
+
+    return batch_size
+
+
+def set_min_parallel_batch_size(batch_size: int) -> None:
+    """
+    Set the smallest batch which the batch kernels split over OpenMP threads
+
+    For small batches, the cost of starting the threads
+    outweighs the benefit of using them,
+    so smaller batches are processed serially.
+
+    Parameters
+    ----------
+    batch_size
+        Minimum batch size
+
+    Raises
+    ------
+    ValueError
+        ``batch_size`` is less than one
+    """
+    if batch_size < 1:
+        raise ValueError(  # noqa: TRY003
+            f"batch_size must be at least one. Received: {batch_size}"
+        )
+
+    parallel_w.set_min_parallel_batch_size(batch_size)
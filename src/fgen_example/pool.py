@@ -0,0 +1,700 @@
+"""
+Instance pool diagnostics and automatic release
+
+Each wrapped Fortran derived type has a pool of instances,
+shared by all the wrappers of that type.
+An instance is claimed from the pool when a wrapper is built
+and only returned to the pool when the wrapper is finalised.
+Wrappers which are never finalised therefore leak pool slots.
+
+Each wrapper module provides ``get_pool_statistics``,
+which reports how full its pool is
+(e.g. :func:`fgen_example.derived_type.get_pool_statistics`),
+and ``get_leak_report``,
+which lists the instances that are currently live.
+
+If leak tracking is enabled
+(by setting the environment variable ``FGEN_EXAMPLE_TRACK_LEAKS=1``
+before importing the wrappers or by calling :func:`enable_leak_tracking`),
+the stack trace of the code which created each instance is recorded too,
+so the leak report shows where each live instance was created.
+Recording the stack trace is slow,
+so leak tracking is intended for debugging only.
+
+.. code-block:: python
+
+    from fgen_example import derived_type, pool
+
+    pool.enable_leak_tracking()
+    # ... run the code which leaks instances
+    print(pool.format_leak_report(derived_type.get_leak_report()))
+
+Automatic release
+    If automatic finalisation is enabled
+    (by setting the environment variable ``FGEN_EXAMPLE_AUTO_FINALIZE=1``
+    before importing the wrappers or by calling :func:`enable_auto_finalize`),
+    the instances claimed from then on are returned to the pool
+    when their wrapper is garbage collected,
+    if they haven't been finalised already.
+    Explicit finalisation (including via the context managers)
+    still works as before and is still the best way
+    to release instances promptly.
+
+    Only the wrapper which claimed an instance releases it.
+    Other wrappers created for the same instance index
+    (e.g. ``DerivedType(instance_index)``) do not,
+    so the claiming wrapper must outlive them.
+
+Arenas
+    Code which creates many short-lived instances
+    can create them inside an arena (see :func:`arena`).
+    Every instance claimed inside the arena
+    is finalised when the arena exits,
+    with one bulk finalisation per derived type
+    rather than one call to Fortran per instance.
+
+    .. code-block:: python
+
+        import fgen_example
+
+        with fgen_example.arena():
+            dt = DerivedType.from_build_args(Q(3, "m"))
+            op = Operator.from_build_args(Q(2, "1"))
+            ...
+        # dt and op have been finalised
+
+    The current arena is tracked with a :class:`contextvars.ContextVar`,
+    so arenas in different threads or asyncio tasks are independent.
+    Threads started inside an arena do not use it.
+"""
+from __future__ import annotations
+
+import contextvars
+import os
+import threading
+import traceback
+import weakref
+from collections.abc import Iterable, Sequence
+from pathlib import Path
+from types import TracebackType
+from typing import Any, Callable
+
+import numpy as np
+import numpy.typing as npt
+from attrs import define, field
+
+ENV_VAR: str = "FGEN_EXAMPLE_TRACK_LEAKS"
+"""Environment variable which enables leak tracking at import time"""
+
+AUTO_FINALIZE_ENV_VAR: str = "FGEN_EXAMPLE_AUTO_FINALIZE"
+"""Environment variable which enables automatic finalisation at import time"""
+
+_PACKAGE_DIRECTORY = str(Path(__file__).parent)
+
+
+@define(frozen=True)
+class PoolStatistics:
+    """
+    Statistics about the occupancy of an instance pool
+    """
+
+    capacity: int
+    """Number of instances the pool can hold without growing"""
+
+    n_live: int
+    """Number of instances which are currently claimed (i.e. not finalised)"""
+
+    high_water_mark: int
+    """Largest number of instances which have been live at the same time"""
+
+    n_claimed: int
+    """Number of instances which have been claimed since the pool was created"""
+
+    n_finalized: int
+    """Number of instances which have been finalised since the pool was created"""
+
+
+@define(frozen=True)
+class LeakedInstance:
+    """
+    Instance which is live (i.e. has been claimed but not finalised)
+    """
+
+    type_name: str
+    """Name of the Fortran derived type"""
+
+    instance_index: int
+    """Index of the instance in its pool"""
+
+    creation_stack: traceback.StackSummary | None
+    """
+    Stack trace of the code which created the instance
+
+    ``None`` if leak tracking was not enabled when the instance was created.
+    """
+
+
+@define
+class LeakTracker:
+    """
+    Record of where each live instance of a derived type was created
+
+    Each wrapper module has one of these for its pool.
+    The wrappers call :meth:`record` and :meth:`forget`
+    (only if :attr:`enabled`, which keeps the overhead negligible otherwise).
+    """
+
+    type_name: str
+    """Name of the Fortran derived type"""
+
+    enabled: bool = False
+    """Whether creation stack traces are being recorded"""
+
+    _stacks: dict[int, traceback.StackSummary] = field(factory=dict, init=False)
+    # Re-entrant because garbage collection can release an instance
+    # (and hence call :meth:`forget`) while the lock is held
+    _lock: threading.RLock = field(factory=threading.RLock, init=False)
+
+    def record(self, instance_indexes: Iterable[int]) -> None:
+        """
+        Record the stack trace of the code which created instances
+
+        Parameters
+        ----------
+        instance_indexes
+            Indexes of the created instances
+        """
+        stack = _get_caller_stack()
+        with self._lock:
+            for instance_index in instance_indexes:
+                self._stacks[int(instance_index)] = stack
+
+    def forget(self, instance_indexes: Iterable[int]) -> None:
+        """
+        Forget instances which have been finalised
+
+        Parameters
+        ----------
+        instance_indexes
+            Indexes of the finalised instances
+        """
+        with self._lock:
+            for instance_index in instance_indexes:
+                self._stacks.pop(int(instance_index), None)
+
+    def clear(self) -> None:
+        """
+        Forget all the recorded stack traces
+        """
+        with self._lock:
+            self._stacks.clear()
+
+    def get_leak_report(self, instance_indexes: Iterable[int]) -> list[LeakedInstance]:
+        """
+        Get the leak report for the given live instances
+
+        Parameters
+        ----------
+        instance_indexes
+            Indexes of the live instances
+
+        Returns
+        -------
+            Each live instance, with its creation stack trace if it was recorded
+        """
+        with self._lock:
+            return [
+                LeakedInstance(
+                    type_name=self.type_name,
+                    instance_index=int(instance_index),
+                    creation_stack=self._stacks.get(int(instance_index)),
+                )
+                for instance_index in instance_indexes
+            ]
+
+
+@define
+class AutoFinalizer:
+    """
+    Release the instances of a derived type when their wrappers are garbage collected
+
+    Each wrapper module has one of these for its pool.
+    :func:`register_claimed` calls :meth:`attach` when instances are claimed
+    (only if :attr:`enabled`)
+    and :func:`unregister_claimed` calls :meth:`detach`
+    when they are finalised explicitly,
+    so an instance is never finalised twice.
+    """
+
+    type_name: str
+    """Name of the Fortran derived type"""
+
+    release: Callable[[int], None]
+    """
+    Function which finalises the Fortran instance with the given index
+
+    This must not hold a reference to the wrapper.
+    """
+
+    enabled: bool = False
+    """Whether instances which are claimed are released automatically"""
+
+    _finalizers: dict[int, weakref.finalize[[int], None]] = field(factory=dict, init=False)
+    # Re-entrant because garbage collection can run a finalizer
+    # (and hence :meth:`_release`) while the lock is held
+    _lock: threading.RLock = field(factory=threading.RLock, init=False)
+
+    def attach(self, wrappers: Iterable[Any]) -> None:
+        """
+        Release the wrappers' instances when the wrappers are garbage collected
+
+        Parameters
+        ----------
+        wrappers
+            Wrappers which have just claimed their instances
+        """
+        for wrapper in wrappers:
+            instance_index = wrapper.instance_index
+            finalizer = weakref.finalize(wrapper, self._release, instance_index)
+            # Nothing needs releasing if the process is exiting
+            finalizer.atexit = False
+            with self._lock:
+                self._finalizers[instance_index] = finalizer
+
+    def detach(self, instance_indexes: Iterable[int]) -> None:
+        """
+        Stop instances being released automatically
+
+        Called when instances are finalised explicitly.
+
+        Parameters
+        ----------
+        instance_indexes
+            Indexes of the instances
+        """
+        with self._lock:
+            finalizers = [self._finalizers.pop(int(v), None) for v in instance_indexes]
+
+        for finalizer in finalizers:
+            if finalizer is not None:
+                finalizer.detach()
+
+    def _release(self, instance_index: int) -> None:
+        """
+        Release an instance whose wrapper has been garbage collected
+        """
+        with self._lock:
+            self._finalizers.pop(instance_index, None)
+
+        self.release(instance_index)
+
+
+@define
+class Arena:
+    """
+    Scope which finalises every instance claimed inside it on exit
+
+    Use :func:`arena` to create one.
+    """
+
+    _wrappers: dict[str, tuple[Callable[[list[Any]], None], list[Any]]] = field(factory=dict, init=False)
+    _token: contextvars.Token[Arena | None] | None = field(default=None, init=False)
+
+    def add(
+        self,
+        type_name: str,
+        finalize_many: Callable[[list[Any]], None],
+        wrappers: Iterable[Any],
+    ) -> None:
+        """
+        Track wrappers which have claimed instances inside the arena
+
+        Called by :func:`register_claimed` when instances are claimed.
+
+        Parameters
+        ----------
+        type_name
+            Name of the Fortran derived type
+
+        finalize_many
+            Function which finalises many wrappers of the type at once
+
+        wrappers
+            Wrappers to finalise when the arena exits
+        """
+        if type_name not in self._wrappers:
+            self._wrappers[type_name] = (finalize_many, [])
+
+        self._wrappers[type_name][1].extend(wrappers)
+
+    def close(self) -> None:
+        """
+        Finalise all the tracked wrappers which are still initialised
+
+        Wrappers which have already been finalised (e.g. explicitly) are skipped.
+        """
+        wrappers, self._wrappers = self._wrappers, {}
+        for finalize_many, type_wrappers in wrappers.values():
+            live = [v for v in type_wrappers if v.initialized]
+            if live:
+                finalize_many(live)
+
+    def __enter__(self) -> Arena:
+        self._token = CURRENT_ARENA.set(self)
+
+        return self
+
+    def __exit__(
+        self,
+        exc_type: type[BaseException] | None,
+        exc_value: BaseException | None,
+        traceback: TracebackType | None,
+    ) -> None:
+        if self._token is not None:
+            CURRENT_ARENA.reset(self._token)
+            self._token = None
+
+        self.close()
+
+
+CURRENT_ARENA: contextvars.ContextVar[Arena | None] = contextvars.ContextVar("CURRENT_ARENA", default=None)
+"""Innermost arena which has been entered in the current context, if any"""
+
+
+def arena() -> Arena:
+    """
+    Create an arena, in which every instance claimed is finalised on exit
+
+    Use the arena as a context manager.
+    On exit, all the instances claimed inside it
+    which haven't already been finalised
+    are finalised with one bulk finalisation per derived type.
+    The wrappers must therefore not be used after the arena exits.
+
+    If arenas are nested, instances belong to the innermost arena.
+
+    Returns
+    -------
+        Arena
+    """
+    return Arena()
+
+
+_REGISTRY_LOCK = threading.Lock()
+_TRACKERS: dict[str, LeakTracker] = {}
+_AUTO_FINALIZERS: dict[str, AutoFinalizer] = {}
+
+
+def get_leak_tracker(type_name: str) -> LeakTracker:
+    """
+    Get a leak tracker for a derived type's pool
+
+    The tracker is enabled if leak tracking is enabled.
+
+    Parameters
+    ----------
+    type_name
+        Name of the Fortran derived type
+
+    Returns
+    -------
+        Leak tracker, shared with all other callers for the same type
+    """
+    with _REGISTRY_LOCK:
+        if type_name not in _TRACKERS:
+            _TRACKERS[type_name] = LeakTracker(type_name, enabled=_leak_tracking_enabled)
+
+        return _TRACKERS[type_name]
+
+
+def get_auto_finalizer(type_name: str, release: Callable[[int], None]) -> AutoFinalizer:
+    """
+    Get an auto-finalizer for a derived type's pool
+
+    The auto-finalizer is enabled if automatic finalisation is enabled.
+
+    Parameters
+    ----------
+    type_name
+        Name of the Fortran derived type
+
+    release
+        Function which finalises the Fortran instance with the given index
+
+    Returns
+    -------
+        Auto-finalizer, shared with all other callers for the same type
+        (the first caller's `release` is used)
+    """
+    with _REGISTRY_LOCK:
+        if type_name not in _AUTO_FINALIZERS:
+            _AUTO_FINALIZERS[type_name] = AutoFinalizer(type_name, release, enabled=_auto_finalize_enabled)
+
+        return _AUTO_FINALIZERS[type_name]
+
+
+def export_live_instances(
+    export: Callable[[int], tuple[Any, ...]],
+    n_live: int,
+) -> tuple[npt.NDArray[Any], ...]:
+    """
+    Export the live instances of a derived type's pool
+
+    `export` is a routine of a bulk wrapper
+    (e.g. ``derived_type_bulk_w.instances_export``)
+    which fills arrays of size `n` in a single call to Fortran
+    and also returns the number of live instances.
+    If instances have been claimed since `n_live` was counted,
+    the arrays are too small,
+    so `export` is called again with bigger arrays.
+    Hence the result is always a snapshot taken by one call to Fortran.
+
+    Parameters
+    ----------
+    export
+        Routine which exports up to `n` live instances
+
+    n_live
+        Expected number of live instances
+
+    Returns
+    -------
+        Arrays returned by `export`, trimmed to the live instances
+        and sorted by the first array (the instance indexes)
+    """
+    n = n_live
+    while True:
+        *exported, n_live = export(n)
+        if n_live <= n:
+            break
+
+        n = n_live
+
+    order = np.argsort(exported[0][:n_live])
+
+    return tuple(v[:n_live][order] for v in exported)
+
+
+def register_claimed(
+    type_name: str,
+    wrappers: Sequence[Any],
+    finalize_many: Callable[[list[Any]], None],
+) -> None:
+    """
+    Register wrappers which have just claimed instances from a derived type's pool
+
+    Records where the instances were created, if leak tracking is enabled,
+    releases the instances when the wrappers are garbage collected,
+    if automatic finalisation is enabled,
+    and adds the wrappers to the current arena, if there is one.
+    Called by the wrapper modules whenever they claim instances.
+
+    Parameters
+    ----------
+    type_name
+        Name of the Fortran derived type
+
+    wrappers
+        Wrappers which have just claimed their instances
+
+    finalize_many
+        Function which finalises many wrappers of the type at once
+    """
+    tracker = get_leak_tracker(type_name)
+    if tracker.enabled:
+        tracker.record(v.instance_index for v in wrappers)
+
+    auto_finalizer = _AUTO_FINALIZERS.get(type_name)
+    if auto_finalizer is not None and auto_finalizer.enabled:
+        auto_finalizer.attach(wrappers)
+
+    current_arena = CURRENT_ARENA.get()
+    if current_arena is not None:
+        current_arena.add(type_name, finalize_many, wrappers)
+
+
+def register_claimed_array(
+    type_name: str,
+    array: Any,
+    finalize_arrays: Callable[[list[Any]], None],
+) -> None:
+    """
+    Register a collection which has just claimed instances from a derived type's pool
+
+    Like :func:`register_claimed`,
+    except that the instances are never released automatically
+    and the whole collection is added to the current arena, if there is one.
+
+    Parameters
+    ----------
+    type_name
+        Name of the Fortran derived type
+
+    array
+        Collection which has just claimed its instances
+        (e.g. :class:`fgen_example.derived_type.DerivedTypeArray`)
+
+    finalize_arrays
+        Function which finalises many collections of the type at once
+    """
+    tracker = get_leak_tracker(type_name)
+    if tracker.enabled:
+        tracker.record(array.instance_indexes)
+
+    current_arena = CURRENT_ARENA.get()
+    if current_arena is not None:
+        current_arena.add(f"{type_name}Array", finalize_arrays, (array,))
+
+
+def unregister_claimed(type_name: str, instance_indexes: Iterable[int]) -> None:
+    """
+    Stop tracking instances which are about to be returned to a derived type's pool
+
+    Called by the wrapper modules before they finalise instances.
+    Once an instance is back in the pool,
+    another thread can claim it straight away,
+    so calling this afterwards could discard the new claim's records.
+
+    Parameters
+    ----------
+    type_name
+        Name of the Fortran derived type
+
+    instance_indexes
+        Indexes of the instances
+    """
+    auto_finalizer = _AUTO_FINALIZERS.get(type_name)
+    if auto_finalizer is not None:
+        auto_finalizer.detach(instance_indexes)
+
+    tracker = get_leak_tracker(type_name)
+    if tracker.enabled:
+        tracker.forget(instance_indexes)
+
+
+def enable_auto_finalize() -> None:
+    """
+    Release instances claimed from now on when their wrappers are garbage collected
+
+    Instances which have already been claimed are unaffected.
+    """
+    global _auto_finalize_enabled  # noqa: PLW0603
+    _auto_finalize_enabled = True
+    for auto_finalizer in _AUTO_FINALIZERS.values():
+        auto_finalizer.enabled = True
+
+
+def disable_auto_finalize() -> None:
+    """
+    Stop releasing instances claimed from now on automatically
+
+    Instances which were claimed while automatic finalisation was enabled
+    are still released when their wrappers are garbage collected.
+    """
+    global _auto_finalize_enabled  # noqa: PLW0603
+    _auto_finalize_enabled = False
+    for auto_finalizer in _AUTO_FINALIZERS.values():
+        auto_finalizer.enabled = False
+
+
+def is_auto_finalize_enabled() -> bool:
+    """
+    Get whether automatic finalisation is enabled
+
+    Returns
+    -------
+        ``True`` if instances are released when their wrappers are garbage collected
+    """
+    return _auto_finalize_enabled
+
+
+def enable_leak_tracking() -> None:
+    """
+    Record where each instance is created from now on
+
+    Instances which already exist will be reported without a stack trace.
+    """
+    global _leak_tracking_enabled  # noqa: PLW0603
+    _leak_tracking_enabled = True
+    for tracker in _TRACKERS.values():
+        tracker.enabled = True
+
+
+def disable_leak_tracking() -> None:
+    """
+    Stop recording where instances are created
+
+    Any stack traces which have already been recorded are discarded.
+    """
+    global _leak_tracking_enabled  # noqa: PLW0603
+    _leak_tracking_enabled = False
+    for tracker in _TRACKERS.values():
+        tracker.enabled = False
+        tracker.clear()
+
+
+def is_leak_tracking_enabled() -> bool:
+    """
+    Get whether leak tracking is enabled
+
+    Returns
+    -------
+        ``True`` if the stack trace is recorded when instances are created
+    """
+    return _leak_tracking_enabled
+
+
+def format_leak_report(leaks: Sequence[LeakedInstance]) -> str:
+    """
+    Format a leak report for printing
+
+    Parameters
+    ----------
+    leaks
+        Leak report, e.g. from
+        :func:`fgen_example.derived_type.get_leak_report`
+
+    Returns
+    -------
+        Human-readable report. Instances created from the same place are grouped.
+    """
+    if not leaks:
+        return "No live instances"
+
+    by_stack: dict[str, list[LeakedInstance]] = {}
+    for leak in leaks:
+        stack = (
+            "".join(leak.creation_stack.format())
+            if leak.creation_stack is not None
+            else "  (creation not recorded, enable leak tracking to record it)\n"
+        )
+        by_stack.setdefault(stack, []).append(leak)
+
+    lines = [f"{len(leaks)} live instance(s)"]
+    for stack, stack_leaks in sorted(by_stack.items(), key=lambda v: -len(v[1])):
+        indexes = ", ".join(str(v.instance_index) for v in stack_leaks)
+        lines.append(
+            f"{len(stack_leaks)} {stack_leaks[0].type_name} instance(s) "
+            f"(instance indexes: {indexes}) created at:\n{stack}"
+        )
+
+    return "\n".join(lines)
+
+
+def _get_caller_stack() -> traceback.StackSummary:
+    """
+    Get the stack trace up to the last frame outside this package
+    """
+    stack = traceback.extract_stack()
+    while len(stack) > 1 and stack[-1].filename.startswith(_PACKAGE_DIRECTORY):
+        stack.pop()
+
+    return stack
+
+
+_leak_tracking_enabled: bool = os.environ.get(ENV_VAR, "").lower() not in (
+    "",
+    "0",
+    "false",
+)
+_auto_finalize_enabled: bool = os.environ.get(AUTO_FINALIZE_ENV_VAR, "").lower() not in ("", "0", "false")
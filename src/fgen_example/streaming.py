@@ -0,0 +1,294 @@
+"""
+Streaming evaluation of inputs which don't fit in memory
+
+The inputs to
+:meth:`Operator.calc_vec_prod_sum_batch <fgen_example.operations.Operator.calc_vec_prod_sum_batch>`
+may be too large to hold in memory, e.g. multi-gigabyte ``.npy`` files.
+The functions here read the inputs in fixed-size chunks
+and evaluate each chunk with a single call to Fortran.
+The results are either yielded chunk by chunk
+(:func:`iter_calc_vec_prod_sum_m`)
+or written to an output array, which may itself be memory-mapped
+(:func:`calc_vec_prod_sum_into_m`).
+
+.. code-block:: python
+
+    # a.npy and b.npy each hold an array of shape (N, 3)
+    calc_vec_prod_sum_into_m(operator, "a.npy", "b.npy", out="out.npy")
+
+While one chunk is evaluated,
+the next chunk is read on a background thread.
+The Fortran call releases the GIL, so reading and evaluating overlap.
+At most two chunks of each input (the one being evaluated and the next one)
+are held in memory at once,
+so peak memory is bounded by the chunk size rather than the size of the inputs.
+
+The inputs can be arrays (including memory-mapped arrays)
+or array-like values such as nested lists,
+paths to ``.npy`` files (which are memory-mapped)
+or iterators (e.g. generators) of ``(M, 3)`` blocks of vectors.
+In the last case, each block is evaluated as one chunk,
+so `a` and `b` must either both be iterators of blocks
+(with matching block sizes) or both be one of the other kinds.
+
+The inputs and results are magnitudes (dimensionless),
+so no unit handling is performed.
+"""
+from __future__ import annotations
+
+import concurrent.futures
+import itertools
+import os
+from collections.abc import Iterable, Iterator
+from typing import Any, Union
+
+import numpy as np
+import numpy.typing as npt
+
+from fgen_example.operations import Operator, OperatorNoSetters
+
+DEFAULT_CHUNK_SIZE: int = 65_536
+"""Default number of vectors in each chunk"""
+
+VectorSource = Union[str, "os.PathLike[str]", npt.ArrayLike, Iterator[npt.ArrayLike]]
+"""
+Source of vectors
+
+An array (or array-like, e.g. a nested list) of shape ``(N, 3)``,
+the path to a ``.npy`` file holding such an array
+or an iterator of ``(M, 3)`` blocks of vectors.
+Only iterators are treated as blocks,
+so a list of blocks must be passed as e.g. ``iter(blocks)``.
+"""
+
+_NO_MORE_CHUNKS = object()
+
+
+def iter_calc_vec_prod_sum_m(
+    operator: Operator | OperatorNoSetters,
+    a: VectorSource,
+    b: VectorSource,
+    chunk_size: int = DEFAULT_CHUNK_SIZE,
+) -> Iterator[npt.NDArray[np.float64]]:
+    """
+    Calculate vector product then sum then multiply by weight, chunk by chunk
+
+    Parameters
+    ----------
+    operator
+        Operator to evaluate with
+
+    a
+        first vectors
+
+    b
+        second vectors
+
+    chunk_size
+        Number of vectors to evaluate in each call to Fortran.
+        Ignored for inputs which are iterators of blocks.
+
+    Yields
+    ------
+        Result for each vector in the chunk, shape ``(M,)``
+
+    Raises
+    ------
+    ValueError
+        `a` and `b` hold different numbers of vectors
+
+    TypeError
+        Only one of `a` and `b` is an iterator of blocks
+    """
+    if chunk_size < 1:
+        raise ValueError(  # noqa: TRY003
+            f"chunk_size must be positive. Received {chunk_size}"
+        )
+
+    a = _open(a)
+    b = _open(b)
+    if isinstance(a, Iterator) != isinstance(b, Iterator):
+        # The blocks wouldn't line up with the chunks of the other input
+        raise TypeError(  # noqa: TRY003
+            "a and b must either both be iterators of blocks or both be arrays, array-likes or paths. "
+            f"Received {type(a).__name__} and {type(b).__name__}"
+        )
+
+    if isinstance(a, np.ndarray) and isinstance(b, np.ndarray) and a.shape[:1] != b.shape[:1]:
+        raise ValueError(  # noqa: TRY003
+            f"a and b must hold the same number of vectors. Received {a.shape=} and {b.shape=}"
+        )
+
+    a_chunks = _iter_chunks(a, chunk_size)
+    b_chunks = _iter_chunks(b, chunk_size)
+    for a_chunk, b_chunk in _prefetch(_zip_checked(a_chunks, b_chunks)):
+        yield operator.calc_vec_prod_sum_batch_m(a_chunk, b_chunk)
+
+
+def calc_vec_prod_sum_into_m(
+    operator: Operator | OperatorNoSetters,
+    a: VectorSource,
+    b: VectorSource,
+    out: str | os.PathLike[str] | npt.NDArray[np.float64],
+    chunk_size: int = DEFAULT_CHUNK_SIZE,
+) -> npt.NDArray[np.float64]:
+    """
+    Calculate vector product then sum then multiply by weight, writing to an array
+
+    The results are written chunk by chunk (see :func:`iter_calc_vec_prod_sum_m`).
+
+    Parameters
+    ----------
+    operator
+        Operator to evaluate with
+
+    a
+        first vectors
+
+    b
+        second vectors
+
+    out
+        Array to write the results to (e.g. a :class:`numpy.memmap`)
+        or the path of a ``.npy`` file to create.
+        A path can only be given if `a` is an array or a path,
+        so the number of results is known up front.
+
+    chunk_size
+        Number of vectors to evaluate in each call to Fortran
+
+    Returns
+    -------
+        Array holding the results.
+        If `out` is a path, this is the (memory-mapped) array in the created file.
+
+    Raises
+    ------
+    ValueError
+        `a` and `b` hold different numbers of vectors
+        or `out` does not have space for exactly one result per vector
+
+    TypeError
+        `out` is a path but `a` is an iterator of blocks,
+        so the number of results isn't known up front,
+        or only one of `a` and `b` is an iterator of blocks
+    """
+    a = _open(a)
+    out_array: npt.NDArray[np.float64]
+    if isinstance(out, (str, os.PathLike)):
+        if not isinstance(a, np.ndarray):
+            raise TypeError(  # noqa: TRY003
+                "out can only be a path if a is an array or a path to a .npy file"
+            )
+
+        out_array = np.lib.format.open_memmap(  # type: ignore[no-untyped-call]
+            out, mode="w+", dtype=np.float64, shape=(a.shape[0],)
+        )
+    else:
+        out_array = out
+
+    n_written = 0
+    for chunk in iter_calc_vec_prod_sum_m(operator, a, b, chunk_size=chunk_size):
+        if n_written + chunk.size > out_array.shape[0]:
+            raise ValueError(  # noqa: TRY003
+                f"out only has space for {out_array.shape[0]} results"
+            )
+
+        out_array[n_written : n_written + chunk.size] = chunk
+        n_written += chunk.size
+
+    if n_written != out_array.shape[0]:
+        raise ValueError(  # noqa: TRY003
+            f"out has space for {out_array.shape[0]} results but there were only {n_written} vectors"
+        )
+
+    if isinstance(out_array, np.memmap):
+        out_array.flush()
+
+    return out_array
+
+
+def _zip_checked(a: Iterable[Any], b: Iterable[Any]) -> Iterator[tuple[Any, Any]]:
+    """
+    Pair up chunks, checking that both inputs have the same number of chunks
+    """
+    for a_chunk, b_chunk in itertools.zip_longest(a, b):
+        if a_chunk is None or b_chunk is None:
+            raise ValueError(  # noqa: TRY003
+                "a and b must hold the same number of vectors"
+            )
+
+        yield a_chunk, b_chunk
+
+
+def _open(values: VectorSource) -> Any:
+    """
+    Memory-map ``.npy`` files and convert array-likes to arrays
+
+    Arrays (including memory-mapped arrays) and iterators of blocks
+    are returned as they are.
+    """
+    if isinstance(values, (str, os.PathLike)):
+        return np.load(values, mmap_mode="r")
+
+    if isinstance(values, (np.ndarray, Iterator)):
+        return values
+
+    # Otherwise, e.g. a nested list would be split into chunks row by row
+    return np.asarray(values, dtype=np.float64)
+
+
+def _iter_chunks(values: Any, chunk_size: int) -> Iterator[Any]:
+    """
+    Split a source of vectors into chunks
+
+    The chunks of arrays are views, so nothing is read until they are used.
+    """
+    if isinstance(values, np.ndarray):
+        for start in range(0, values.shape[0], chunk_size):
+            yield values[start : start + chunk_size]
+
+    else:
+        yield from values
+
+
+def _read(chunk: Any) -> npt.NDArray[np.float64]:
+    """
+    Read a chunk into memory, as a contiguous array
+
+    The shape is checked when the chunk is evaluated.
+    """
+    if isinstance(chunk, np.memmap):
+        # Copying out of the memory map is what reads the data from disk.
+        # Otherwise, the data would only be read once Fortran accessed it,
+        # so reading wouldn't overlap with evaluating.
+        return np.array(chunk, dtype=np.float64)
+
+    return np.ascontiguousarray(chunk, dtype=np.float64)
+
+
+def _prefetch(
+    chunks: Iterator[tuple[Any, Any]],
+) -> Iterator[tuple[npt.NDArray[np.float64], npt.NDArray[np.float64]]]:
+    """
+    Read each pair of chunks into memory on a background thread
+
+    The next pair is read while the current pair is being used.
+    """
+
+    def read_next() -> Any:
+        pair: Any = next(chunks, _NO_MORE_CHUNKS)
+        if pair is _NO_MORE_CHUNKS:
+            return pair
+
+        return _read(pair[0]), _read(pair[1])
+
+    with concurrent.futures.ThreadPoolExecutor(max_workers=1) as executor:
+        future = executor.submit(read_next)
+        while True:
+            pair: Any = future.result()
+            if pair is _NO_MORE_CHUNKS:
+                return
+
+            future = executor.submit(read_next)
+            yield pair
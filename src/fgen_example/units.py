@@ -0,0 +1,344 @@
+"""
+Unit-handling
+
+This provides a drop-in replacement for :func:`fgen_runtime.units.verify_units`
+which caches the conversion from each incoming unit to the unit
+expected by the wrapped function.
+:func:`fgen_runtime.units.verify_units` goes through :meth:`pint.UnitRegistry.wraps`,
+which resolves units and converts quantities through the unit registry
+on every call.
+Here, the conversion from a given source unit to a given target unit
+is only resolved once.
+It is then stored as a multiplier and offset,
+so subsequent calls with the same units
+only need a dictionary lookup and (at most) a multiply and add.
+
+Calls which this cache can't handle,
+i.e. calls relying on argument defaults
+and functions with units defined relative to other arguments (e.g. ``"=A"``),
+are passed to :func:`fgen_runtime.units.verify_units`,
+so the behaviour is the same either way.
+"""
+from __future__ import annotations
+
+import functools
+import inspect
+from collections.abc import Iterable
+from typing import Any, Callable, TypeVar, cast
+
+import pint
+from fgen_runtime.units import UnitDefinition, VerifyUnitsSupported
+from fgen_runtime.units import verify_units as verify_units_uncached
+
+FuncT = TypeVar("FuncT", bound=Callable[..., Any])
+
+_CONVERSION_CACHE: dict[tuple[Any, Any, Any], tuple[float, float]] = {}
+"""
+Cache of conversion factors
+
+Keys are (unit registry, source units, target units),
+values are (multiplier, offset).
+"""
+
+
+def clear_conversion_cache() -> None:
+    """
+    Clear the cache of unit conversion factors
+
+    This is only needed if the definitions in a unit registry are changed
+    after conversions have been cached.
+    """
+    _CONVERSION_CACHE.clear()
+
+
+def get_conversion_factors(
+    source: pint.Unit,
+    target: pint.Unit,
+    ureg: pint.UnitRegistry[Any] | None = None,
+) -> tuple[float, float]:
+    """
+    Get the factors needed to convert from one unit to another
+
+    The factors are cached,
+    so the unit registry is only used the first time
+    a given pair of units is requested.
+
+    Parameters
+    ----------
+    source
+        Unit to convert from
+
+    target
+        Unit to convert to
+
+    ureg
+        Unit registry to use
+
+        Defaults to the application registry.
+
+    Returns
+    -------
+        Multiplier and offset.
+        A magnitude, ``x``, in ``source`` is ``multiplier * x + offset``
+        in ``target``.
+
+    Raises
+    ------
+    pint.DimensionalityError
+        ``source`` and ``target`` have different dimensionality
+    """
+    if ureg is None:
+        ureg = pint.get_application_registry()  # type: ignore
+
+    return _get_conversion_factors(
+        ureg,
+        ureg.Unit(source)._units,
+        ureg.Unit(target)._units,
+    )
+
+
+def _get_conversion_factors(
+    ureg: pint.UnitRegistry[Any],
+    source: Any,
+    target: Any,
+) -> tuple[float, float]:
+    """
+    Get the (cached) factors needed to convert between two units containers
+    """
+    key = (ureg, source, target)
+    try:
+        return _CONVERSION_CACHE[key]
+    except KeyError:
+        pass
+
+    if source == target:
+        factors = (1.0, 0.0)
+    else:
+        # The multiplier is taken from the equivalent delta units
+        # (e.g. delta_degC to K for degC to K),
+        # as the difference between converting one and zero loses precision
+        offset = float(ureg.Quantity(0.0, source).m_as(target))
+        multiplier = float(ureg.Quantity(1.0, _as_delta(ureg, source)).m_as(_as_delta(ureg, target)))
+        factors = (multiplier, offset)
+
+    _CONVERSION_CACHE[key] = factors
+
+    return factors
+
+
+def _as_delta(ureg: pint.UnitRegistry[Any], units: Any) -> Any:
+    """
+    Replace any units with an offset (e.g. degC) in a units container by their delta units
+    """
+    for name in units:
+        if not ureg._is_multiplicative(name):
+            units = units.rename(name, f"delta_{name}")
+
+    return units
+
+
+def get_magnitude_converter(
+    units: UnitDefinition,
+    strict: bool = True,
+    ureg: pint.UnitRegistry[Any] | None = None,
+    name: str | None = None,
+) -> Callable[[Any], Any]:
+    """
+    Get a function which converts quantities to magnitudes in the given units
+
+    ``units`` is resolved once, when this is called,
+    and conversions are cached (see :func:`get_conversion_factors`),
+    so the returned function is cheap to call repeatedly.
+
+    Parameters
+    ----------
+    units
+        Units of the returned magnitudes
+
+    strict
+        Only accept quantities (or strings which can be parsed as quantities).
+        If ``False``, other values are assumed to already be in ``units``
+        and are returned as is.
+
+    ureg
+        Unit registry to use
+
+        Defaults to the application registry.
+
+    name
+        Name of the value being converted, used in error messages
+
+    Returns
+    -------
+        Function which converts a quantity to its magnitude in ``units``
+    """
+    if ureg is None:
+        ureg = pint.get_application_registry()  # type: ignore
+
+    # Work around quirk where wraps doesn't accept dimensionless
+    # (kept for consistency with fgen_runtime.units.verify_units)
+    target = ureg.Unit("" if units == "dimensionless" else units)._units
+
+    def convert(value: Any) -> Any:
+        if isinstance(value, str):
+            value = ureg.Quantity(value)
+
+        if not isinstance(value, pint.Quantity):
+            if strict:
+                raise ValueError(  # noqa: TRY003
+                    "A wrapped function using strict=True requires quantity "
+                    "or a string for all arguments with not None units. "
+                    f"(error found for {name}, {value})"
+                )
+
+            return value
+
+        multiplier, offset = _get_conversion_factors(ureg, value._units, target)
+        magnitude = value._magnitude
+        if offset:
+            return magnitude * multiplier + offset
+
+        if multiplier != 1.0:  # noqa: PLR2004
+            return magnitude * multiplier
+
+        return magnitude
+
+    return convert
+
+
+def verify_units(
+    ret: VerifyUnitsSupported | Iterable[VerifyUnitsSupported],
+    args: Iterable[VerifyUnitsSupported],
+    strict: bool = True,
+    ureg: pint.UnitRegistry[Any] | None = None,
+) -> Callable[[FuncT], FuncT]:
+    """
+    Wrap a function to make it pint-aware, caching unit conversions
+
+    This has the same interface and behaviour as
+    :func:`fgen_runtime.units.verify_units`.
+    Calls which omit arguments (so rely on their defaults)
+    and functions with units defined relative to other arguments (e.g. ``"=A"``)
+    are handled by :func:`fgen_runtime.units.verify_units` itself,
+    without caching.
+
+    The units are resolved the first time the wrapped function is called,
+    rather than when it is decorated.
+    As a result, defining wrapped functions (e.g. importing the wrapper modules)
+    does not load the unit registry.
+
+    Parameters
+    ----------
+    ret
+        Units of each of the return values. Use `None` to skip argument conversion.
+
+    args
+        Units of each of the arguments. Use `None` to skip argument conversion.
+
+    strict
+        Indicates that only quantities are accepted. (Default value = True)
+
+    ureg
+        Unit registry to use
+
+        Defaults to the application registry.
+
+    Returns
+    -------
+        Decorator for wrapping callables
+    """
+    arg_units = list(args)
+    ret_units_all = [ret] if ret is None or isinstance(ret, (str, pint.Unit)) else list(ret)
+    has_relative_units = any(
+        isinstance(units, str) and units.startswith("=") for units in (*arg_units, *ret_units_all)
+    )
+
+    def decorator(func: FuncT) -> FuncT:
+        param_names = list(inspect.signature(func).parameters)
+        if len(param_names) != len(arg_units):
+            raise TypeError(  # noqa: TRY003
+                f"{func.__name__} takes {len(param_names)} parameters "
+                f"but units were given for {len(arg_units)}"
+            )
+
+        # Creating the uncached wrapper loads the unit registry,
+        # so it is left until it is first needed
+        uncached: Callable[..., Any] | None = None
+
+        def call_uncached(*fargs: Any, **fkwargs: Any) -> Any:
+            nonlocal uncached
+            if uncached is None:
+                # The runtime's overloads only cover fixed-length tuples of units
+                runtime_verify_units: Any = verify_units_uncached
+                uncached = runtime_verify_units(ret, arg_units, strict=strict, ureg=ureg)(func)
+
+            return uncached(*fargs, **fkwargs)
+
+        if has_relative_units:
+            return cast(FuncT, functools.wraps(func)(call_uncached))
+
+        def resolve() -> tuple[Any, list[Any], dict[str, Any], Any]:
+            registry: Any = ureg
+            if registry is None:
+                registry = pint.get_application_registry()  # type: ignore
+
+            # Passing units containers (rather than units) to the quantity
+            # constructor avoids some of pint's parsing and copying
+            ret_units: Any
+            if ret is None:
+                ret_units = None
+            elif isinstance(ret, (str, pint.Unit)):
+                ret_units = registry.Unit(ret)._units
+            else:
+                ret_units = tuple(None if r is None else registry.Unit(r)._units for r in ret)
+
+            converters = [
+                None
+                if units is None
+                else get_magnitude_converter(units, strict=strict, ureg=registry, name=name)
+                for name, units in zip(param_names, arg_units)
+            ]
+            kwarg_converters = {
+                name: converter for name, converter in zip(param_names, converters) if converter is not None
+            }
+
+            return registry, converters, kwarg_converters, ret_units
+
+        # Resolving units means loading the unit registry,
+        # which is slow, so it is left until the first call
+        resolved: tuple[Any, list[Any], dict[str, Any], Any] | None = None
+
+        @functools.wraps(func)
+        def wrapper(*fargs: Any, **fkwargs: Any) -> Any:
+            nonlocal resolved
+            if len(fargs) + len(fkwargs) < len(param_names):
+                # Let the runtime fill in (and convert) the defaults
+                return call_uncached(*fargs, **fkwargs)
+
+            if resolved is None:
+                resolved = resolve()
+
+            registry, converters, kwarg_converters, ret_units = resolved
+
+            fargs_converted = list(fargs)
+            for i, (value, converter) in enumerate(zip(fargs, converters)):
+                if converter is not None:
+                    fargs_converted[i] = converter(value)
+
+            for name, value in fkwargs.items():
+                if name in kwarg_converters:
+                    fkwargs[name] = kwarg_converters[name](value)
+
+            result = func(*fargs_converted, **fkwargs)
+
+            if ret_units is None:
+                return result
+
+            if isinstance(ret_units, tuple):
+                return tuple(r if u is None else registry.Quantity(r, u) for r, u in zip(result, ret_units))
+
+            return registry.Quantity(result, ret_units)
+
+        return cast(FuncT, wrapper)
+
+    return decorator
@@ -0,0 +1,122 @@
+"""
+Fixtures for the benchmarks
+
+The benchmarks use `pytest-benchmark <https://pytest-benchmark.readthedocs.io>`_.
+Run them with ``make benchmark``.
+"""
+from __future__ import annotations
+
+from collections.abc import Iterator
+from typing import Any, Callable
+
+import pint
+import pytest
+
+from fgen_example.derived_type import DerivedType
+from fgen_example.derived_type import finalize_many as finalize_many_derived_types
+from fgen_example.derived_type import (
+    get_instance_capacity as get_derived_type_capacity,
+)
+from fgen_example.operations import Operator
+from fgen_example.operations import finalize_many as finalize_many_operators
+from fgen_example.operations import get_instance_capacity as get_operator_capacity
+
+Q = pint.get_application_registry().Quantity
+
+POOL_FILL_LEVELS: tuple[str, ...] = ("nearly-empty", "nearly-full")
+"""
+How full the instance pool is while benchmarking claiming and releasing instances
+
+``nearly-empty`` leaves the pool as it is
+(the benchmarks hold at most a handful of instances).
+``nearly-full`` fills the pool until only one free slot remains,
+so each claim has to find the last free slot.
+"""
+
+
+def fill_pool(
+    from_new_connection: Callable[[], Any],
+    get_capacity: Callable[[], int],
+) -> list[Any]:
+    """
+    Claim instances until the pool has exactly one free slot
+
+    The pool's live count isn't exposed,
+    so instances are claimed until the pool grows.
+    At that point, the pool is full apart from the block that was just added,
+    which is then filled up to its last slot.
+
+    Parameters
+    ----------
+    from_new_connection
+        Function which claims an instance from the pool
+
+    get_capacity
+        Function which returns the pool's capacity
+
+    Returns
+    -------
+        Claimed instances. The caller is responsible for finalising them.
+    """
+    capacity_before = get_capacity()
+    claimed = [from_new_connection()]
+    while get_capacity() == capacity_before:
+        claimed.append(from_new_connection())
+
+    # The previous capacity plus the instance which triggered the growth are live
+    n_free = get_capacity() - capacity_before - 1
+    claimed.extend(from_new_connection() for _ in range(n_free - 1))
+
+    return claimed
+
+
+@pytest.fixture(params=POOL_FILL_LEVELS)
+def derived_type_pool(request: pytest.FixtureRequest) -> Iterator[str]:
+    """
+    Fill the :class:`DerivedType` pool to each level in :data:`POOL_FILL_LEVELS`
+    """
+    claimed = []
+    if request.param == "nearly-full":
+        claimed = fill_pool(DerivedType.from_new_connection, get_derived_type_capacity)
+
+    yield request.param
+
+    finalize_many_derived_types(claimed)
+
+
+@pytest.fixture(params=POOL_FILL_LEVELS)
+def operator_pool(request: pytest.FixtureRequest) -> Iterator[str]:
+    """
+    Fill the :class:`Operator` pool to each level in :data:`POOL_FILL_LEVELS`
+    """
+    claimed = []
+    if request.param == "nearly-full":
+        claimed = fill_pool(Operator.from_new_connection, get_operator_capacity)
+
+    yield request.param
+
+    finalize_many_operators(claimed)
+
+
+@pytest.fixture
+def derived_type() -> Iterator[DerivedType]:
+    """
+    Built :class:`DerivedType`
+    """
+    out = DerivedType.from_build_args(base=Q(3.0, "m"))
+
+    yield out
+
+    out.finalize()
+
+
+@pytest.fixture
+def operator() -> Iterator[Operator]:
+    """
+    Built :class:`Operator`
+    """
+    out = Operator.from_build_args(weight=Q(1.5, "dimensionless"))
+
+    yield out
+
+    out.finalize()
@@ -0,0 +1,101 @@
+"""
+Benchmarks of each layer of the :class:`DerivedType` wrapper
+
+Within each group, the benchmarks build up the layers of a wrapped call:
+
+- ``raw``: the call to the f2py-generated ``derived_type_w`` function
+- ``check-initialised``: the :func:`check_initialised` decorator on its own
+- ``verify-units-*``: the :func:`verify_units` decorator on its own,
+  with arguments in the units expected by Fortran (``matching``)
+  or in units which have to be converted (``converting``)
+- ``magnitude-only``: the ``_m`` method (``check-initialised`` + ``raw``)
+- ``public-*``: the public, unit-aware method (all the layers)
+"""
+import pytest
+from fgen_runtime.base import check_initialised
+
+from fgen_example._lib import derived_type_w
+from fgen_example.derived_type import _UNITS, DerivedType
+from fgen_example.units import verify_units
+
+from .conftest import Q
+
+OTHER = {
+    "matching": Q(3.0, "m"),
+    "converting": Q(300.0, "cm"),
+}
+
+
+@check_initialised
+def _check_initialised_only(instance):
+    return None
+
+
+@verify_units(_UNITS["output"], (None, _UNITS["other"]))
+def _verify_units_only(instance, other):
+    return other
+
+
+@pytest.mark.benchmark(group="DerivedType.add")
+def test_add_raw(benchmark, derived_type):
+    benchmark(derived_type_w.i_add, instance_index=derived_type.instance_index, other=3.0)
+
+
+@pytest.mark.benchmark(group="DerivedType.add")
+def test_add_check_initialised(benchmark, derived_type):
+    benchmark(_check_initialised_only, derived_type)
+
+
+@pytest.mark.benchmark(group="DerivedType.add")
+@pytest.mark.parametrize("units", OTHER.keys())
+def test_add_verify_units(benchmark, derived_type, units):
+    benchmark(_verify_units_only, derived_type, OTHER[units])
+
+
+@pytest.mark.benchmark(group="DerivedType.add")
+def test_add_magnitude_only(benchmark, derived_type):
+    benchmark(derived_type.add_m, 3.0)
+
+
+@pytest.mark.benchmark(group="DerivedType.add")
+@pytest.mark.parametrize("units", OTHER.keys())
+def test_add_public(benchmark, derived_type, units):
+    benchmark(derived_type.add, OTHER[units])
+
+
+@pytest.mark.benchmark(group="DerivedType.base")
+def test_base_raw(benchmark, derived_type):
+    benchmark(derived_type_w.iget_base, instance_index=derived_type.instance_index)
+
+
+@pytest.mark.benchmark(group="DerivedType.base")
+def test_base_magnitude_only(benchmark, derived_type):
+    benchmark(lambda: derived_type.base_m)
+
+
+@pytest.mark.benchmark(group="DerivedType.base")
+def test_base_public(benchmark, derived_type):
+    benchmark(lambda: derived_type.base)
+
+
+def _build_and_finalize_raw():
+    instance_index = derived_type_w.get_free_instance_number()
+    derived_type_w.instance_build(instance_index=instance_index, base=3.0)
+    derived_type_w.instance_finalize(instance_index)
+
+
+@pytest.mark.benchmark(group="DerivedType.from_build_args+finalize")
+def test_build_and_finalize_raw(benchmark, derived_type_pool):
+    benchmark(_build_and_finalize_raw)
+
+
+@pytest.mark.benchmark(group="DerivedType.from_build_args+finalize")
+def test_build_and_finalize_magnitude_only(benchmark, derived_type_pool):
+    benchmark(lambda: DerivedType.from_build_args_m(3.0).finalize())
+
+
+@pytest.mark.benchmark(group="DerivedType.from_build_args+finalize")
+@pytest.mark.parametrize("units", OTHER.keys())
+def test_build_and_finalize_public(benchmark, derived_type_pool, units):
+    base = OTHER[units]
+    benchmark(lambda: DerivedType.from_build_args(base).finalize())
@@ -0,0 +1,80 @@
+"""
+Benchmarks of each layer of the :class:`Operator` wrapper
+
+The layers are the same as in ``test_bench_derived_type.py``.
+"""
+import numpy as np
+import pytest
+from fgen_runtime.base import check_initialised
+
+from fgen_example._lib import operations_w
+from fgen_example.operations import _UNITS, Operator
+from fgen_example.units import verify_units
+
+from .conftest import Q
+
+A = np.array([1.0, 2.0, 3.0])
+B = np.array([0.5, 0.25, 0.125])
+VECTORS = {
+    "matching": (Q(A, "dimensionless"), Q(B, "dimensionless")),
+    "converting": (Q(100 * A, "percent"), Q(100 * B, "percent")),
+}
+
+
+@check_initialised
+def _check_initialised_only(instance):
+    return None
+
+
+@verify_units(_UNITS["vec_prod_sum"], (None, _UNITS["a"], _UNITS["b"]))
+def _verify_units_only(instance, a, b):
+    return 0.0
+
+
+@pytest.mark.benchmark(group="Operator.calc_vec_prod_sum")
+def test_calc_vec_prod_sum_raw(benchmark, operator):
+    benchmark(
+        operations_w.i_calc_vec_prod_sum,
+        instance_index=operator.instance_index,
+        a=A,
+        b=B,
+    )
+
+
+@pytest.mark.benchmark(group="Operator.calc_vec_prod_sum")
+def test_calc_vec_prod_sum_check_initialised(benchmark, operator):
+    benchmark(_check_initialised_only, operator)
+
+
+@pytest.mark.benchmark(group="Operator.calc_vec_prod_sum")
+@pytest.mark.parametrize("units", VECTORS.keys())
+def test_calc_vec_prod_sum_verify_units(benchmark, operator, units):
+    benchmark(_verify_units_only, operator, *VECTORS[units])
+
+
+@pytest.mark.benchmark(group="Operator.calc_vec_prod_sum")
+def test_calc_vec_prod_sum_magnitude_only(benchmark, operator):
+    benchmark(operator.calc_vec_prod_sum_m, A, B)
+
+
+@pytest.mark.benchmark(group="Operator.calc_vec_prod_sum")
+@pytest.mark.parametrize("units", VECTORS.keys())
+def test_calc_vec_prod_sum_public(benchmark, operator, units):
+    benchmark(operator.calc_vec_prod_sum, *VECTORS[units])
+
+
+def _build_and_finalize_raw():
+    instance_index = operations_w.get_free_instance_number()
+    operations_w.instance_build(instance_index=instance_index, weight=1.5)
+    operations_w.instance_finalize(instance_index)
+
+
+@pytest.mark.benchmark(group="Operator.from_build_args+finalize")
+def test_build_and_finalize_raw(benchmark, operator_pool):
+    benchmark(_build_and_finalize_raw)
+
+
+@pytest.mark.benchmark(group="Operator.from_build_args+finalize")
+def test_build_and_finalize_public(benchmark, operator_pool):
+    weight = Q(1.5, "dimensionless")
+    benchmark(lambda: Operator.from_build_args(weight).finalize())
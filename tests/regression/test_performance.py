@@ -0,0 +1,144 @@
+"""
+Performance regression tests
+
+Each scenario is timed and compared with a stored baseline.
+To make the baselines (roughly) independent of the machine,
+each timing is divided by the time taken by a fixed calibration workload
+(pure Python and NumPy, no Fortran) measured in the same session.
+A scenario fails if its normalised time is more than
+``1 + FGEN_EXAMPLE_PERFORMANCE_TOLERANCE`` times its baseline
+(the tolerance defaults to :data:`DEFAULT_TOLERANCE`).
+
+The tests are marked with ``performance`` and deselected by default,
+because coverage and other load make their timings unreliable.
+Run them with ``make test-performance``.
+
+The baselines are stored in ``tests/test-data/performance-baselines.json``.
+Refresh them (e.g. after a deliberate change in performance)
+with ``make refresh-performance-baselines``.
+"""
+from __future__ import annotations
+
+import json
+import os
+import platform
+import statistics
+import timeit
+from pathlib import Path
+
+import numpy as np
+import pint
+import pytest
+
+from fgen_example.derived_type import DerivedType
+from fgen_example.operations import Operator
+
+pytestmark = pytest.mark.performance
+
+Q = pint.get_application_registry().Quantity
+
+BASELINES_FILE = Path(__file__).parents[1] / "test-data" / "performance-baselines.json"
+DEFAULT_TOLERANCE = 1.0
+REFRESH_ENV_VAR = "FGEN_EXAMPLE_REFRESH_PERFORMANCE_BASELINES"
+TOLERANCE_ENV_VAR = "FGEN_EXAMPLE_PERFORMANCE_TOLERANCE"
+N_REPEATS = 15
+
+N_CHURN = 2_000
+N_ADD = 2_000
+N_VEC_PROD_SUM_CALLS = 100
+VEC_PROD_SUM_BATCH_SIZE = 10_000
+
+
+def calibration():
+    total = sum(i * i for i in range(50_000))
+    values = np.arange(50_000, dtype=np.float64)
+    for _ in range(20):
+        total += float(np.dot(values, values))
+
+    return total
+
+
+def build_finalize_churn():
+    base = Q(3.0, "m")
+    for _ in range(N_CHURN):
+        DerivedType.from_build_args(base).finalize()
+
+
+def scalar_add():
+    inst = DerivedType.from_build_args(Q(3.0, "m"))
+    other = Q(2.0, "m")
+    try:
+        for _ in range(N_ADD):
+            inst.add(other)
+    finally:
+        inst.finalize()
+
+
+def batched_vec_prod_sum():
+    rng = np.random.default_rng(15)
+    a = Q(rng.random((VEC_PROD_SUM_BATCH_SIZE, 3)), "dimensionless")
+    b = Q(rng.random((VEC_PROD_SUM_BATCH_SIZE, 3)), "dimensionless")
+    inst = Operator.from_build_args(Q(1.5, "dimensionless"))
+    try:
+        for _ in range(N_VEC_PROD_SUM_CALLS):
+            inst.calc_vec_prod_sum_batch(a, b)
+    finally:
+        inst.finalize()
+
+
+SCENARIOS = {
+    "build-finalize-churn": build_finalize_churn,
+    "scalar-add": scalar_add,
+    "batched-vec-prod-sum": batched_vec_prod_sum,
+}
+
+
+def typical_time(func):
+    # The median is robust to the odd run being slowed (or sped up)
+    # by whatever else the machine is doing
+    return statistics.median(timeit.repeat(func, number=1, repeat=N_REPEATS))
+
+
+@pytest.fixture(scope="module")
+def baselines():
+    refresh = bool(os.environ.get(REFRESH_ENV_VAR))
+    if BASELINES_FILE.exists():
+        with open(BASELINES_FILE) as fh:
+            out = json.load(fh)
+    else:
+        out = {"scenarios": {}}
+
+    yield out
+
+    if refresh:
+        out["machine"] = {
+            "platform": platform.platform(),
+            "processor": platform.processor(),
+            "python": platform.python_version(),
+        }
+        with open(BASELINES_FILE, "w") as fh:
+            json.dump(out, fh, indent=2, sort_keys=True)
+            fh.write("\n")
+
+
+@pytest.mark.parametrize("scenario", SCENARIOS.keys())
+def test_performance(scenario, baselines):
+    # Calibrate right next to the scenario so both see the same machine load
+    normalised_time = typical_time(SCENARIOS[scenario]) / typical_time(calibration)
+
+    if os.environ.get(REFRESH_ENV_VAR):
+        baselines["scenarios"][scenario] = normalised_time
+        return
+
+    if scenario not in baselines["scenarios"]:
+        pytest.skip(f"No baseline for {scenario!r}. Create one with `make refresh-performance-baselines`")
+
+    tolerance = float(os.environ.get(TOLERANCE_ENV_VAR, DEFAULT_TOLERANCE))
+    baseline = baselines["scenarios"][scenario]
+    slowdown = normalised_time / baseline
+    assert slowdown <= 1 + tolerance, (
+        f"{scenario!r} is {slowdown:.2f} times slower than its baseline "
+        f"(tolerance: {tolerance:.0%}). "
+        "If this is expected, refresh the baselines "
+        "with `make refresh-performance-baselines`."
+    )
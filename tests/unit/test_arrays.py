@@ -0,0 +1,127 @@
+"""
+Test the struct-of-arrays collections of instances
+"""
+import re
+
+import numpy as np
+import pint
+import pint.testing
+import pytest
+from fgen_runtime.exceptions import InitialisationError
+
+import fgen_example
+from fgen_example import derived_type, operations
+from fgen_example.derived_type import DerivedType, DerivedTypeArray
+from fgen_example.operations import OperatorArray
+
+Q = pint.get_application_registry().Quantity
+
+
+def test_derived_type_array():
+    base = np.arange(5.0)
+    arr = DerivedTypeArray.from_build_args(Q(base, "km"))
+
+    assert len(arr) == base.size
+    pint.testing.assert_equal(arr.base, Q(base * 1000, "m"))
+    pint.testing.assert_equal(arr.add(Q(1.0, "m")), Q(base * 1000 + 1, "m"))
+    pint.testing.assert_equal(arr.add(Q(np.arange(5.0), "cm")), Q(base * 1000 + np.arange(5.0) / 100, "m"))
+    pint.testing.assert_equal(arr.double(), Q(base * 2000, "m"))
+
+    # Same results as the equivalent single instance
+    single = DerivedType.from_build_args(base=Q(base[3], "km"))
+    pint.testing.assert_equal(arr.add(Q(2.0, "m"))[3], single.add(Q(2.0, "m")))
+    pint.testing.assert_equal(arr.double()[3], single.double())
+    single.finalize()
+
+    arr.set_base(Q(3.0, "m"))
+    np.testing.assert_equal(arr.base_m, np.full(base.size, 3.0))
+    arr.set_base_m(base)
+    np.testing.assert_equal(arr.base_m, base)
+
+    arr.finalize()
+
+
+def test_operator_array():
+    weight = np.array([1.0, 2.0, 3.0])
+    arr = OperatorArray.from_build_args(Q(weight, "1"))
+
+    np.testing.assert_equal(arr.weight_m, weight)
+
+    a = np.array([1.0, 2.0, 3.0, 4.0])
+    b = np.array([2.0, 1.0, 0.0, 1.0])
+    pint.testing.assert_equal(arr.calc_vec_prod_sum(Q(a, "1"), Q(b, "1")), Q(weight * (a @ b), "1"))
+
+    a_each = np.arange(12.0).reshape(3, 4)
+    b_each = np.ones((3, 4))
+    exp = weight * (a_each * b_each).sum(axis=1)
+    np.testing.assert_allclose(arr.calc_vec_prod_sum_m(a_each, b_each), exp)
+
+    # A single vector can be combined with one vector per instance
+    np.testing.assert_allclose(arr.calc_vec_prod_sum_m(a_each, np.ones(4)), exp)
+
+    arr.set_weight_m([4.0, 5.0, 6.0])
+    np.testing.assert_equal(arr.weight_m, [4.0, 5.0, 6.0])
+
+    arr.finalize()
+
+
+def test_operator_array_wrong_shape():
+    arr = OperatorArray.from_build_args_m(np.ones(3))
+
+    with pytest.raises(ValueError, match=re.escape("(M,) or (3, M)")):
+        arr.calc_vec_prod_sum_m(np.ones((2, 4)), np.ones((2, 4)))
+
+    with pytest.raises(ValueError, match="a and b must have the same shape"):
+        arr.calc_vec_prod_sum_m(np.ones(4), np.ones(2))
+
+    with pytest.raises(ValueError, match="Expected a single value or 3 values"):
+        arr.set_weight_m(np.ones(4))
+
+    arr.finalize()
+
+
+def test_finalize():
+    start = derived_type.get_pool_statistics()
+
+    arr = DerivedTypeArray.from_build_args_m(np.arange(4.0))
+    assert derived_type.get_pool_statistics().n_live == start.n_live + 4
+
+    arr.finalize()
+
+    end = derived_type.get_pool_statistics()
+    assert end.n_live == start.n_live
+    assert end.n_finalized == start.n_finalized + 4
+    assert not arr.initialized
+    assert len(arr) == 0
+
+    with pytest.raises(InitialisationError):
+        arr.base_m
+
+    with pytest.raises(InitialisationError):
+        arr.finalize()
+
+
+def test_empty():
+    arr = DerivedTypeArray.from_build_args_m(np.array([]))
+
+    assert len(arr) == 0
+    assert arr.base_m.shape == (0,)
+    assert arr.double_m().shape == (0,)
+
+    arr.finalize()
+
+
+def test_arena():
+    start_derived_type = derived_type.get_pool_statistics()
+    start_operations = operations.get_pool_statistics()
+
+    with fgen_example.arena():
+        dta = DerivedTypeArray.from_build_args_m(np.arange(3.0))
+        finalized = DerivedTypeArray.from_build_args_m(np.arange(2.0))
+        opa = OperatorArray.from_build_args_m(np.arange(2.0))
+        finalized.finalize()
+
+    assert not dta.initialized
+    assert not opa.initialized
+    assert derived_type.get_pool_statistics().n_live == start_derived_type.n_live
+    assert operations.get_pool_statistics().n_live == start_operations.n_live
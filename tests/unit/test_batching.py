@@ -0,0 +1,218 @@
+"""
+Test micro-batching of single-value calls
+"""
+import asyncio
+import threading
+
+import numpy as np
+import pint
+import pint.testing
+import pytest
+
+from fgen_example.batching import DerivedTypeBatcher, MicroBatcher, OperatorBatcher
+from fgen_example.derived_type import DerivedType, DerivedTypeContext
+from fgen_example.operations import OperatorContext
+
+Q = pint.get_application_registry().Quantity
+
+
+async def _gather(*aws):
+    return await asyncio.gather(*aws)
+
+
+def test_derived_type_batcher(monkeypatch):
+    n_calls = 50
+    others = Q(np.arange(n_calls, dtype=float), "cm")
+
+    batch_sizes = []
+    add_batch_m = DerivedType.add_batch_m
+
+    def add_batch_m_counted(self, other):
+        batch_sizes.append(other.size)
+
+        return add_batch_m(self, other)
+
+    monkeypatch.setattr(DerivedType, "add_batch_m", add_batch_m_counted)
+
+    with DerivedTypeContext.from_build_args(base=Q(3.0, "m")) as inst:
+        batcher = DerivedTypeBatcher(inst)
+
+        res = asyncio.run(_gather(*(batcher.add(other) for other in others)))
+        exp = [inst.add(other) for other in others]
+
+    # All the calls arrive within the window so are processed in one batch
+    assert batch_sizes == [n_calls]
+    for res_i, exp_i in zip(res, exp):
+        pint.testing.assert_allclose(res_i, exp_i)
+
+
+def test_derived_type_batcher_strict():
+    with DerivedTypeContext.from_build_args(base=Q(3.0, "m")) as inst:
+        batcher = DerivedTypeBatcher(inst)
+
+        error_msg = "A wrapped function using strict=True requires quantity"
+        with pytest.raises(ValueError, match=error_msg):
+            asyncio.run(batcher.add(3.0))
+
+
+def test_operator_batcher():
+    rng = np.random.default_rng(8)
+    a = rng.random((20, 3))
+    b = rng.random((20, 3))
+
+    with OperatorContext.from_build_args(weight=Q(1.5, "dimensionless")) as inst:
+        batcher = OperatorBatcher(inst)
+
+        res = asyncio.run(
+            _gather(*(batcher.calc_vec_prod_sum(Q(a_i, "1"), Q(b_i, "1")) for a_i, b_i in zip(a, b)))
+        )
+        exp = [inst.calc_vec_prod_sum(Q(a_i, "1"), Q(b_i, "1")) for a_i, b_i in zip(a, b)]
+
+        # Mixed vector lengths fall back to one call per item
+        res_mixed = asyncio.run(
+            _gather(
+                batcher.calc_vec_prod_sum_m(a[0], b[0]),
+                batcher.calc_vec_prod_sum_m(np.arange(5.0), np.ones(5)),
+            )
+        )
+        exp_mixed = [
+            inst.calc_vec_prod_sum_m(a[0], b[0]),
+            inst.calc_vec_prod_sum_m(np.arange(5.0), np.ones(5)),
+        ]
+
+    for res_i, exp_i in zip(res, exp):
+        pint.testing.assert_allclose(res_i, exp_i)
+
+    np.testing.assert_allclose(res_mixed, exp_mixed)
+
+
+def test_max_batch_size():
+    batch_sizes = []
+
+    def batch_func(args):
+        batch_sizes.append(len(args))
+
+        return [2 * v for v in args]
+
+    # Huge delay so only the batch size can trigger processing
+    batcher = MicroBatcher(batch_func, max_batch_size=4, max_delay=1e6)
+
+    res = asyncio.run(asyncio.wait_for(_gather(*(batcher.submit(i) for i in range(8))), timeout=10))
+
+    assert res == [2 * i for i in range(8)]
+    assert batch_sizes == [4, 4]
+
+
+def test_max_delay():
+    batch_sizes = []
+
+    def batch_func(args):
+        batch_sizes.append(len(args))
+
+        return args
+
+    batcher = MicroBatcher(batch_func, max_batch_size=100, max_delay=0.0)
+
+    async def staggered():
+        first = asyncio.gather(batcher.submit(1), batcher.submit(2))
+        # Let the first batch be processed before submitting more
+        await asyncio.sleep(0.01)
+        second = asyncio.gather(batcher.submit(3))
+
+        return await first, await second
+
+    res = asyncio.run(staggered())
+
+    assert res == ([1, 2], [3])
+    assert batch_sizes == [2, 1]
+
+
+def test_batch_func_error():
+    def batch_func(args):
+        msg = "Oops"
+        raise RuntimeError(msg)
+
+    batcher = MicroBatcher(batch_func)
+
+    async def submit_many():
+        return await asyncio.gather(*(batcher.submit(i) for i in range(3)), return_exceptions=True)
+
+    res = asyncio.run(submit_many())
+
+    assert len(res) == 3
+    assert all(isinstance(v, RuntimeError) for v in res)
+
+
+def test_batch_func_error_isolated():
+    batch_sizes = []
+
+    def batch_func(args):
+        batch_sizes.append(len(args))
+        if any(v < 0 for v in args):
+            msg = "Negative value"
+            raise ValueError(msg)
+
+        return [2 * v for v in args]
+
+    batcher = MicroBatcher(batch_func)
+
+    async def submit_many():
+        return await asyncio.gather(batcher.submit(1), batcher.submit(-1), return_exceptions=True)
+
+    res = asyncio.run(submit_many())
+
+    assert res[0] == 2
+    assert isinstance(res[1], ValueError)
+    # The failed batch is retried one call at a time
+    assert batch_sizes == [2, 1, 1]
+
+
+def test_derived_type_batcher_bad_call_isolated():
+    with DerivedTypeContext.from_build_args(base=Q(3.0, "m")) as inst:
+        batcher = DerivedTypeBatcher(inst)
+
+        async def submit_many():
+            return await asyncio.gather(
+                batcher.add_m(1.0),
+                # Not a scalar, so the batched call fails
+                batcher.add_m(np.array([1.0, 2.0])),
+                return_exceptions=True,
+            )
+
+        good, bad = asyncio.run(submit_many())
+
+    assert good == 4.0
+    assert isinstance(bad, ValueError)
+
+
+def test_batch_runs_off_event_loop_thread():
+    threads = []
+
+    def batch_func(args):
+        threads.append(threading.get_ident())
+
+        return args
+
+    batcher = MicroBatcher(batch_func)
+
+    assert asyncio.run(batcher.submit(1)) == 1
+    assert threads != [threading.get_ident()]
+
+
+def test_batch_func_wrong_number_of_results():
+    batcher = MicroBatcher(lambda args: args[:-1])
+
+    with pytest.raises(ValueError, match="batch_func returned 1 results for 2 calls"):
+        asyncio.run(_gather(batcher.submit(1), batcher.submit(2)))
+
+
+@pytest.mark.parametrize(
+    "kwargs",
+    (
+        pytest.param(dict(max_batch_size=0), id="max_batch_size"),
+        pytest.param(dict(max_delay=-1.0), id="max_delay"),
+    ),
+)
+def test_invalid_settings(kwargs):
+    with pytest.raises(ValueError):
+        MicroBatcher(lambda args: args, **kwargs)
@@ -0,0 +1,193 @@
+"""
+Test checkpointing of the instance pools
+"""
+import json
+import subprocess
+import sys
+
+import numpy as np
+import pytest
+
+from fgen_example import checkpoint, derived_type, operations
+from fgen_example.derived_type import DerivedTypeArray
+
+SAVE_CODE = """
+import json, sys
+import numpy as np
+from fgen_example import checkpoint
+from fgen_example.derived_type import DerivedType, DerivedTypeArray
+from fgen_example.operations import OperatorArray
+
+dta = DerivedTypeArray.from_build_args_m(np.arange(5.0))
+finalized = DerivedType.from_build_args_m(10.0)
+opa = OperatorArray.from_build_args_m(np.arange(3.0) + 0.5)
+dt = DerivedType.from_build_args_m(20.0)
+finalized.finalize()
+
+checkpoint.save_checkpoint(sys.argv[1])
+print(json.dumps({
+    "DerivedType": [[*dta.instance_indexes.tolist(), dt.instance_index], [*dta.base_m.tolist(), dt.base_m]],
+    "Operator": [opa.instance_indexes.tolist(), opa.weight_m.tolist()],
+}))
+"""
+
+LOAD_CODE = """
+import json, sys
+from fgen_example import checkpoint
+
+restored = checkpoint.load_checkpoint(sys.argv[1])
+print(json.dumps({
+    "DerivedType": [
+        restored["DerivedType"].instance_indexes.tolist(),
+        restored["DerivedType"].base_m.tolist(),
+    ],
+    "Operator": [
+        restored["Operator"].instance_indexes.tolist(),
+        restored["Operator"].weight_m.tolist(),
+    ],
+}))
+"""
+
+
+def run_in_fresh_interpreter(code, *args):
+    res = subprocess.run(
+        (sys.executable, "-c", code, *args),  # noqa: S603
+        capture_output=True,
+        check=True,
+        text=True,
+    )
+
+    return json.loads(res.stdout)
+
+
+def test_save_load(tmp_path):
+    path = tmp_path / "state.fgenckpt"
+
+    saved = run_in_fresh_interpreter(SAVE_CODE, str(path))
+    restored = run_in_fresh_interpreter(LOAD_CODE, str(path))
+
+    # The gap left by the finalised instance is kept
+    assert saved["DerivedType"][0] == [1, 2, 3, 4, 5, 7]
+    assert restored == saved
+
+
+def test_read_checkpoint(tmp_path):
+    path = tmp_path / "state.fgenckpt"
+    dta = DerivedTypeArray.from_build_args_m(np.arange(3.0))
+
+    checkpoint.save_checkpoint(path)
+    read = checkpoint.read_checkpoint(path)
+
+    assert set(read) == set(checkpoint.TYPE_TAGS)
+    for module, (instance_indexes, values) in zip(
+        (derived_type, operations), (read["DerivedType"], read["Operator"])
+    ):
+        exported_indexes, exported_values = module.export_instances_m()
+        np.testing.assert_equal(instance_indexes, exported_indexes)
+        np.testing.assert_equal(values, exported_values)
+
+    instance_indexes, values = read["DerivedType"]
+    assert isinstance(values, np.memmap)
+    # Only the live instances are stored
+    assert path.stat().st_size == (
+        16 + 16 * len(read) + sum(-(-v[0].size * 4 // 8) * 8 + v[1].size * 8 for v in read.values())
+    )
+
+    dta.finalize()
+
+
+def test_load_checkpoint_in_use(tmp_path):
+    path = tmp_path / "state.fgenckpt"
+    dta = DerivedTypeArray.from_build_args_m(np.arange(3.0))
+    checkpoint.save_checkpoint(path)
+    start = derived_type.get_pool_statistics()
+
+    with pytest.raises(ValueError, match="not already in use"):
+        checkpoint.load_checkpoint(path)
+
+    assert derived_type.get_pool_statistics() == start
+
+    dta.finalize()
+
+
+def test_load_checkpoint_partial_failure(tmp_path, monkeypatch):
+    path = tmp_path / "state.fgenckpt"
+    # Indexes which are free, as they are beyond the pool's capacity
+    instance_indexes = np.arange(3, dtype=np.int32) + derived_type.get_instance_capacity() + 1
+    with monkeypatch.context() as m:
+        m.setattr(derived_type, "export_instances_m", lambda: (instance_indexes, np.arange(3.0)))
+        checkpoint.save_checkpoint(path)
+
+    def import_instances_m(instance_indexes, weight):
+        msg = "Could not claim the requested instance indexes"
+        raise ValueError(msg)
+
+    monkeypatch.setattr(operations, "import_instances_m", import_instances_m)
+    start = derived_type.get_pool_statistics()
+
+    with pytest.raises(ValueError, match="Could not claim"):
+        checkpoint.load_checkpoint(path)
+
+    # The DerivedType instances were restored, then released again
+    end = derived_type.get_pool_statistics()
+    assert end.n_live == start.n_live
+    assert end.n_claimed == start.n_claimed + 3
+    assert end.n_finalized == start.n_finalized + 3
+
+
+def test_save_overwrites(tmp_path):
+    path = tmp_path / "state.fgenckpt"
+    path.write_bytes(b"old")
+    # Unrelated file, which must not be used as the temporary file
+    (tmp_path / "state.fgenckpt.tmp").write_bytes(b"mine")
+
+    checkpoint.save_checkpoint(path)
+
+    checkpoint.read_checkpoint(path)
+    assert sorted(v.name for v in tmp_path.iterdir()) == ["state.fgenckpt", "state.fgenckpt.tmp"]
+    assert (tmp_path / "state.fgenckpt.tmp").read_bytes() == b"mine"
+
+
+@pytest.mark.parametrize(
+    "contents, match",
+    (
+        pytest.param(b"NOTACKPT" + bytes(8), "is not a checkpoint file", id="magic"),
+        pytest.param(b"", "is not a checkpoint file", id="empty"),
+        pytest.param(
+            b"FGENCKPT" + (2).to_bytes(4, "little") + bytes(4),
+            "format version 2, only version 1 is supported",
+            id="version",
+        ),
+        pytest.param(
+            b"FGENCKPT" + (1).to_bytes(4, "little") + (1).to_bytes(4, "little"),
+            "is truncated",
+            id="truncated-table",
+        ),
+        pytest.param(
+            b"FGENCKPT"
+            + (1).to_bytes(4, "little")
+            + (1).to_bytes(4, "little")
+            + (1).to_bytes(4, "little")
+            + bytes(4)
+            + (10).to_bytes(8, "little")
+            + bytes(8),
+            "is truncated",
+            id="truncated-section",
+        ),
+        pytest.param(
+            b"FGENCKPT"
+            + (1).to_bytes(4, "little")
+            + (1).to_bytes(4, "little")
+            + (99).to_bytes(4, "little")
+            + bytes(12),
+            "unknown type tag: 99",
+            id="type-tag",
+        ),
+    ),
+)
+def test_read_checkpoint_invalid(tmp_path, contents, match):
+    path = tmp_path / "state.fgenckpt"
+    path.write_bytes(contents)
+
+    with pytest.raises(ValueError, match=match):
+        checkpoint.read_checkpoint(path)
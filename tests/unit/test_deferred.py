@@ -0,0 +1,146 @@
+"""
+Test deferred operations
+"""
+import re
+
+import numpy as np
+import pint
+import pint.testing
+import pytest
+from fgen_runtime.exceptions import InitialisationError
+
+from fgen_example.deferred import OperationQueue
+from fgen_example.derived_type import DerivedType, DerivedTypeNoSetters
+from fgen_example.operations import Operator
+
+Q = pint.get_application_registry().Quantity
+
+
+@pytest.mark.parametrize("cls", (DerivedType, DerivedTypeNoSetters))
+def test_derived_type_batch(cls):
+    inst = cls.from_build_args(base=Q(3.0, "m"))
+
+    with inst.batch() as batch:
+        added = batch.add(Q(20.0, "cm"))
+        doubled = batch.double()
+        base = batch.get_base()
+        added_m = batch.add_m(1.5)
+        assert not added.done
+
+    assert len(batch) == 4
+    assert added.done
+    pint.testing.assert_equal(added.value, inst.add(Q(20.0, "cm")))
+    pint.testing.assert_equal(doubled.value, inst.double())
+    pint.testing.assert_equal(base.value, inst.base)
+    assert added_m.value_m == inst.add_m(1.5)
+    pint.testing.assert_equal(batch.results, Q([3.2, 6.0, 3.0, 4.5], "m"))
+    np.testing.assert_equal(batch.results_m, [3.2, 6.0, 3.0, 4.5])
+
+    inst.finalize()
+
+
+def test_operator_batch():
+    inst = Operator.from_build_args(weight=Q(2.0, "dimensionless"))
+    a = np.array([1.0, 2.0, 3.0])
+    b = np.array([4.0, 5.0, 6.0])
+    a_q = Q(a, "dimensionless")
+    b_q = Q(b, "dimensionless")
+
+    with inst.batch() as batch:
+        weight = batch.get_weight()
+        res = batch.calc_vec_prod_sum(a_q, b_q)
+        # Vectors of different lengths can be mixed
+        res_short = batch.calc_vec_prod_sum_m(a[:2], b[:2])
+        res_long = batch.calc_vec_prod_sum_m(np.arange(5.0), np.ones(5))
+
+    assert weight.value_m == inst.weight_m
+    pint.testing.assert_equal(res.value, inst.calc_vec_prod_sum(a_q, b_q))
+    assert res_short.value_m == inst.calc_vec_prod_sum_m(a[:2], b[:2])
+    assert res_long.value_m == inst.calc_vec_prod_sum_m(np.arange(5.0), np.ones(5))
+
+    with pytest.raises(ValueError, match="a and b must have the same length"):
+        inst.batch().calc_vec_prod_sum_m(a, b[:2])
+
+    inst.finalize()
+
+
+def test_batch_empty():
+    inst = DerivedType.from_build_args_m(1.0)
+
+    with inst.batch() as batch:
+        pass
+
+    assert batch.done
+    assert batch.results_m.size == 0
+
+    inst.finalize()
+
+
+def test_batch_exception():
+    inst = DerivedType.from_build_args_m(1.0)
+
+    with pytest.raises(ZeroDivisionError):
+        with inst.batch() as batch:
+            res = batch.double()
+            1 / 0
+
+    assert not res.done
+    with pytest.raises(RuntimeError, match="The queue was discarded"):
+        res.value_m
+
+    inst.finalize()
+
+
+def test_batch_not_run():
+    inst = DerivedType.from_build_args_m(1.0)
+    batch = inst.batch()
+    res = batch.double()
+
+    with pytest.raises(RuntimeError, match="The queue has not been run yet"):
+        res.value
+
+    np.testing.assert_equal(batch.run(), [2.0])
+    assert res.value_m == 2.0
+
+    with pytest.raises(RuntimeError, match="The queue has already been run"):
+        batch.double()
+
+    with pytest.raises(RuntimeError, match="The queue has already been run"):
+        batch.run()
+
+    inst.finalize()
+
+
+def test_batch_finalized():
+    inst = DerivedType.from_build_args_m(1.0)
+    batch = inst.batch()
+    batch.double()
+    inst.finalize()
+
+    with pytest.raises(InitialisationError, match=re.escape("run")):
+        batch.run()
+
+    with pytest.raises(InitialisationError):
+        inst.batch()
+
+
+@pytest.mark.parametrize("cls", (DerivedType, Operator))
+def test_batch_unknown_opcode(cls):
+    inst = cls.from_build_args_m(1.0)
+    batch = inst.batch()
+    known = batch._queue(1)
+    unknown = batch._queue(99)
+    batch.run()
+
+    assert known.value_m == 1.0
+    assert np.isnan(unknown.value_m)
+
+    inst.finalize()
+
+
+def test_queue_without_dispatch():
+    class NoDispatch(OperationQueue):
+        pass
+
+    with pytest.raises(TypeError, match="abstract"):
+        NoDispatch(instance=None)
@@ -0,0 +1,192 @@
+"""
+Test the opt-in instrumentation of the wrapper methods
+"""
+import os
+import subprocess
+import sys
+
+import numpy as np
+import pint
+import pytest
+
+from fgen_example import instrumentation
+from fgen_example.derived_type import DerivedType, DerivedTypeArray
+from fgen_example.instrumentation import (
+    MethodStats,
+    _get_bucket,
+    _get_bucket_upper_edge,
+)
+from fgen_example.operations import Operator, OperatorNoSetters
+
+Q = pint.get_application_registry().Quantity
+
+
+@pytest.fixture
+def instrumented():
+    instrumentation.reset()
+    instrumentation.enable()
+    yield
+    instrumentation.disable()
+    instrumentation.reset()
+
+
+def test_disabled_by_default():
+    assert not instrumentation.is_enabled()
+    assert instrumentation.snapshot() == {}
+
+
+def test_enable_disable_restores_methods():
+    add = DerivedType.__dict__["add"]
+    weight = Operator.__dict__["weight"]
+
+    instrumentation.enable()
+    try:
+        assert DerivedType.__dict__["add"] is not add
+        assert Operator.__dict__["weight"] is not weight
+    finally:
+        instrumentation.disable()
+
+    assert DerivedType.__dict__["add"] is add
+    assert Operator.__dict__["weight"] is weight
+
+
+def test_counts_and_time_split(instrumented):
+    n_calls = 10
+    inst = DerivedType.from_build_args(base=Q(3.0, "m"))
+    for _ in range(n_calls):
+        inst.add(Q(20.0, "cm"))
+
+    inst.base
+    inst.finalize()
+
+    stats = instrumentation.snapshot()
+
+    add = stats["DerivedType.add"]
+    assert add.calls == n_calls
+    assert stats["DerivedType.add_m"].calls == n_calls
+    assert add.total_time > 0
+    assert add.fortran_time > 0
+    assert add.unit_time > 0
+    np.testing.assert_allclose(add.fortran_time + add.unit_time, add.total_time)
+    # The nested magnitude-only calls are what's reported as Fortran time
+    np.testing.assert_allclose(add.fortran_time, stats["DerivedType.add_m"].total_time)
+    assert add.percentile(50) <= add.percentile(99)
+
+    add_m = stats["DerivedType.add_m"]
+    assert add_m.unit_time == 0
+    assert add_m.fortran_time == add_m.total_time
+
+    assert stats["DerivedType.base"].calls == 1
+    assert stats["DerivedType.from_build_args"].calls == 1
+    assert stats["DerivedType.finalize"].calls == 1
+    assert "DerivedType.double" not in stats
+
+
+def test_queue_only_calls_report_no_fortran_time(instrumented):
+    inst = DerivedType.from_build_args(base=Q(3.0, "m"))
+    batch = inst.batch()
+    batch.add(Q(20.0, "cm"))
+    batch.discard()
+    inst.finalize()
+
+    stats = instrumentation.snapshot()
+
+    # Queueing only appends to Python lists, nothing reaches Fortran
+    for key in ("DerivedTypeOperationQueue.add", "DerivedTypeOperationQueue.add_m"):
+        assert stats[key].calls == 1
+        assert stats[key].fortran_time == 0
+        assert stats[key].unit_time == stats[key].total_time
+
+
+def test_array_initialized_reports_no_fortran_time(instrumented):
+    arr = DerivedTypeArray.from_build_args_m(np.arange(3.0))
+    arr.finalize()
+
+    stats = instrumentation.snapshot()
+
+    assert stats["DerivedTypeArray.initialized"].fortran_time == 0
+    finalize = stats["DerivedTypeArray.finalize"]
+    assert finalize.fortran_time == finalize.total_time
+
+
+def test_classes_are_recorded_separately(instrumented):
+    for cls in (Operator, OperatorNoSetters):
+        inst = cls.from_build_args(weight=Q(2.0, "1"))
+        inst.calc_vec_prod_sum(Q([1.0, 2.0, 3.0], "1"), Q([1.0, 1.0, 1.0], "1"))
+        inst.finalize()
+
+    stats = instrumentation.snapshot()
+
+    assert stats["Operator.calc_vec_prod_sum"].calls == 1
+    assert stats["OperatorNoSetters.calc_vec_prod_sum"].calls == 1
+
+
+def test_reset(instrumented):
+    inst = DerivedType.from_build_args(base=Q(3.0, "m"))
+    inst.finalize()
+    assert instrumentation.snapshot()
+
+    instrumentation.reset()
+
+    assert instrumentation.snapshot() == {}
+
+
+def test_exception_is_recorded(instrumented):
+    inst = DerivedType()
+
+    with pytest.raises(Exception, match="add_m"):
+        inst.add_m(1.0)
+
+    assert instrumentation.snapshot()["DerivedType.add_m"].calls == 1
+
+
+def test_enable_from_env_var():
+    res = subprocess.run(
+        (  # noqa: S603
+            sys.executable,
+            "-c",
+            "from fgen_example import instrumentation;"
+            "from fgen_example.derived_type import DerivedType;"
+            "DerivedType.from_build_args_m(1.0).finalize();"
+            "print(instrumentation.snapshot()['DerivedType.finalize'].calls)",
+        ),
+        env={**os.environ, instrumentation.ENV_VAR: "1"},
+        capture_output=True,
+        check=True,
+        text=True,
+    )
+
+    assert res.stdout.strip() == "1"
+
+
+@pytest.mark.parametrize(
+    "elapsed_ns",
+    (0, 1, 3, 4, 7, 8, 9, 15, 16, 1_000, 123_456, 2**40 + 17),
+)
+def test_histogram_buckets(elapsed_ns):
+    bucket = _get_bucket(elapsed_ns)
+    upper_edge = _get_bucket_upper_edge(bucket)
+
+    assert elapsed_ns <= upper_edge
+    # Within a quarter of an octave
+    assert upper_edge < max(elapsed_ns * 1.25, elapsed_ns + 1)
+    assert _get_bucket(upper_edge) == bucket
+    assert _get_bucket(upper_edge + 1) == bucket + 1
+
+
+def test_percentile():
+    stats = MethodStats(
+        calls=10,
+        total_time=1.0,
+        fortran_time=1.0,
+        unit_time=0.0,
+        latency_histogram={1e-3: 5, 1e-2: 4, 1e-1: 1},
+    )
+
+    assert stats.mean_time == 0.1
+    assert stats.percentile(50) == 1e-3
+    assert stats.percentile(90) == 1e-2
+    assert stats.percentile(100) == 1e-1
+
+    with pytest.raises(ValueError, match="q must be between 0 and 100"):
+        stats.percentile(101)
@@ -0,0 +1,82 @@
+"""
+Test that the package defers loading its heavier dependencies
+"""
+import subprocess
+import sys
+
+import pytest
+
+import fgen_example
+from fgen_example import pool
+
+
+def run_in_fresh_interpreter(code):
+    res = subprocess.run(
+        (sys.executable, "-c", code),  # noqa: S603
+        capture_output=True,
+        check=True,
+        text=True,
+    )
+
+    return res.stdout.strip()
+
+
+def test_import_package_is_lazy():
+    res = run_in_fresh_interpreter(
+        "import sys;"
+        "import fgen_example;"
+        "print(sorted(m for m in sys.modules if m.startswith('fgen_example')))"
+    )
+
+    assert res == "['fgen_example']"
+
+
+def test_import_wrapper_is_lazy():
+    res = run_in_fresh_interpreter(
+        "import sys;"
+        "import pint;"
+        "import fgen_example;"
+        "from fgen_example import derived_type;"
+        "registry = pint.get_application_registry()._registry;"
+        "print('fgen_example._lib' in sys.modules, type(registry).__name__);"
+        "inst = derived_type.DerivedType.from_build_args(registry.Quantity(1, 'm'));"
+        "print('fgen_example._lib' in sys.modules, type(registry).__name__);"
+        "print(derived_type.derived_type_w is fgen_example._lib.derived_type_w)"
+    )
+
+    assert res.splitlines() == [
+        "False LazyRegistry",
+        "True UnitRegistry",
+        # The stand-in has been replaced by the extension module itself
+        "True",
+    ]
+
+
+def test_missing_extension_raises_on_first_use():
+    res = run_in_fresh_interpreter(
+        "import sys;"
+        "import fgen_runtime.exceptions as fgr_excs;"
+        # Make importing the compiled extension fail
+        "sys.modules['fgen_example._lib'] = None;"
+        "from fgen_example import derived_type;"
+        "print('imported');"
+        "exp = fgr_excs.CompiledExtensionNotFoundError('fgen_example._lib');\n"
+        "try:\n"
+        "    derived_type.DerivedType.from_new_connection()\n"
+        "except fgr_excs.CompiledExtensionNotFoundError as exc:\n"
+        "    print(type(exc) is type(exp), str(exc) == str(exp))"
+    )
+
+    assert res.splitlines() == ["imported", "True True"]
+
+
+def test_lazy_attributes():
+    assert fgen_example.arena is pool.arena
+    assert fgen_example.derived_type.__name__ == "fgen_example.derived_type"
+    assert isinstance(fgen_example.__version__, str)
+    assert {"arena", "derived_type", "units", "__version__"} <= set(dir(fgen_example))
+
+
+def test_unknown_attribute():
+    with pytest.raises(AttributeError, match="has no attribute 'junk'"):
+        fgen_example.junk
@@ -0,0 +1,221 @@
+"""
+Test spreading calls over threads
+"""
+import concurrent.futures
+import threading
+
+import numpy as np
+import pint
+import pint.testing
+import pytest
+
+from fgen_example.derived_type import (
+    DerivedType,
+    double_batch_m,
+    get_instance_capacity,
+    reserve_instances,
+)
+from fgen_example.derived_type import finalize_many as finalize_many_derived_types
+from fgen_example.operations import Operator, finalize_many
+from fgen_example.parallel import (
+    get_min_parallel_batch_size,
+    get_num_threads,
+    map_batch,
+    map_instances,
+    map_processes,
+    openmp_enabled,
+    set_min_parallel_batch_size,
+    set_num_threads,
+)
+
+Q = pint.get_application_registry().Quantity
+
+
+@pytest.fixture
+def operators():
+    out = Operator.from_build_args_batch_m(np.array([1.0, 2.0, 3.0, 4.0]))
+    yield out
+    finalize_many(out)
+
+
+def test_map_instances(operators):
+    rng = np.random.default_rng(0)
+    a = [rng.random((10, 3)) for _ in operators]
+    b = [rng.random((10, 3)) for _ in operators]
+
+    res = map_instances(Operator.calc_vec_prod_sum_batch_m, operators, a, b)
+
+    for operator, a_i, b_i, res_i in zip(operators, a, b, res):
+        np.testing.assert_allclose(res_i, operator.calc_vec_prod_sum_batch_m(a_i, b_i))
+
+
+def test_map_instances_executor(operators):
+    with concurrent.futures.ThreadPoolExecutor(max_workers=2) as executor:
+        res = map_instances(lambda operator: operator.weight, operators, executor=executor)
+
+    pint.testing.assert_allclose(Q(np.array([v.m for v in res]), "1"), Q(np.array([1.0, 2.0, 3.0, 4.0]), "1"))
+
+
+def test_map_processes(operators):
+    rng = np.random.default_rng(0)
+    a = [rng.random((10, 3)) for _ in operators]
+    b = [rng.random((10, 3)) for _ in operators]
+
+    res = map_processes(Operator.calc_vec_prod_sum_batch_m, operators, a, b, max_workers=2)
+
+    for operator, a_i, b_i, res_i in zip(operators, a, b, res):
+        assert operator.initialized
+        np.testing.assert_allclose(res_i, operator.calc_vec_prod_sum_batch_m(a_i, b_i))
+
+
+def test_map_processes_executor(operators):
+    with concurrent.futures.ProcessPoolExecutor(max_workers=2) as executor:
+        res = map_processes(
+            Operator.calc_vec_prod_sum_m,
+            operators,
+            [np.array([1.0, 2.0])] * len(operators),
+            [np.array([3.0, 4.0])] * len(operators),
+            executor=executor,
+        )
+
+    np.testing.assert_allclose(res, [11.0 * v.weight_m for v in operators])
+
+
+def test_map_processes_thread_pool(operators):
+    with concurrent.futures.ThreadPoolExecutor(max_workers=2) as executor:
+        with pytest.raises(TypeError, match="executor must be a ProcessPoolExecutor"):
+            map_processes(Operator.calc_vec_prod_sum_m, operators, executor=executor)
+
+    # The caller's instances are left alone
+    assert all(v.initialized for v in operators)
+
+
+@pytest.mark.parametrize("n", (1, 2, 4, 1001))
+def test_map_batch(n):
+    operators = Operator.from_build_args_batch_m(np.full(4, 2.0))
+    rng = np.random.default_rng(0)
+    a = rng.random((n, 3))
+    b = rng.random((n, 3))
+
+    res = map_batch(Operator.calc_vec_prod_sum_batch_m, operators, a, b)
+
+    np.testing.assert_allclose(res, operators[0].calc_vec_prod_sum_batch_m(a, b))
+    finalize_many(operators)
+
+
+def test_map_batch_length_mismatch(operators):
+    with pytest.raises(ValueError, match="All batches must have the same length"):
+        map_batch(
+            Operator.calc_vec_prod_sum_batch_m,
+            operators,
+            np.ones((3, 3)),
+            np.ones((4, 3)),
+        )
+
+
+def test_map_batch_no_instances():
+    with pytest.raises(ValueError, match="At least one instance is required"):
+        map_batch(Operator.calc_vec_prod_sum_batch_m, [], np.ones((3, 3)))
+
+
+def test_build_and_finalize_from_many_threads():
+    # Enough instances that the pool has to grow while other threads
+    # are calling wrapped methods (which run without the GIL held)
+    n_threads = 8
+    reserve_instances(1024)
+    capacity = get_instance_capacity()
+    n_per_thread = 2 * capacity // n_threads
+    others = np.linspace(0.0, 1.0, 10_000)
+    all_built = threading.Barrier(n_threads)
+
+    def churn(thread_number):
+        live = []
+        for i in range(n_per_thread):
+            base = float(thread_number * n_per_thread + i)
+            if i % 2:
+                live.append(DerivedType.from_build_args_m(base))
+            else:
+                live.extend(DerivedType.from_build_args_batch_m(np.array([base])))
+
+            if i % 100 == 0:
+                np.testing.assert_allclose(live[-1].add_batch_m(others), base + others)
+
+            if i % 3 == 0:
+                live.pop(0).finalize()
+
+        bases = [v.base_m for v in live]
+        indexes = [v.instance_index for v in live]
+        # Wait until every thread has built its instances before finalising any
+        all_built.wait()
+        finalize_many_derived_types(live[: len(live) // 2])
+
+        return bases, indexes, live[len(live) // 2 :]
+
+    with concurrent.futures.ThreadPoolExecutor(max_workers=n_threads) as executor:
+        res = list(executor.map(churn, range(n_threads)))
+
+    assert get_instance_capacity() > capacity
+
+    all_indexes = [i for _, indexes, _ in res for i in indexes]
+    assert len(set(all_indexes)) == len(all_indexes)
+
+    for thread_number, (bases, _, remaining) in enumerate(res):
+        # Each thread only ever saw the values it built
+        assert all(thread_number * n_per_thread <= v < (thread_number + 1) * n_per_thread for v in bases)
+        for v in remaining:
+            assert v.initialized
+            v.finalize()
+
+
+@pytest.fixture
+def openmp_settings():
+    num_threads = get_num_threads()
+    min_parallel_batch_size = get_min_parallel_batch_size()
+    yield
+    set_num_threads(num_threads)
+    set_min_parallel_batch_size(min_parallel_batch_size)
+
+
+@pytest.mark.parametrize("num_threads", (1, 3))
+@pytest.mark.parametrize("min_parallel_batch_size", (1, 1_000_000))
+def test_openmp_batch_kernels(num_threads, min_parallel_batch_size, openmp_settings):
+    set_num_threads(num_threads)
+    set_min_parallel_batch_size(min_parallel_batch_size)
+    assert get_num_threads() == (num_threads if openmp_enabled() else 1)
+    assert get_min_parallel_batch_size() == min_parallel_batch_size
+
+    rng = np.random.default_rng(0)
+    n = 10_001
+    a = rng.random((n, 3))
+    b = rng.random((n, 3))
+    others = rng.random(n)
+
+    operator = Operator.from_build_args_m(2.0)
+    np.testing.assert_allclose(operator.calc_vec_prod_sum_batch_m(a, b), 2.0 * np.sum(a * b, axis=1))
+    operator.finalize()
+
+    derived_types = DerivedType.from_build_args_batch_m(others)
+    np.testing.assert_allclose(derived_types[0].add_batch_m(others), others[0] + others)
+    np.testing.assert_allclose(double_batch_m(derived_types), 2.0 * others)
+    finalize_many_derived_types(derived_types)
+
+
+def test_num_threads_applies_to_other_threads(openmp_settings):
+    set_num_threads(3)
+
+    with concurrent.futures.ThreadPoolExecutor(max_workers=1) as executor:
+        res = executor.submit(get_num_threads).result()
+
+    assert res == (3 if openmp_enabled() else 1)
+
+
+@pytest.mark.parametrize(
+    "setter, name",
+    (
+        (set_num_threads, "num_threads"),
+        (set_min_parallel_batch_size, "batch_size"),
+    ),
+)
+def test_openmp_settings_invalid(setter, name):
+    with pytest.raises(ValueError, match=f"{name} must be at least one"):
+        setter(0)
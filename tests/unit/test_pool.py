@@ -0,0 +1,416 @@
+"""
+Test the instance pool diagnostics and automatic release
+"""
+import concurrent.futures
+import gc
+
+import numpy as np
+import pint
+import pytest
+
+import fgen_example
+from fgen_example import derived_type, operations, pool
+from fgen_example.derived_type import (
+    DerivedType,
+    DerivedTypeContext,
+    DerivedTypeNoSetters,
+)
+from fgen_example.operations import Operator
+
+Q = pint.get_application_registry().Quantity
+
+
+@pytest.fixture
+def leak_tracking():
+    pool.enable_leak_tracking()
+    yield
+    pool.disable_leak_tracking()
+
+
+def test_pool_statistics():
+    start = derived_type.get_pool_statistics()
+
+    single = DerivedType.from_build_args(base=Q(1.0, "m"))
+    no_setters = DerivedTypeNoSetters.from_build_args(base=Q(2.0, "m"))
+    batch = DerivedType.from_build_args_batch_m(np.arange(3.0))
+
+    during = derived_type.get_pool_statistics()
+    assert during.n_live == start.n_live + 5
+    assert during.n_claimed == start.n_claimed + 5
+    assert during.n_finalized == start.n_finalized
+    assert during.high_water_mark >= during.n_live
+    assert during.capacity >= during.n_live
+
+    single.finalize()
+    no_setters.finalize()
+    derived_type.finalize_many(batch)
+
+    end = derived_type.get_pool_statistics()
+    assert end.n_live == start.n_live
+    assert end.n_claimed == start.n_claimed + 5
+    assert end.n_finalized == start.n_finalized + 5
+    assert end.high_water_mark == during.high_water_mark
+
+
+def test_pools_are_separate():
+    start = operations.get_pool_statistics()
+
+    inst = DerivedType.from_build_args(base=Q(1.0, "m"))
+
+    assert operations.get_pool_statistics() == start
+
+    inst.finalize()
+
+
+def test_leak_report_without_tracking():
+    inst = Operator.from_build_args(weight=Q(1.0, "1"))
+
+    report = operations.get_leak_report()
+    leaked = [v for v in report if v.instance_index == inst.instance_index]
+    assert len(leaked) == 1
+    assert leaked[0].type_name == "Operator"
+    assert leaked[0].creation_stack is None
+
+    inst.finalize()
+
+    assert inst.instance_index not in [v.instance_index for v in operations.get_leak_report()]
+
+
+def test_leak_report(leak_tracking):
+    def leaky():
+        return DerivedType.from_build_args(base=Q(1.0, "m"))
+
+    leaked_inst = leaky()
+    finalized_inst = DerivedType.from_build_args(base=Q(1.0, "m"))
+    batch = DerivedType.from_build_args_batch_m(np.arange(2.0))
+    finalized_inst.finalize()
+
+    report = {v.instance_index: v for v in derived_type.get_leak_report()}
+
+    assert finalized_inst.instance_index not in report
+    leak = report[leaked_inst.instance_index]
+    # The innermost frame is the code which called into fgen_example
+    assert leak.creation_stack[-1].name == "leaky"
+    for inst in batch:
+        assert report[inst.instance_index].creation_stack[-1].name == "test_leak_report"
+
+    formatted = pool.format_leak_report(list(report.values()))
+    assert "in leaky" in formatted
+    assert f"instance indexes: {leaked_inst.instance_index})" in formatted
+
+    leaked_inst.finalize()
+    derived_type.finalize_many(batch)
+
+    assert leaked_inst.instance_index not in [v.instance_index for v in derived_type.get_leak_report()]
+
+
+def test_format_leak_report_empty():
+    assert pool.format_leak_report([]) == "No live instances"
+
+
+def test_leak_tracking_toggle():
+    assert not pool.is_leak_tracking_enabled()
+
+    pool.enable_leak_tracking()
+    try:
+        assert pool.is_leak_tracking_enabled()
+        assert pool.get_leak_tracker("DerivedType").enabled
+    finally:
+        pool.disable_leak_tracking()
+
+    assert not pool.get_leak_tracker("DerivedType").enabled
+
+
+@pytest.fixture
+def auto_finalize():
+    pool.enable_auto_finalize()
+    yield
+    pool.disable_auto_finalize()
+
+
+def test_auto_finalize(auto_finalize):
+    start = derived_type.get_pool_statistics()
+
+    inst = DerivedType.from_build_args(base=Q(1.0, "m"))
+    no_setters = DerivedTypeNoSetters.from_build_args(base=Q(1.0, "m"))
+    batch = DerivedType.from_build_args_batch_m(np.arange(3.0))
+    assert derived_type.get_pool_statistics().n_live == start.n_live + 5
+
+    del inst, no_setters, batch
+    gc.collect()
+
+    end = derived_type.get_pool_statistics()
+    assert end.n_live == start.n_live
+    assert end.n_finalized == start.n_finalized + 5
+
+
+def test_auto_finalize_after_explicit_finalize(auto_finalize):
+    start = derived_type.get_pool_statistics()
+
+    inst = DerivedType.from_build_args(base=Q(1.0, "m"))
+    inst.finalize()
+    with DerivedTypeContext.from_build_args(base=Q(1.0, "m")):
+        pass
+    batch = DerivedType.from_build_args_batch_m(np.arange(3.0))
+    derived_type.finalize_many(batch)
+
+    # The slots have been released so can be claimed by new instances.
+    # Collecting the old wrappers must not release the new instances' slots.
+    reused = DerivedType.from_build_args_batch_m(np.arange(5.0))
+    del inst, batch
+    gc.collect()
+
+    stats = derived_type.get_pool_statistics()
+    assert stats.n_live == start.n_live + 5
+    assert stats.n_finalized == start.n_finalized + 5
+    for v in reused:
+        assert v.base_m >= 0
+
+    derived_type.finalize_many(reused)
+
+
+def test_auto_finalize_disabled():
+    start = operations.get_pool_statistics()
+
+    pool.enable_auto_finalize()
+    try:
+        attached = Operator.from_build_args(weight=Q(1.0, "1"))
+    finally:
+        pool.disable_auto_finalize()
+
+    not_attached = Operator.from_build_args(weight=Q(1.0, "1"))
+    not_attached_index = not_attached.instance_index
+
+    del attached, not_attached
+    gc.collect()
+
+    assert operations.get_pool_statistics().n_live == start.n_live + 1
+
+    Operator(not_attached_index).finalize()
+
+
+def test_get_auto_finalizer_shared():
+    auto_finalizer = pool.get_auto_finalizer("DerivedType", lambda instance_index: None)
+
+    assert pool.get_auto_finalizer("DerivedType", lambda instance_index: None) is auto_finalizer
+    assert auto_finalizer.release is derived_type._release_instance
+    assert pool.get_auto_finalizer("Operator", lambda instance_index: None) is not auto_finalizer
+
+
+def test_auto_finalize_threads(auto_finalize):
+    start = derived_type.get_pool_statistics()
+
+    def claim_and_release(i):
+        for _ in range(50):
+            batch = DerivedType.from_build_args_batch_m(np.arange(3.0))
+            inst = DerivedType.from_build_args(base=Q(i, "m"))
+            if i % 2:
+                derived_type.finalize_many(batch)
+                inst.finalize()
+
+    with concurrent.futures.ThreadPoolExecutor(max_workers=4) as executor:
+        list(executor.map(claim_and_release, range(8)))
+
+    gc.collect()
+
+    end = derived_type.get_pool_statistics()
+    assert end.n_live == start.n_live
+    assert end.n_finalized == start.n_finalized + 8 * 50 * 4
+
+
+def test_finalize_many_returns_slots_in_order():
+    batch = DerivedType.from_build_args_batch_m(np.arange(4.0))
+    instance_indexes = [v.instance_index for v in batch]
+
+    derived_type.finalize_many(batch)
+    reclaimed = [DerivedType.from_new_connection() for _ in range(4)]
+
+    assert [v.instance_index for v in reclaimed] == instance_indexes
+
+    derived_type.finalize_many(reclaimed)
+
+
+def test_arena(monkeypatch):
+    finalize_many_calls = []
+    for module in (derived_type, operations):
+        monkeypatch.setattr(
+            module,
+            "finalize_many",
+            lambda instances, f=module.finalize_many: (
+                finalize_many_calls.append(len(instances)),
+                f(instances),
+            ),
+        )
+
+    start_derived_type = derived_type.get_pool_statistics()
+    start_operations = operations.get_pool_statistics()
+
+    with fgen_example.arena():
+        dts = [DerivedType.from_build_args(base=Q(i, "m")) for i in range(5)]
+        dts.extend(DerivedTypeNoSetters.from_build_args_batch_m(np.arange(3.0)))
+        ops = [Operator.from_build_args(weight=Q(i, "1")) for i in range(2)]
+        dts[0].finalize()
+
+        assert derived_type.get_pool_statistics().n_live == start_derived_type.n_live + 7
+
+    assert not any(v.initialized for v in (*dts, *ops))
+    assert sorted(finalize_many_calls) == [2, 7]
+    assert derived_type.get_pool_statistics().n_live == start_derived_type.n_live
+    assert operations.get_pool_statistics().n_live == start_operations.n_live
+
+
+def test_arena_exception():
+    start = derived_type.get_pool_statistics()
+
+    with pytest.raises(ValueError, match="Oops"):
+        with fgen_example.arena():
+            inst = DerivedType.from_build_args(base=Q(1.0, "m"))
+            msg = "Oops"
+            raise ValueError(msg)
+
+    assert not inst.initialized
+    assert derived_type.get_pool_statistics().n_live == start.n_live
+
+
+def test_arena_nested():
+    with fgen_example.arena():
+        outer = DerivedType.from_build_args(base=Q(1.0, "m"))
+        with fgen_example.arena():
+            inner = DerivedType.from_build_args(base=Q(1.0, "m"))
+
+        assert not inner.initialized
+        assert outer.initialized
+
+    assert not outer.initialized
+
+
+def test_no_arena():
+    inst = DerivedType.from_build_args(base=Q(1.0, "m"))
+    with fgen_example.arena():
+        pass
+
+    assert inst.initialized
+
+    inst.finalize()
+
+
+def test_export_instances():
+    batch = DerivedType.from_build_args_batch_m(np.arange(3.0))
+
+    instance_indexes, base = derived_type.export_instances()
+
+    assert instance_indexes.size == derived_type.get_pool_statistics().n_live
+    assert np.all(np.diff(instance_indexes) > 0)
+    exported = dict(zip(instance_indexes, base.to("m").m))
+    for inst in batch:
+        assert exported[inst.instance_index] == inst.base_m
+
+    derived_type.finalize_many(batch)
+
+
+def test_export_import_round_trip():
+    start = operations.get_pool_statistics()
+    weights = np.arange(20_000.0)
+    arr = operations.OperatorArray.from_build_args_m(weights)
+    exported_indexes, exported_weights = operations.export_instances_m()
+
+    arr.finalize()
+    restored = operations.import_instances_m(exported_indexes, exported_weights)
+
+    np.testing.assert_equal(restored.instance_indexes, exported_indexes)
+    np.testing.assert_equal(restored.weight_m, exported_weights)
+    np.testing.assert_equal(operations.export_instances_m()[0], exported_indexes)
+    assert operations.get_pool_statistics().n_live == start.n_live + weights.size
+
+    # The restored indexes are no longer free
+    new = Operator.from_new_connection()
+    assert new.instance_index not in exported_indexes
+    new.finalize()
+
+    restored.finalize()
+
+
+def test_export_instances_retries_when_pool_grows():
+    calls = []
+
+    def export(n):
+        calls.append(n)
+        instance_indexes = np.array([5, 2, 9], dtype=np.int32)
+        values = np.array([50.0, 20.0, 90.0])
+
+        # A third instance was claimed after it was counted
+        return instance_indexes[:n], values[:n], 3
+
+    instance_indexes, values = pool.export_live_instances(export, 2)
+
+    assert calls == [2, 3]
+    np.testing.assert_equal(instance_indexes, [2, 5, 9])
+    np.testing.assert_equal(values, [20.0, 50.0, 90.0])
+
+
+def test_import_instances_keeps_free_slots_consistent():
+    start = derived_type.get_pool_statistics()
+    capacity = derived_type.get_instance_capacity()
+    free = DerivedType.from_build_args_batch_m(np.zeros(8))
+    free_indexes = [v.instance_index for v in free]
+    derived_type.finalize_many(free)
+
+    imported = derived_type.import_instances_m(np.array(free_indexes[1::2]), np.arange(4.0))
+
+    # Every other slot is still free and is claimed exactly once
+    n_free = capacity - derived_type.get_pool_statistics().n_live
+    claimed = DerivedType.from_build_args_batch_m(np.zeros(n_free))
+    claimed_indexes = {v.instance_index for v in claimed}
+    assert len(claimed_indexes) == n_free
+    assert set(free_indexes[::2]) <= claimed_indexes
+    assert claimed_indexes.isdisjoint(imported.instance_indexes)
+    assert derived_type.get_instance_capacity() == capacity
+
+    live_indexes = derived_type.export_instances_m()[0]
+    assert set(live_indexes) >= claimed_indexes | set(imported.instance_indexes)
+
+    derived_type.finalize_many(claimed)
+    imported.finalize()
+    assert derived_type.get_pool_statistics().n_live == start.n_live
+
+
+def test_import_instances_grows_pool():
+    instance_index = derived_type.get_instance_capacity() + 10
+
+    restored = derived_type.import_instances(np.array([instance_index]), Q(np.array([3.0]), "km"))
+
+    assert derived_type.get_instance_capacity() >= instance_index
+    assert DerivedType(instance_index).base_m == 3000.0
+
+    restored.finalize()
+
+
+def test_import_instances_in_use():
+    inst = DerivedType.from_new_connection()
+    free = DerivedType.from_new_connection()
+    free_index = free.instance_index
+    free.finalize()
+    start = derived_type.get_pool_statistics()
+
+    with pytest.raises(ValueError, match="not already in use"):
+        derived_type.import_instances_m(np.array([free_index, inst.instance_index]), np.array([1.0, 2.0]))
+
+    # Nothing was claimed, so the free index can still be imported
+    assert derived_type.get_pool_statistics() == start
+    restored = derived_type.import_instances_m(np.array([free_index]), np.array([1.0]))
+    restored.finalize()
+
+    inst.finalize()
+
+
+@pytest.mark.parametrize(
+    "instance_indexes, base, match",
+    (
+        pytest.param([3, 3], [1.0, 2.0], "only be imported once", id="repeated"),
+        pytest.param([-1], [1.0], "must be positive", id="negative"),
+        pytest.param([3, 4], [1.0], "must have the same shape", id="shape"),
+    ),
+)
+def test_import_instances_invalid(instance_indexes, base, match):
+    with pytest.raises(ValueError, match=match):
+        derived_type.import_instances_m(np.array(instance_indexes), np.array(base))
@@ -0,0 +1,121 @@
+"""
+Test streaming evaluation of calc_vec_prod_sum
+"""
+import numpy as np
+import pytest
+
+from fgen_example.operations import Operator
+from fgen_example.streaming import calc_vec_prod_sum_into_m, iter_calc_vec_prod_sum_m
+
+
+@pytest.fixture
+def operator():
+    op = Operator.from_build_args_m(weight=1.5)
+    yield op
+    op.finalize()
+
+
+@pytest.fixture
+def vectors():
+    rng = np.random.default_rng(0)
+
+    return rng.random((23, 3)), rng.random((23, 3))
+
+
+@pytest.mark.parametrize("chunk_size", (1, 5, 23, 100))
+def test_iter_npy_files(tmp_path, operator, vectors, chunk_size):
+    a, b = vectors
+    np.save(tmp_path / "a.npy", a)
+    np.save(tmp_path / "b.npy", b)
+
+    chunks = list(
+        iter_calc_vec_prod_sum_m(operator, tmp_path / "a.npy", tmp_path / "b.npy", chunk_size=chunk_size)
+    )
+
+    assert [c.size for c in chunks[:-1]] == [chunk_size] * (len(chunks) - 1)
+    np.testing.assert_allclose(np.concatenate(chunks), operator.calc_vec_prod_sum_batch_m(a, b))
+
+
+def test_iter_blocks(operator, vectors):
+    a, b = vectors
+    a_blocks = iter((a[:10], a[10:12], a[12:]))
+    b_blocks = iter((b[:10], b[10:12], b[12:]))
+
+    chunks = list(iter_calc_vec_prod_sum_m(operator, a_blocks, b_blocks))
+
+    assert [c.size for c in chunks] == [10, 2, 11]
+    np.testing.assert_allclose(np.concatenate(chunks), operator.calc_vec_prod_sum_batch_m(a, b))
+
+
+def test_iter_nested_lists(operator, vectors):
+    a, b = vectors
+
+    chunks = list(iter_calc_vec_prod_sum_m(operator, a.tolist(), b.tolist(), chunk_size=10))
+
+    assert [c.size for c in chunks] == [10, 10, 3]
+    np.testing.assert_allclose(np.concatenate(chunks), operator.calc_vec_prod_sum_batch_m(a, b))
+
+
+def test_into_path(tmp_path, operator, vectors):
+    a, b = vectors
+    np.save(tmp_path / "a.npy", a)
+
+    res = calc_vec_prod_sum_into_m(operator, tmp_path / "a.npy", b, out=tmp_path / "out.npy", chunk_size=4)
+
+    exp = operator.calc_vec_prod_sum_batch_m(a, b)
+    assert isinstance(res, np.memmap)
+    np.testing.assert_allclose(res, exp)
+    np.testing.assert_allclose(np.load(tmp_path / "out.npy"), exp)
+
+
+def test_into_array(operator, vectors):
+    a, b = vectors
+    out = np.zeros(a.shape[0])
+
+    res = calc_vec_prod_sum_into_m(operator, a, b, out=out, chunk_size=4)
+
+    assert res is out
+    np.testing.assert_allclose(out, operator.calc_vec_prod_sum_batch_m(a, b))
+
+
+@pytest.mark.parametrize("n_out", (22, 24))
+def test_into_array_wrong_size(operator, vectors, n_out):
+    a, b = vectors
+
+    with pytest.raises(ValueError, match="out (only )?has space for"):
+        calc_vec_prod_sum_into_m(operator, a, b, out=np.zeros(n_out), chunk_size=4)
+
+
+def test_into_path_from_blocks(tmp_path, operator, vectors):
+    a, b = vectors
+
+    with pytest.raises(TypeError, match="out can only be a path"):
+        calc_vec_prod_sum_into_m(operator, iter([a]), iter([b]), out=tmp_path / "out.npy")
+
+
+@pytest.mark.parametrize(
+    "a, b",
+    (
+        pytest.param(np.zeros((3, 3)), np.zeros((4, 3)), id="arrays"),
+        pytest.param([np.zeros((3, 3))], [np.zeros((3, 3))] * 2, id="blocks"),
+    ),
+)
+def test_iter_mismatched_lengths(operator, a, b):
+    with pytest.raises(ValueError, match="same number of vectors"):
+        list(iter_calc_vec_prod_sum_m(operator, a, b))
+
+
+@pytest.mark.parametrize("blocks_first", (True, False))
+def test_iter_mixed_sources(operator, vectors, blocks_first):
+    a, b = vectors
+    a = iter([a[:3], a[3:]])
+    if not blocks_first:
+        a, b = b, a
+
+    with pytest.raises(TypeError, match="must either both be iterators of blocks"):
+        list(iter_calc_vec_prod_sum_m(operator, a, b))
+
+
+def test_iter_invalid_chunk_size(operator, vectors):
+    with pytest.raises(ValueError, match="chunk_size must be positive"):
+        list(iter_calc_vec_prod_sum_m(operator, *vectors, chunk_size=0))
@@ -0,0 +1,146 @@
+"""
+Test unit handling
+"""
+import fgen_runtime.units
+import numpy as np
+import pint
+import pint.testing
+import pytest
+
+from fgen_example.units import (
+    clear_conversion_cache,
+    get_conversion_factors,
+    verify_units,
+)
+
+UR = pint.get_application_registry()
+Q = UR.Quantity
+
+
+@verify_units("m", ("m", "dimensionless"))
+def scale(length, factor):
+    return length * factor
+
+
+@pytest.mark.parametrize(
+    "source, target, exp",
+    (
+        pytest.param("m", "m", (1.0, 0.0), id="identity"),
+        pytest.param("mm", "m", (1e-3, 0.0), id="multiplicative"),
+        pytest.param("degC", "K", (1.0, 273.15), id="offset"),
+    ),
+)
+def test_get_conversion_factors(source, target, exp):
+    np.testing.assert_allclose(get_conversion_factors(UR.Unit(source), UR.Unit(target)), exp)
+
+
+@pytest.mark.parametrize(
+    "source, target, exp",
+    (
+        pytest.param("degC", "K", 1.0, id="degC-K"),
+        pytest.param("degF", "degC", 5 / 9, id="degF-degC"),
+    ),
+)
+def test_get_conversion_factors_offset_multiplier_exact(source, target, exp):
+    multiplier, _ = get_conversion_factors(UR.Unit(source), UR.Unit(target))
+
+    assert multiplier == exp
+
+
+def test_get_conversion_factors_incompatible():
+    with pytest.raises(pint.DimensionalityError):
+        get_conversion_factors(UR.Unit("m"), UR.Unit("s"))
+
+
+def test_verify_units():
+    clear_conversion_cache()
+
+    pint.testing.assert_allclose(scale(Q(3, "mm"), Q(2, "1")), Q(0.006, "m"))
+    # Second call uses the cached factors
+    pint.testing.assert_allclose(scale(Q(3, "mm"), Q(2, "1")), Q(0.006, "m"))
+    pint.testing.assert_allclose(
+        scale(length=Q(np.array([1.0, 2.0]), "km"), factor=Q(1, "1")),
+        Q(np.array([1000.0, 2000.0]), "m"),
+    )
+
+
+def test_verify_units_strict():
+    with pytest.raises(ValueError, match="strict=True requires quantity"):
+        scale(3.0, Q(2, "1"))
+
+
+def test_verify_units_incompatible():
+    with pytest.raises(pint.DimensionalityError):
+        scale(Q(3, "s"), Q(2, "1"))
+
+
+def test_verify_units_wrong_number_of_args():
+    with pytest.raises(TypeError, match="scale takes 2 parameters but units were given for 1"):
+
+        @verify_units("m", ("m",))
+        def scale(length, factor):
+            return length * factor
+
+
+def test_verify_units_resolved_on_first_call():
+    # Units aren't looked up in the registry until the function is called
+    @verify_units("m", ("not_a_unit",))
+    def identity(value):
+        return value
+
+    with pytest.raises(pint.UndefinedUnitError):
+        identity(Q(1, "m"))
+
+
+def _parity_cases():
+    def with_default(length, offset=Q(1.0, "km")):
+        return length + offset
+
+    def relative(a, b):
+        return a * b
+
+    return (
+        pytest.param(
+            ("m", ("m", "m")),
+            with_default,
+            (Q(3.0, "mm"),),
+            id="default",
+        ),
+        pytest.param(
+            ("m", ("m", "m")),
+            with_default,
+            (Q(3.0, "mm"), Q(2.0, "cm")),
+            id="default-given",
+        ),
+        pytest.param(
+            ("=A**2", ("=A", "=A")),
+            relative,
+            (Q(3.0, "mm"), Q(2.0, "mm")),
+            id="relative",
+        ),
+    )
+
+
+@pytest.mark.parametrize("units, func, args", _parity_cases())
+def test_verify_units_parity(units, func, args):
+    exp = fgen_runtime.units.verify_units(*units)(func)(*args)
+    res = verify_units(*units)(func)(*args)
+
+    pint.testing.assert_allclose(res, exp)
+
+
+@pytest.mark.parametrize("decorator", (verify_units, fgen_runtime.units.verify_units))
+@pytest.mark.parametrize(
+    "args",
+    (
+        pytest.param((Q(3, "s"), Q(2, "1")), id="given"),
+        pytest.param((Q(3, "m"),), id="default"),
+    ),
+)
+def test_verify_units_incompatible_parity(decorator, args):
+    @decorator("m", ("m", "dimensionless"))
+    def scale_default(length, factor=Q(2, "s")):
+        return length * factor
+
+    with pytest.raises(pint.DimensionalityError):
+        scale_default(*args)
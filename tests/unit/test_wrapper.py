@@ -5,11 +5,25 @@ These tests are simply here to demonstrate how the tests can be set up and how
 the wrapping module can be used. You will likely significantly modify or even
 delete this file early in the project.
 """
+import copy
+import pickle
+
+import numpy as np
 import pint
 import pint.testing
+import pytest
 
-from fgen_example.derived_type import DerivedType
-from fgen_example.operations import OperatorContext
+from fgen_example.derived_type import (
+    DerivedType,
+    DerivedTypeNoSetters,
+    double_batch,
+    double_batch_m,
+    finalize_many,
+    get_instance_capacity,
+    reserve_instances,
+)
+from fgen_example.operations import Operator, OperatorContext, OperatorNoSetters
+from fgen_example.operations import finalize_many as finalize_many_operators
 
 Q = pint.get_application_registry().Quantity
 
@@ -20,11 +34,110 @@ def test_add():
     pint.testing.assert_allclose(dt.add(Q(3, "mm")), Q(2.003, "m"))
 
 
+def test_add_batch():
+    dt = DerivedType.from_build_args(base=Q(2, "m"))
+    pint.testing.assert_allclose(
+        dt.add_batch(Q(np.array([3.0, 1.0, -2.0]), "m")),
+        Q(np.array([5.0, 3.0, 0.0]), "m"),
+    )
+    pint.testing.assert_allclose(
+        dt.add_batch(Q(np.array([3.0, 1.0]), "mm")),
+        Q(np.array([2.003, 2.001]), "m"),
+    )
+
+
+def test_add_batch_not_1d():
+    dt = DerivedType.from_build_args(base=Q(2, "m"))
+    with pytest.raises(ValueError, match="Batched values must be 1D"):
+        dt.add_batch(Q(np.ones((2, 2)), "m"))
+
+
 def test_double():
     dt = DerivedType.from_build_args(base=Q(2, "m"))
     pint.testing.assert_allclose(dt.double(), Q(4, "m"))
 
 
+def test_double_batch():
+    instances = [DerivedType.from_build_args(base=Q(v, "m")) for v in (1, 2, 3)]
+    pint.testing.assert_allclose(
+        double_batch(instances),
+        Q(np.array([2.0, 4.0, 6.0]), "m"),
+    )
+
+
+def test_magnitude_only_api():
+    dt = DerivedType.from_build_args_m(base=2.0)
+    assert dt.base_m == 2.0
+    assert dt.add_m(3.0) == 5.0
+    assert dt.double_m() == 4.0
+    np.testing.assert_allclose(dt.add_batch_m(np.array([3.0, 1.0])), np.array([5.0, 3.0]))
+    np.testing.assert_allclose(double_batch_m([dt]), np.array([4.0]))
+
+    # The unit-aware API sees the same instance
+    pint.testing.assert_allclose(dt.base, Q(2, "m"))
+
+
+def test_instance_pool_grows():
+    n_instances = get_instance_capacity() + 10
+    instances = [DerivedType.from_build_args(base=Q(i, "m")) for i in range(n_instances)]
+
+    assert len({v.instance_index for v in instances}) == n_instances
+    assert get_instance_capacity() >= n_instances
+    pint.testing.assert_allclose(double_batch(instances), Q(2.0 * np.arange(n_instances), "m"))
+
+    for instance in instances:
+        instance.finalize()
+
+
+def test_finalized_instance_index_is_reused():
+    dt = DerivedType.from_new_connection()
+    instance_index = dt.instance_index
+    dt.finalize()
+
+    dt_new = DerivedType.from_new_connection()
+    assert dt_new.instance_index == instance_index
+    dt_new.finalize()
+
+
+def test_from_build_args_batch():
+    instances = DerivedType.from_build_args_batch(Q(np.array([1.0, 2.0, 3.0]), "m"))
+
+    assert len({v.instance_index for v in instances}) == 3
+    for instance, exp in zip(instances, [1.0, 2.0, 3.0]):
+        pint.testing.assert_allclose(instance.base, Q(exp, "m"))
+
+    finalize_many(instances)
+    assert not any(v.initialized for v in instances)
+
+
+def test_from_build_args_batch_operator():
+    operators = Operator.from_build_args_batch(Q(np.array([0.5, 2.0]), "1"))
+    for operator, exp in zip(operators, [0.5, 2.0]):
+        pint.testing.assert_allclose(operator.weight, Q(exp, "1"))
+
+    finalize_many_operators(operators)
+    assert not any(v.initialized for v in operators)
+
+
+def test_finalize_many_duplicates():
+    dt = DerivedType.from_build_args(base=Q(2, "m"))
+    with pytest.raises(ValueError, match="Each instance can only be finalised once"):
+        finalize_many([dt, dt])
+
+    assert dt.initialized
+    dt.finalize()
+
+
+def test_reserve_instances():
+    capacity = get_instance_capacity()
+    reserve_instances(capacity + 1)
+    assert get_instance_capacity() >= capacity + 1
+
+    # Reserving less than the current capacity is a no-op
+    reserve_instances(1)
+    assert get_instance_capacity() >= capacity + 1
+
+
 def test_calc_vec_prod_sum():
     with OperatorContext.from_build_args(weight=Q(2, "1")) as operator:
         pint.testing.assert_allclose(
@@ -34,3 +147,108 @@ def test_calc_vec_prod_sum():
             ),
             Q(20, "1"),
         )
+
+
+def test_calc_vec_prod_sum_m():
+    operator = Operator.from_build_args_m(weight=2.0)
+    assert operator.weight_m == 2.0
+    assert operator.calc_vec_prod_sum_m(np.array([1.0, 2.0, 3.0]), np.array([3.0, 2.0, 1.0])) == 20.0
+    np.testing.assert_allclose(
+        operator.calc_vec_prod_sum_batch_m(np.ones((2, 3)), np.ones((2, 3))),
+        np.array([6.0, 6.0]),
+    )
+    operator.finalize()
+
+
+def test_calc_vec_prod_sum_long_vectors():
+    a = np.linspace(0.0, 1.0, 5000)
+    b = np.linspace(2.0, -1.0, 5000)
+    with OperatorContext.from_build_args(weight=Q(0.5, "1")) as operator:
+        pint.testing.assert_allclose(
+            operator.calc_vec_prod_sum(Q(a, "1"), Q(b, "1")),
+            Q(0.5 * np.dot(a, b), "1"),
+        )
+
+
+def test_calc_vec_prod_sum_length_mismatch():
+    with OperatorContext.from_build_args(weight=Q(2, "1")) as operator:
+        with pytest.raises(ValueError, match="a and b must have the same length"):
+            operator.calc_vec_prod_sum(Q([1, 2, 3], "1"), Q([1, 2], "1"))
+
+
+def test_calc_vec_prod_sum_batch():
+    a = np.array([[1.0, 2.0, 3.0], [0.0, 1.0, 0.0], [2.0, 2.0, 2.0]])
+    b = np.array([[3.0, 2.0, 1.0], [5.0, 4.0, 3.0], [1.0, 0.5, 0.25]])
+    with OperatorContext.from_build_args(weight=Q(2, "1")) as operator:
+        pint.testing.assert_allclose(
+            operator.calc_vec_prod_sum_batch(Q(a, "1"), Q(b, "1")),
+            Q(np.array([20.0, 8.0, 7.0]), "1"),
+        )
+
+
+def test_calc_vec_prod_sum_batch_shape_mismatch():
+    with OperatorContext.from_build_args(weight=Q(2, "1")) as operator:
+        with pytest.raises(ValueError, match="must have the same shape"):
+            operator.calc_vec_prod_sum_batch(Q(np.ones((2, 3)), "1"), Q(np.ones((3, 3)), "1"))
+
+
+@pytest.mark.parametrize(
+    "cls, build_args, attribute",
+    (
+        (DerivedType, {"base": 2.5}, "base_m"),
+        (DerivedTypeNoSetters, {"base": 2.5}, "base_m"),
+        (Operator, {"weight": 3.0}, "weight_m"),
+        (OperatorNoSetters, {"weight": 3.0}, "weight_m"),
+    ),
+)
+def test_pickle(cls, build_args, attribute):
+    inst = cls.from_build_args_m(**build_args)
+
+    res = pickle.loads(pickle.dumps(inst))  # noqa: S301
+
+    assert isinstance(res, cls)
+    assert res.initialized
+    # A new, independent Fortran instance is built when unpickling
+    assert res.instance_index != inst.instance_index
+    assert getattr(res, attribute) == getattr(inst, attribute)
+
+    # The new instance is unaffected by finalising the original
+    inst.finalize()
+    assert getattr(res, attribute) == next(iter(build_args.values()))
+    res.finalize()
+
+
+@pytest.mark.parametrize("copier", (copy.copy, copy.deepcopy))
+@pytest.mark.parametrize(
+    "cls, build_args, attribute",
+    (
+        (DerivedType, {"base": 2.5}, "base_m"),
+        (DerivedTypeNoSetters, {"base": 2.5}, "base_m"),
+        (Operator, {"weight": 3.0}, "weight_m"),
+        (OperatorNoSetters, {"weight": 3.0}, "weight_m"),
+    ),
+)
+def test_copy(copier, cls, build_args, attribute):
+    inst = cls.from_build_args_m(**build_args)
+
+    res = copier(inst)
+
+    # Copying builds a new Fortran instance, which has to be finalised too
+    assert isinstance(res, cls)
+    assert res.initialized
+    assert res.instance_index != inst.instance_index
+    assert getattr(res, attribute) == getattr(inst, attribute)
+
+    inst.finalize()
+    assert getattr(res, attribute) == next(iter(build_args.values()))
+    res.finalize()
+
+
+def test_copy_uninitialised():
+    assert not copy.copy(DerivedType()).initialized
+
+
+def test_pickle_uninitialised():
+    res = pickle.loads(pickle.dumps(DerivedType()))  # noqa: S301
+
+    assert not res.initialized